@@ -1,21 +1,45 @@
+from concurrent.futures import ThreadPoolExecutor
 from .service import Service
 from .insertion_order import InsertionOrder
+from .line_item import LineItem
+from .campaign import Campaign
+from .creative_html import CreativeHtml
 from .profile import Profile
 from .paginator import paginator
 
+# the levels below insertion orders: name of the child references in the parent, child service,
+# and the collection of its listings when it is not the service's collection_name
+WALK_LEVELS = (
+    ('line_items', LineItem, None),
+    ('campaigns', Campaign, None),
+    ('creatives', CreativeHtml, 'creative-html'),
+)
+
+
+def stitch(parents, children, name):
+    """ attach the children referenced in the parents' data under name to the parents.
+    Parents referencing children missing from the listing are left to fetch them
+    """
+    by_id = dict((child.id, child) for child in children)
+    for parent in parents:
+        refs = parent._data.get(name) or []
+        if all(ref['id'] in by_id for ref in refs):
+            parent._prefetch(name, [by_id[ref['id']] for ref in refs])
+
 class Advertiser(Service):
     service_name = 'advertiser'
     collection_name = 'advertisers'
+    __slots__ = ()
 
     def create_insertion_order(self, name, **kwargs):
         """ create a new insertion_order """
         data = { 'name': name, 'advertiser_id': self.id }
         data.update(kwargs)
-        return InsertionOrder(self._client, data=data)
+        return self._service_class(InsertionOrder)(self._client, data=data)
 
-    def insertion_orders(self):
-        """ return all insertion_orders """
-        return self._all(InsertionOrder)
+    def insertion_orders(self, fields=None, records=False):
+        """ return all insertion_orders, or summaries with only these fields, or as records """
+        return self._all(InsertionOrder, fields, records)
 
     def insertion_order_by_name(self, name):
         """ return the first insertion_order with this name, or None if not found """
@@ -29,9 +53,37 @@ class Advertiser(Service):
         """ return the insertion_order with this id, or None if not found """
         return self._by_exact_key(InsertionOrder, 'id', insertion_order_id)
 
-    def insertion_orders_by_ids(self, insertion_order_ids):
+    def insertion_orders_by_ids(self, insertion_order_ids, fields=None, records=False):
         """ return an iterator for insertion_orders with these ids """
-        return self._by_ids(InsertionOrder, insertion_order_ids)
+        return self._by_ids(InsertionOrder, insertion_order_ids, fields=fields, records=records)
+
+    def walk(self, include=('line_items', 'campaigns', 'creatives', 'profiles')):
+        """ return all insertion_orders, with the included levels below them prefetched.
+        Each level is fetched with one listing of all this advertiser's items, and the
+        items are attached to their parents, so line_items(), campaigns(), creatives()
+        and profile() of the walked items make no further requests.
+        Including a level includes the levels above it; 'profiles' attaches the profiles
+        of the walked line items and campaigns
+        """
+        depth = max([i + 1 for i, (name, service, collection) in enumerate(WALK_LEVELS) if name in include] or [0])
+        services = [(InsertionOrder, None)] + [(service, collection) for name, service, collection in WALK_LEVELS[:depth]]
+        if 'profiles' in include:
+            services.append((Profile, None))
+        with ThreadPoolExecutor(max_workers=len(services)) as executor:
+            listings = list(executor.map(
+                lambda level: list(self._all(level[0], override_collection_name=level[1])), services))
+        parents = insertion_orders = listings[0]
+        walked = []
+        for (name, service, collection), children in zip(WALK_LEVELS[:depth], listings[1:]):
+            stitch(parents, children, name)
+            walked.extend(children)
+            parents = children
+        if 'profiles' in include:
+            profiles = dict((p.id, p) for p in listings[-1])
+            for item in walked:
+                if isinstance(item, (LineItem, Campaign)):
+                    item._prefetch('profile', profiles.get(item._data.get('profile_id')))
+        return insertion_orders
 
     def profile(self):
         """ return the optionally attached profile """
@@ -0,0 +1,289 @@
+import asyncio
+import json
+import logging
+from functools import partial
+
+from requests import HTTPError
+
+from ..client import AppNexusClient, checked_response, response_body
+from ..throttle import is_throttled
+
+
+class AsyncResponse(object):
+    """ the parts of an http response the error checking needs,
+    read while the connection was still open
+    """
+    def __init__(self, status_code, url, body, headers=None):
+        self.status_code = status_code
+        self.url = url
+        self.headers = headers or {}
+        self._body = body
+
+    def json(self):
+        return json.loads(self._body)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HTTPError("{} Error for url: {}".format(self.status_code, self.url))
+
+
+class AsyncAppNexusClient(AppNexusClient):
+    def __init__(self, config):
+        """ asyncio wrapper for the app nexus REST API.
+        The api methods are coroutines; requests go through one aiohttp session,
+        which is created on first use, inside the running event loop.
+        The pool size is set by 'async_pool_size' in the config (default 100)
+        """
+        super(AsyncAppNexusClient, self).__init__(config)
+        self._http = None
+        self._auth_lock = None
+        # for easier dependency injection
+        self._get = partial(self._request, 'GET')
+        self._put = partial(self._request, 'PUT')
+        self._post = partial(self._request, 'POST')
+        self._delete = partial(self._request, 'DELETE')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """ stop refreshing the token, and close the aiohttp session and its connections """
+        super(AsyncAppNexusClient, self).close()
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+
+    def _http_session(self):
+        if self._http is None:
+            import aiohttp
+            connector = aiohttp.TCPConnector(limit=self._config.get('async_pool_size', 100))
+            self._http = aiohttp.ClientSession(connector=connector)
+        return self._http
+
+    async def _request(self, method, uri, data=None, headers=None, files=None):
+        """ send a request, returns an AsyncResponse """
+        if files:
+            import aiohttp
+            form = aiohttp.FormData(data or {})
+            for field, (filename, content) in files.items():
+                form.add_field(field, content, filename=filename)
+            data = form
+        async with self._http_session().request(method, uri, data=data, headers=headers) as r:
+            body = await r.text()
+            return AsyncResponse(r.status, str(r.url), body, r.headers)
+
+    async def _paced(self, kind, send, event=None):
+        """ async counterpart of AppNexusClient._paced """
+        attempt = 0
+        while True:
+            delay = self.rate_limiter.delay(kind)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            r = await send()
+            if event is not None:
+                event.responded(r)
+            res = response_body(r)
+            if attempt >= self.rate_limiter.max_retries or not is_throttled(r, res):
+                return r, res
+            seconds = self.rate_limiter.back_off(r, attempt)
+            logging.warning("throttled, retrying in {}s ({})".format(seconds, r.url))
+            attempt += 1
+
+    def _retry_errors(self):
+        """ the aiohttp errors of requests that never reached the api, and of
+        requests that may have
+        """
+        try:
+            import aiohttp
+        except ImportError:
+            return (), (asyncio.TimeoutError,)
+        return (aiohttp.ClientConnectorError,), (aiohttp.ClientError, asyncio.TimeoutError)
+
+    async def _retried(self, verb, endpoint, paced):
+        """ async counterpart of RetryPolicy.call, resending paced() requests as the
+        client's retry policy allows
+        """
+        policy = self.retry_policy
+        policy.started(endpoint)
+        attempt = 0
+        failed = True
+        try:
+            while True:
+                try:
+                    result = await paced()
+                except Exception as e:
+                    seconds = policy.retry_delay(verb, attempt, error=e, errors=self._retry_errors())
+                    if seconds is None:
+                        raise
+                    logging.warning("{!r}, retrying in {:.2f}s".format(e, seconds))
+                else:
+                    r = result[0]
+                    if not policy.failed(r):
+                        failed = False
+                        return result
+                    seconds = policy.retry_delay(verb, attempt, r)
+                    if seconds is None:
+                        return result
+                    logging.warning("{} response, retrying in {:.2f}s ({})".format(r.status_code, seconds, r.url))
+                await asyncio.sleep(seconds)
+                attempt += 1
+        finally:
+            policy.finished(endpoint, failed)
+
+    async def _checked(self, kind, send, verb, what):
+        """ counterpart of the error checking decorator: send the request within
+        the rate limits, resend it as the retry policy allows, re-authenticate and
+        resend once on a NOAUTH response, calling the instrumentation hooks around it
+        """
+        event = self.instrumentation.started(verb, what)
+        paced = lambda: self._paced(kind, send, event)
+        try:
+            token = await self.token()
+            r, res = await self._retried(verb, event.service, paced)
+            if res.get('error_id') == "NOAUTH":
+                logging.info("re-auth due to noauth response")
+                await self._reauthenticate(token)
+                r, res = await self._retried(verb, event.service, paced)
+            res = checked_response(r, res)
+        except Exception as e:
+            self.instrumentation.failed(event, e)
+            raise
+        self.instrumentation.finished(event)
+        return res
+
+    async def _send(self, reqf, uri, headers, **kwargs):
+        return await reqf(uri, headers=await self._apihdr(headers), **kwargs)
+
+    async def token(self):
+        """ get a valid auth token to use in api calls """
+        if self._token_stale():
+            if self._auth_lock is None:
+                self._auth_lock = asyncio.Lock()
+            async with self._auth_lock:
+                # only the first of many waiting coroutines refreshes
+                if self._token_stale() and not self._token_from_store():
+                    logging.info("re-auth due to time")
+                    await self._refresh_token()
+        return self._token
+
+    async def _reauthenticate(self, rejected):
+        """ async counterpart of AppNexusClient._reauthenticate """
+        if self._auth_lock is None:
+            self._auth_lock = asyncio.Lock()
+        async with self._auth_lock:
+            if self._token == rejected:
+                await self._refresh_token()
+
+    def _schedule_refresh(self):
+        """ refresh the token on the event loop, token_refresh_ahead seconds before it expires """
+        delay = self._refresh_delay()
+        if delay is None:
+            return
+        if self._refresh_timer:
+            self._refresh_timer.cancel()
+        loop = asyncio.get_event_loop()
+        self._refresh_timer = loop.call_later(delay, lambda: asyncio.ensure_future(self._refresh_ahead()))
+
+    async def _refresh_ahead(self):
+        try:
+            fetched = self._token_last_fetched
+            if not self._token_from_store(newer_than=fetched):
+                logging.info("re-auth ahead of expiry")
+                await self._refresh_token()
+        except Exception:
+            logging.exception("background token refresh failed")
+
+    async def _apihdr(self, hdr=None):
+        """ add auth and content type to any custom headers """
+        headers = hdr.copy() if hdr else {}
+        headers.update(self.CONTENT_HDR)
+        headers.update({'Authorization': await self.token()})
+        return headers
+
+    async def _refresh_token(self):
+        """ async counterpart of AppNexusClient._refresh_token """
+        if self._token_store.read_only:
+            self._token_from_read_only_store()
+        else:
+            uri = self._apiuri('auth')
+            r = await self._post(uri, data=self._auth_data(), headers=self.CONTENT_HDR)
+            self._set_token(r.json()['response'])
+
+    async def upload(self, where, data, name, headers=None):
+        """ basic api post request that uploads binary data """
+        uri = self._apiuri(where)
+        logging.info("POST {}".format(uri))
+
+        async def send():
+            hdr = dict(headers or {}, Authorization=await self.token())
+            return await self._post(uri, headers=hdr, files={'file': (name, data)}, data={'type': 'html'})
+        return await self._checked('write', send, 'POST', where)
+
+    async def data_get(self, what, headers=None, chunk_size=None):
+        """ basic api get request that returns binary data, in chunks of chunk_size
+            (default: the client's download_chunk_size) bytes
+            Returns: an async iterator for the data
+        """
+        uri = self._apiuri(what)
+        headers = await self._apihdr(headers)
+        logging.info("GET {}".format(uri))
+        event = self.instrumentation.started('GET', what)
+
+        async def fetch():
+            delay = self.rate_limiter.delay('read')
+            if delay > 0:
+                await asyncio.sleep(delay)
+            r = await self._http_session().get(uri, headers=headers)
+            if r.status >= 400:
+                # a failed attempt is read whole, for the retry policy and the error checks
+                async with r:
+                    response = AsyncResponse(r.status, str(r.url), await r.text(), r.headers)
+                r = None
+            else:
+                response = AsyncResponse(r.status, str(r.url), None, r.headers)
+            event.responded(response)
+            return response, r
+
+        try:
+            response, r = await self._retried('GET', event.service, fetch)
+            if r is None:
+                checked_response(response, response_body(response))
+                response.raise_for_status()
+        except Exception as e:
+            self.instrumentation.failed(event, e)
+            raise
+        self.instrumentation.finished(event)
+        async with r:
+            async for chunk in r.content.iter_chunked(chunk_size or self.download_chunk_size):
+                yield chunk
+
+    async def get(self, what, headers=None):
+        """ basic api get request """
+        uri = self._apiuri(what)
+        logging.info("GET {}".format(uri))
+        return await self._checked('read', partial(self._send, self._get, uri, headers), 'GET', what)
+
+    async def post(self, what, data, headers=None):
+        """ basic api post request """
+        uri = self._apiuri(what)
+        data = json.dumps(data)
+        logging.info("POST %s", uri)
+        logging.debug("POST %s: %s", uri, data)
+        return await self._checked('write', partial(self._send, self._post, uri, headers, data=data), 'POST', what)
+
+    async def put(self, what, data, headers=None):
+        """ basic api put request """
+        uri = self._apiuri(what)
+        data = json.dumps(data)
+        logging.info("PUT %s", uri)
+        logging.debug("PUT %s: %s", uri, data)
+        return await self._checked('write', partial(self._send, self._put, uri, headers, data=data), 'PUT', what)
+
+    async def delete(self, what, headers=None):
+        """ basic api delete request """
+        uri = self._apiuri(what)
+        logging.info("DELETE {}".format(uri))
+        return await self._checked('write', partial(self._send, self._delete, uri, headers), 'DELETE', what)
@@ -0,0 +1,107 @@
+import asyncio
+from collections import deque
+
+from ..exceptions import NotFoundException
+from ..paginator import fields_term, id_chunks, unique_items
+
+
+async def paginator(client, term, collection_name, cls, workers=None, max_pending=None, fields=None):
+    """ async counterpart of appnexus.paginator.paginator: an async iterator that
+    fetches elements as needed, with up to max_pending pages in flight when more
+    than one worker is used
+    """
+    workers = workers or client.page_workers
+    term = fields_term(term, fields)
+    res = await client.get(term)
+    if res["status"] == "OK":
+        for item in res.get(collection_name, []):
+            yield cls(client=client, data=item)
+        thusfar = res["start_element"] + res["num_elements"]
+        separator = '&' if '?' in term else '?'
+        if workers > 1:
+            pages = _prefetched_pages(client, term + separator, res["num_elements"],
+                                      thusfar, res["count"], max_pending or 2 * workers)
+            async for page in pages:
+                if not collection_name in page:
+                    return
+                for item in page[collection_name]:
+                    yield cls(client=client, data=item)
+            return
+        while res["count"] > thusfar:
+            res = await client.get('{}{}start_element={}'.format(term, separator, thusfar))
+            if not collection_name in res:
+                return
+            for item in res[collection_name]:
+                yield cls(client=client, data=item)
+            thusfar = res["start_element"] + res["num_elements"]
+
+
+async def _prefetched_pages(client, term, page_size, start, count, max_pending):
+    """ generates the responses for all pages from start to count in order,
+    fetching up to max_pending of them concurrently
+    """
+    if page_size <= 0:
+        return
+    offsets = iter(range(start, count, page_size))
+    pending = deque()
+
+    def fetch_next():
+        for offset in offsets:
+            page_term = '{}start_element={}&num_elements={}'.format(term, offset, page_size)
+            pending.append(asyncio.ensure_future(client.get(page_term)))
+            return
+
+    try:
+        for _ in range(max_pending):
+            fetch_next()
+        while pending:
+            page = await pending.popleft()
+            fetch_next()
+            yield page
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def fetch_id_chunk(client, term, collection_name, service_name):
+    """ async counterpart of appnexus.paginator.fetch_id_chunk """
+    try:
+        res = await client.get(term)
+    except NotFoundException:
+        return []
+    if collection_name not in res:
+        return [res[service_name]] if service_name in res else []
+    items = list(res[collection_name])
+    thusfar = res["start_element"] + res["num_elements"]
+    while res["count"] > thusfar:
+        res = await client.get('{}&start_element={}'.format(term, thusfar))
+        if not collection_name in res:
+            break
+        items.extend(res[collection_name])
+        thusfar = res["start_element"] + res["num_elements"]
+    return items
+
+
+async def by_ids(client, ids, term_for, collection_name, service_name, cls):
+    """ async counterpart of appnexus.paginator.by_ids, fetching all chunks concurrently """
+    terms = [term_for(values) for values in id_chunks(ids)]
+    chunks = await asyncio.gather(*(
+        fetch_id_chunk(client, term, collection_name, service_name) for term in terms
+    ))
+    for item in unique_items(chunks):
+        yield cls(client=client, data=item)
+
+
+async def first(items):
+    """ the first item of an async iterator, or None """
+    try:
+        async for item in items:
+            return item
+    finally:
+        await items.aclose()
+
+
+async def no_items():
+    """ an empty async iterator """
+    return
+    yield
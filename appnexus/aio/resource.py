@@ -0,0 +1,87 @@
+from requests.compat import quote_plus
+from ..brand import Brand
+from ..exceptions import NotFoundException
+from ..paginator import fields_term
+from ..resource import AppNexusResource
+from .client import AsyncAppNexusClient
+from .paginator import paginator, by_ids, first
+from .service import ASYNC_SERVICES
+
+
+class AsyncAppNexusResource(AppNexusResource):
+    """ AppNexusResource whose lookups are coroutines and whose listings are async iterators """
+    client_class = AsyncAppNexusClient
+    # catalogs are downloaded with blocking listings
+    catalog_services = ()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """ close the client's connections """
+        await self._client.close()
+
+    def _service_class(self, service):
+        return ASYNC_SERVICES.get(service, service)
+
+    def _all(self, service, fields=None, records=False):
+        """ return all hosted items of a service """
+        cls = self._listing_class(service, fields, records)
+        return paginator(self._client, service.service_name, service.collection_name, cls, fields=fields)
+
+    def _by_ids(self, service, ids, fields=None, records=False):
+        """ return multiple items by id, fetched in concurrent chunks of ids """
+        return by_ids(
+            self._client, ids,
+            lambda values: fields_term(self._ids_term(service, values), fields),
+            service.collection_name,
+            service.service_name,
+            self._listing_class(service, fields, records)
+        )
+
+    async def _by_exact_key(self, service, key_name, key_value):
+        """ return a specific item by an exact key (generally code or id) """
+        identity_map = self._client.identity_map
+        if identity_map:
+            key = identity_map.key(service.service_name, key_name, key_value, None)
+            item = identity_map.get(key)
+            if item is not None:
+                return item
+        item = self._from_local(service, key_name, key_value)
+        if item is None:
+            try:
+                res = await self._client.get(self._key_term(service, key_name, quote_plus(str(key_value))))
+                item = self._service_class(service)(client=self._client, data=res[service.service_name])
+            except NotFoundException:
+                return None
+            if self._client.mirror:
+                self._client.mirror.put(item)
+        if identity_map:
+            identity_map.put(key, item)
+        return item
+
+    async def _by_inexact_key(self, service, key_name, key_value):
+        """ return the first item with this key/value """
+        item = self._from_local(service, key_name, key_value)
+        if item is None:
+            term = self._key_term(service, key_name, key_value)
+            item = await first(paginator(self._client, term, service.collection_name, self._service_class(service)))
+            if item is not None and self._client.mirror:
+                self._client.mirror.put(item)
+        return item
+
+    def brands(self, fields=None, records=False):
+        """ return all brands.
+        without simple=true, this counts all attached creatives, which take a long time
+        """
+        term = "{}?simple=true".format(Brand.service_name)
+        cls = self._listing_class(Brand, fields, records)
+        return paginator(self._client, term, Brand.collection_name, cls, fields=fields)
+
+    async def creative_upload(self, data, name, member_id):
+        """ upload a creative package to the creative upload service """
+        response = await self._client.upload(self._upload_term(member_id), data, name)
+        return response['media-asset'][0]
@@ -0,0 +1,239 @@
+import asyncio
+
+from ..exceptions import DataException, NotFoundException
+from ..advertiser import Advertiser
+from ..brand import Brand
+from ..campaign import Campaign
+from ..category import Category
+from ..creative_html import CreativeHtml
+from ..insertion_order import InsertionOrder
+from ..line_item import LineItem
+from ..profile import Profile
+from ..paginator import fields_term
+from .paginator import paginator, by_ids, first, no_items
+
+# sync service class -> async counterpart
+ASYNC_SERVICES = {}
+
+
+def async_counterpart(service):
+    """ class decorator registering an async service as the counterpart of a sync service """
+    def register(cls):
+        ASYNC_SERVICES[service] = cls
+        return cls
+    return register
+
+
+class AsyncService(object):
+    """ mixin for a Service that makes its remote calls awaitable and its
+    listings async iterators. The uri terms are built by the sync service.
+    """
+    __slots__ = ()
+
+    def _service_class(self, service):
+        return ASYNC_SERVICES.get(service, service)
+
+    def _all(self, service, fields=None, records=False, override_collection_name=None):
+        """ return all hosted items of a service, filtered by this service's id """
+        if self.id:
+            term = self._for_this_service(service.service_name)
+            cls = self._listing_class(service, fields, records)
+            collection_name = override_collection_name or service.collection_name
+            return paginator(self._client, term, collection_name, cls, fields=fields)
+        return no_items()
+
+    def _by_ids(self, service, ids, override_collection_name=None, fields=None, records=False):
+        """ return multiple items by id, fetched in concurrent chunks of ids """
+        if self.id:
+            return by_ids(
+                self._client, ids,
+                lambda values: fields_term(self._ids_term(service, values), fields),
+                override_collection_name or service.collection_name,
+                service.service_name,
+                self._listing_class(service, fields, records)
+            )
+        return no_items()
+
+    async def _by_exact_key(self, service, key_name, key_value):
+        """ return a specific item by an exact key (generally code or id) """
+        identity_map = self._client.identity_map
+        if identity_map:
+            key = identity_map.key(service.service_name, key_name, key_value, self._lookup_scope())
+            item = identity_map.get(key)
+            if item is not None:
+                return item
+        item = self._from_mirror(service, key_name, key_value)
+        if item is None:
+            try:
+                res = await self._client.get(self._key_term(service, key_name, key_value))
+                item = self._service_class(service)(client=self._client, data=res[service.service_name])
+            except NotFoundException:
+                return None
+            if self._client.mirror:
+                self._client.mirror.put(item)
+        if identity_map:
+            identity_map.put(key, item)
+        return item
+
+    async def _by_inexact_key(self, service, key_name, key_value):
+        """ return the first item with this key/value """
+        item = self._from_mirror(service, key_name, key_value)
+        if item is None:
+            term = self._key_term(service, key_name, key_value)
+            item = await first(paginator(self._client, term, service.collection_name, self._service_class(service)))
+            if item is not None and self._client.mirror:
+                self._client.mirror.put(item)
+        return item
+
+    async def meta(self):
+        """ retrieve the service's meta information """
+        return await self._client.get('{}/meta'.format(self.service_name))
+
+    async def save(self):
+        """ creates or updates the item remotely, saving its dependencies concurrently """
+        dependencies = self._dependencies()
+        await asyncio.gather(*(item.save() for item in dependencies))
+        self._merge_dependencies(dependencies)
+        await asyncio.gather(*(item.delete() for item in self._discarded()))
+        payload = self._payload()
+        if payload is None:
+            return True
+        if self.data.get('id') is None:
+            res = await self._client.post(self._collection_term(), payload)
+        else:
+            res = await self._client.put(self._item_term(), payload)
+        self._saved_as(res[self.service_name], everything=True)
+        self._forget()
+        return True
+
+    async def delete(self):
+        """ deletes the item remotely.
+        Saving it after this will recreate it with a new id
+        """
+        if not self.data.get('id') is None:
+            await self._client.delete(self._item_term())
+            self._forget(deleted=True)
+            self.data['id'] = None
+        else:
+            raise DataException("unable to delete {} without an id".format(self.service_name))
+
+
+@async_counterpart(Profile)
+class AsyncProfile(AsyncService, Profile):
+    __slots__ = ()
+
+
+@async_counterpart(Brand)
+class AsyncBrand(AsyncService, Brand):
+    __slots__ = ()
+
+
+@async_counterpart(Category)
+class AsyncCategory(AsyncService, Category):
+    __slots__ = ()
+
+
+@async_counterpart(CreativeHtml)
+class AsyncCreativeHtml(AsyncService, CreativeHtml):
+    __slots__ = ()
+
+    async def deactivate(self):
+        """ sets the creative state to inactive """
+        if self.data.get('id'):
+            payload = {
+                self.service_name: {
+                    'state': 'inactive',
+                    'status': {
+                        'user_ready': False
+                    }
+                }
+            }
+            res = await self._client.put(self._item_term(), payload)
+            self._saved_as(res[self.service_name])
+            self._forget()
+        return True
+
+
+@async_counterpart(Campaign)
+class AsyncCampaign(AsyncService, Campaign):
+    __slots__ = ()
+
+    async def creatives(self, fields=None, records=False):
+        """ return all creatives, with summaries of only these fields for the saved ones """
+        creative_refs = self.data.get('creatives') or []
+        async for creative in self.creatives_by_ids((c['id'] for c in creative_refs), fields, records):
+            yield creative
+        for creative in self._new_creatives():
+            yield creative
+
+    async def creative_by_id(self, creative_id):
+        """ return the first creative that matches the creative_id """
+        return await first(c async for c in self.creatives() if c.id == creative_id)
+
+    async def profile(self):
+        """ return the optionally attached profile """
+        if self._profile is None:
+            profile_id = self.data.get('profile_id')
+            if not profile_id is None:
+                self._profile = await self._by_exact_key(Profile, 'id', profile_id)
+        return self._profile
+
+    async def delete(self):
+        creatives = [c async for c in self.creatives()]
+        await super(AsyncCampaign, self).delete()
+        dependents = creatives + list(self._old_profiles or ())
+        if self._profile:
+            dependents.append(self._profile)
+        await asyncio.gather(*(item.delete() for item in dependents))
+
+
+@async_counterpart(LineItem)
+class AsyncLineItem(AsyncService, LineItem):
+    __slots__ = ()
+
+    async def profile(self):
+        """ return the optionally attached profile """
+        profile_id = self.data.get('profile_id')
+        if not profile_id is None:
+            return await self._by_exact_key(Profile, 'id', profile_id)
+
+    async def campaigns(self, fields=None, records=False):
+        """ return all campaigns, with summaries of only these fields for the saved ones """
+        campaign_refs = self.data.get('campaigns') or []
+        async for campaign in self.campaigns_by_ids((c['id'] for c in campaign_refs), fields, records):
+            yield campaign
+        for campaign in self._new_campaigns():
+            yield campaign
+
+    async def campaign_by_code(self, code):
+        """ return the first campaign that matches the code """
+        return await first(c async for c in self.campaigns() if c.code == code)
+
+    async def delete(self):
+        campaigns = [c async for c in self.campaigns()]
+        await super(AsyncLineItem, self).delete()
+        await asyncio.gather(*(c.delete() for c in campaigns))
+
+
+@async_counterpart(InsertionOrder)
+class AsyncInsertionOrder(AsyncService, InsertionOrder):
+    __slots__ = ()
+
+    async def line_items(self, fields=None, records=False):
+        """ return all line_items, with summaries of only these fields for the saved ones """
+        line_item_refs = self.data.get('line_items') or []
+        async for line_item in self.line_items_by_ids((li['id'] for li in line_item_refs), fields, records):
+            yield line_item
+        for line_item in self._new_line_items():
+            yield line_item
+
+
+@async_counterpart(Advertiser)
+class AsyncAdvertiser(AsyncService, Advertiser):
+    __slots__ = ()
+
+    async def profile(self):
+        """ return the optionally attached profile """
+        profile_id = self.data.get('profile_id')
+        if not profile_id is None:
+            return await self._by_exact_key(Profile, 'id', profile_id)
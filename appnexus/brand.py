@@ -3,3 +3,4 @@ from .service import Service
 class Brand(Service):
     service_name = 'brand'
     collection_name = 'brands'
+    __slots__ = ()
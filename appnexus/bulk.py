@@ -0,0 +1,79 @@
+from concurrent.futures import ThreadPoolExecutor
+import logging
+
+
+class BulkSaveResult(object):
+    """ the outcome of a bulk save, per item:
+    saved: items that were saved
+    failed: (item, exception) pairs for items whose save raised
+    skipped: items that were not saved because one of their dependencies failed
+    """
+    def __init__(self):
+        self.saved = []
+        self.failed = []
+        self.skipped = []
+
+    @property
+    def ok(self):
+        return not (self.failed or self.skipped)
+
+    def __repr__(self):
+        return "<BulkSaveResult saved={} failed={} skipped={}>".format(
+            len(self.saved), len(self.failed), len(self.skipped))
+
+
+def save_levels(items):
+    """ group items and their unsaved dependencies by level: items without
+    dependencies first, then the items that depend only on those, and so on.
+    returns the levels and the dependencies of each item by id()
+    """
+    levels = []
+    heights = {}
+    dependencies = {}
+
+    def visit(item):
+        key = id(item)
+        if key not in heights:
+            children = item._dependencies()
+            dependencies[key] = children
+            height = max([visit(child) + 1 for child in children] or [0])
+            heights[key] = height
+            while len(levels) <= height:
+                levels.append([])
+            levels[height].append(item)
+        return heights[key]
+
+    for item in items:
+        visit(item)
+    return levels, dependencies
+
+
+def bulk_save(items, workers=8):
+    """ save items with their unsaved dependencies, such as new insertion orders
+    with their new line items, campaigns, creatives and profiles. The items of each
+    level of the dependency graph are saved concurrently with up to workers threads,
+    and saved children are referenced in their parents like item.save() does.
+    returns a BulkSaveResult
+    """
+    result = BulkSaveResult()
+    levels, dependencies = save_levels(items)
+    failed = set()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for level in levels:
+            futures = []
+            for item in level:
+                deps = dependencies[id(item)]
+                if any(id(dep) in failed for dep in deps):
+                    failed.add(id(item))
+                    result.skipped.append(item)
+                    continue
+                futures.append((item, executor.submit(item._save_with, deps)))
+            for item, future in futures:
+                try:
+                    future.result()
+                    result.saved.append(item)
+                except Exception as e:
+                    logging.error("unable to save {} {}: {}".format(item.service_name, item.name, e))
+                    failed.add(id(item))
+                    result.failed.append((item, e))
+    return result
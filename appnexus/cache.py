@@ -0,0 +1,66 @@
+from collections import OrderedDict
+import threading
+from time import time
+
+
+class IdentityMap(object):
+    """ remembers items looked up by an exact key (id or code), so that looking them
+    up again returns the same object without a request. Entries expire after ttl
+    seconds, and the least recently used are dropped beyond max_size entries.
+    """
+    def __init__(self, max_size=1000, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """ an identity map if 'cache_size' or 'cache_ttl' is configured, else None """
+        if config.get('cache_size') or config.get('cache_ttl'):
+            return cls(max_size=config.get('cache_size', 1000), ttl=config.get('cache_ttl', 300))
+
+    @staticmethod
+    def key(service_name, key_name, key_value, scope):
+        """ the key of an item looked up by key_name, within a scope: None for lookups of
+        the Resource, or the (service_name, id) of the item whose children were looked up
+        """
+        return (service_name, key_name, str(key_value), scope)
+
+    def get(self, key):
+        """ the item remembered for this key, or None """
+        with self._lock:
+            entry = self._items.pop(key, None)
+            if entry is None or entry[1] < time():
+                self.misses += 1
+                return None
+            # reinsert as most recently used
+            self._items[key] = entry
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, item):
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = (item, time() + self.ttl)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def invalidate(self, item):
+        """ forget an item by its id and code, in every scope, after it changed remotely """
+        keys = set(
+            (item.service_name, key_name, str(item._data[key_name]))
+            for key_name in ('id', 'code') if item._data.get(key_name) is not None
+        )
+        with self._lock:
+            for key in [k for k in self._items if isinstance(k, tuple) and k[:3] in keys]:
+                del self._items[key]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._items)}
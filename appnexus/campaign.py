@@ -6,26 +6,42 @@ from .profile import Profile
 class Campaign(SubService):
     service_name = 'campaign'
     collection_name = 'campaigns'
+    creative_summary_keys = (
+        "audit_status", "code", "format", "height", "id", "is_expired",
+        "is_prohibited", "is_self_audited", "name", "pop_window_maximize",
+        "state", "weight", "width"
+    )
+    __slots__ = ('_creatives', '_profile', '_old_profiles')
 
     def __init__(self,  *args, **kwargs):
         super(Campaign, self).__init__(*args, **kwargs)
-        self._creatives = []
+        # created creatives and replaced profiles, lists once there are any
+        self._creatives = None
         self._profile = None
-        self.old_profiles = []
+        self._old_profiles = None
+
+    @property
+    def old_profiles(self):
+        """ the profiles replaced by create_profile, deleted when the campaign is saved """
+        if self._old_profiles is None:
+            self._old_profiles = []
+        return self._old_profiles
 
     def _new_creatives(self):
-        return [c for c in self._creatives if c.id is None]
-
-    def creatives(self):
-        """ return all creatives """
-        creative_refs = self.data.get('creatives') or []
-        remote_creatives = self._by_ids(
-            CreativeHtml,
-            [c['id'] for c in creative_refs],
-            override_collection_name='creative-html'
-        )
+        return [c for c in self._creatives or () if c.id is None]
+
+    def creatives(self, fields=None, records=False):
+        """ return all creatives, with summaries of only these fields for the saved ones """
+        remote_creatives = self._prefetched('creatives')
+        if remote_creatives is None:
+            creative_refs = self.data.get('creatives') or []
+            remote_creatives = self.creatives_by_ids((c['id'] for c in creative_refs), fields, records)
         return chain(remote_creatives, self._new_creatives())
 
+    def creatives_by_ids(self, creative_ids, fields=None, records=False):
+        """ return an iterator for creatives with these ids """
+        return self._by_ids(CreativeHtml, creative_ids, override_collection_name='creative-html', fields=fields, records=records)
+
     def creative_by_code(self, creative_code):
         """ return the first creative that matches the code """
         return self._by_exact_key(CreativeHtml, 'code', creative_code)
@@ -39,14 +55,16 @@ class Campaign(SubService):
         if self._profile is None:
             profile_id = self.data.get('profile_id')
             if not profile_id is None:
-                self._profile = self._by_exact_key(Profile, 'id', profile_id)
+                self._profile = self._prefetched('profile') or self._by_exact_key(Profile, 'id', profile_id)
         return self._profile
 
     def create_creative(self, name, **kwargs):
         """ create a new creative """
         data = { 'name': name, 'advertiser_id': self.advertiser_id }
         data.update(kwargs)
-        creative = CreativeHtml(self._client, data=data)
+        creative = self._service_class(CreativeHtml)(self._client, data=data)
+        if self._creatives is None:
+            self._creatives = []
         self._creatives.append(creative)
         return creative
 
@@ -56,27 +74,30 @@ class Campaign(SubService):
         data.update(kwargs)
         if self._profile:
             self.old_profiles.append(self._profile)
-        self._profile = Profile(self._client, data=data)
+        self._profile = self._service_class(Profile)(self._client, data=data)
         return self._profile
 
-    def save(self):
-        existing_creatives = self.data.get('creatives', []) or []
-        for cr in self._new_creatives():
-            cr.save()
-            cr_summary = {k:cr.data.get(k) for k in (
-                "audit_status", "code", "format", "height", "id", "is_expired",
-                "is_prohibited", "is_self_audited", "name", "pop_window_maximize",
-                "state", "weight", "width")}
-            existing_creatives.append(cr_summary)
-        self.data['creatives'] = existing_creatives
+    def _dependencies(self):
+        dependencies = self._new_creatives()
+        if self._profile:
+            dependencies.append(self._profile)
+        return dependencies
+
+    def _merge_dependencies(self, saved):
+        creatives = [cr for cr in saved if cr is not self._profile]
+        if creatives:
+            existing_creatives = self.data.get('creatives', []) or []
+            for cr in creatives:
+                cr_summary = {k:cr.data.get(k) for k in self.creative_summary_keys}
+                existing_creatives.append(cr_summary)
+            self.data['creatives'] = existing_creatives
         if self._profile:
-            self._profile.save()
             self.data['profile_id'] = self._profile.id
+
+    def _discarded(self):
         #remove replaced profile(s)
-        for p in self.old_profiles:
-            p.delete()
-        self.old_profiles = []
-        super(Campaign, self).save()
+        old_profiles, self._old_profiles = self._old_profiles or [], None
+        return old_profiles
 
     def delete(self):
         super(Campaign, self).delete()
@@ -84,7 +105,7 @@ class Campaign(SubService):
             c.delete()
         if self._profile:
             self._profile.delete()
-        for p in self.old_profiles:
+        for p in self._old_profiles or ():
             p.delete()
  
 
@@ -0,0 +1,75 @@
+from bisect import bisect_left
+import gzip
+import json
+import os
+from time import time
+
+
+class Catalog(object):
+    """ all items of a rarely changing service, such as brands or categories, held in
+    memory with indexes by id, exact name and lower case name prefix
+    """
+    def __init__(self, service, rows, client=None, fetched=None):
+        self.service = service
+        self.fetched = fetched or time()
+        self._client = client
+        self._rows = rows
+        self._by_id = {}
+        self._by_name = {}
+        for row in rows:
+            self._by_id[row['id']] = row
+            self._by_name.setdefault(row.get('name'), row)
+        prefixes = sorted(((row.get('name') or '').lower(), i) for i, row in enumerate(rows))
+        self._names = [name for name, i in prefixes]
+        self._name_rows = [rows[i] for name, i in prefixes]
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _item(self, row):
+        return self.service(client=self._client, data=dict(row))
+
+    def by_id(self, item_id):
+        """ the item with this id, or None """
+        try:
+            row = self._by_id.get(int(item_id))
+        except (TypeError, ValueError):
+            return None
+        return self._item(row) if row else None
+
+    def by_name(self, name):
+        """ the first item with exactly this name, or None """
+        row = self._by_name.get(name)
+        return self._item(row) if row else None
+
+    def by_prefix(self, prefix, limit=None):
+        """ the items whose name starts with prefix, ignoring case, ordered by name """
+        prefix = prefix.lower()
+        items = []
+        i = bisect_left(self._names, prefix)
+        while i < len(self._names) and self._names[i].startswith(prefix):
+            if limit is not None and len(items) >= limit:
+                break
+            items.append(self._item(self._name_rows[i]))
+            i += 1
+        return items
+
+    def age(self):
+        return time() - self.fetched
+
+    def save(self, path):
+        """ write a gzipped json snapshot of the catalog """
+        tmp = "{}.{}.tmp".format(path, os.getpid())
+        with gzip.open(tmp, 'wt') as f:
+            json.dump({'fetched': self.fetched, 'items': self._rows}, f, separators=(',', ':'))
+        os.rename(tmp, path)
+
+    @classmethod
+    def load(cls, path, service, client=None):
+        """ the catalog in a snapshot, or None if there is none """
+        try:
+            with gzip.open(path, 'rt') as f:
+                snapshot = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        return cls(service, snapshot['items'], client, snapshot['fetched'])
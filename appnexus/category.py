@@ -3,3 +3,4 @@ from .service import Service
 class Category(Service):
     service_name = 'category'
     collection_name = 'categories'
+    __slots__ = ()
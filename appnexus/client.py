@@ -1,85 +1,238 @@
-import requests
 from requests.compat import urljoin
 import logging
 from time import time
 import json
-import os
+import threading
 
 from .exceptions import (
     AuthException,
     ApiException,
-    NotFoundException
+    NotFoundException,
+    RateLimitException
 )
+from .retry import RetryPolicy
+from .session import pooled_session
+from .throttle import RateLimiter, is_throttled
+from .token_store import token_store
+from .cache import IdentityMap
+from .mirror import Mirror
+from .stream import StreamedResponse
+from .upload import MultipartFile
+from .metrics import Instrumentation
+
+
+def checked_response(r, res):
+    """ return the api response of a request, or raise the exception matching the
+    HTTP or API error. r is the http response, res its decoded 'response' body
+    """
+    if res.get('status') == "OK":
+        return res
+    if is_throttled(r, res):
+        raise RateLimitException("rate limit exceeded ({})".format(r.url))
+    r.raise_for_status()
+    errid = res.get('error_id') or ""
+    error = res.get('error') or ""
+    errdesc = res.get('error_description') or ""
+    if errid.upper() == "SYNTAX" and "NOT FOUND" in error.upper():
+        raise NotFoundException(r.url)
+    raise ApiException("{}: {} {} ({})".format(errid, error, errdesc, r.url))
+
+
+def response_body(r):
+    """ the decoded 'response' body of an http response, empty when it is not json,
+    like the html error pages of a degraded api
+    """
+    try:
+        return r.json().get('response', {})
+    except ValueError:
+        return {}
 
 
 class AppNexusClient(object):
     TEST_URI = "https://api-test.appnexus.com"
     PROD_URI = "https://api.appnexus.com"
     CONTENT_HDR = {'Content-type': 'application/json; charset=UTF-8'}
+    page_workers = 1  # number of pages the paginator fetches concurrently
+    token_lifetime = 6600  # seconds; tokens are valid for 2 hours
+    identity_map = None  # cache of items looked up by id or code
+    mirror = None  # local SQLite copy of items, for lookups by id, code or name
+    stream_pages = False  # whether the paginator parses pages as they download
+    stream_chunk_size = 65536
+    download_chunk_size = 1048576  # bytes data_get reads at a time
 
     def __init__(self, config):
         """ Basic low level wrapper for the app nexus REST API """
         self._config = config
         self.env = self._config.get('env')
-        self.uri = self.PROD_URI if self.env == "prod" else self.TEST_URI
+        self.uri = self._config.get('api_uri') or (self.PROD_URI if self.env == "prod" else self.TEST_URI)
         self._token = None
         self._token_last_fetched = 0  # seconds since epoch
-        self._auth_retried = False
-        self.refresh_from_memcache = False
-        self._token_file = self._config.get('token_file')
-        self._memcache_host = self._config.get('memcache_host')
-        self._memcache_port = self._config.get('memcache_port')
-        # check if we have a filesystem stored token
-        if self._token_file and os.path.exists(self._token_file):
-            logging.info("auth from file")
-            self._token_last_fetched = os.path.getmtime(self._token_file)
-            with open(self._token_file) as f:
-                self._token = f.read().strip()
-        # check if we have a memcache stored token
-        elif self._memcache_host and self._memcache_port:
-            logging.info("auth from memcache")
-            self.refresh_from_memcache = True
-            import memcache
-            self.mcache = memcache.Client(["{}:{}".format(self._memcache_host, self._memcache_port)])
+        self.page_workers = self._config.get('page_workers', self.page_workers)
+        self.rate_limiter = RateLimiter.from_config(self._config)
+        # resends requests that failed with connection errors or 5xx responses
+        self.retry_policy = RetryPolicy.from_config(self._config)
+        self.token_lifetime = self._config.get('token_lifetime', self.token_lifetime)
+        self.identity_map = IdentityMap.from_config(self._config)
+        self.mirror = Mirror.from_config(self._config)
+        # request hooks, and the metrics collected by them
+        self.instrumentation = Instrumentation.from_config(self._config)
+        self.metrics = self.instrumentation.metrics
+        self.stream_pages = self._config.get('stream_pages', self.stream_pages)
+        self.stream_chunk_size = self._config.get('stream_chunk_size', self.stream_chunk_size)
+        self.download_chunk_size = self._config.get('download_chunk_size', self.download_chunk_size)
+        # file, memcache or in-process store shared with other clients
+        self._token_store = token_store(self._config, self.token_lifetime, self.uri)
+        self._token_lock = threading.Lock()
+        self._refresh_timer = None
+        self._closed = False
+        # all verbs share one pooled keep-alive session
+        self._session = pooled_session(self._config)
         # for easier dependency injection
-        self._get = requests.get
-        self._put = requests.put
-        self._post = requests.post
-        self._delete = requests.delete
+        self._get = self._session.get
+        self._put = self._session.put
+        self._post = self._session.post
+        self._delete = self._session.delete
 
     def __error_checked(reqf):
-        """ decorator to check for AUTH, HTTP or API error response. """
-        reqf._auth_retried = False
+        """ decorator to check for AUTH, HTTP or API error response,
+        resending failed requests as the retry policy allows,
+        calling the instrumentation hooks around the request
+        """
+        kind = 'read' if reqf.__name__ == 'get' else 'write'
+        verb = {'get': 'GET', 'put': 'PUT', 'delete': 'DELETE'}.get(reqf.__name__, 'POST')
+
+        def instrumented_reqf(self, what, *args, **kwargs):
+            send = lambda event: checked_reqf(self, event, False, what, *args, **kwargs)
+            return self.instrumentation.call(verb, what, send)
 
-        def checked_reqf(self, *args, **kwargs):
-            r = reqf(self, *args, **kwargs)
-            res = r.json().get('response', {})
+        def checked_reqf(self, event, auth_retried, *args, **kwargs):
+            # the retry state is kept per call, so threads can share the client
+            token = self.token()
+            paced = lambda: self._paced(kind, lambda: reqf(self, *args, **kwargs), event)
+            r, res = self.retry_policy.call(verb, event.service, paced)
             if res.get('status') == "OK":
                 return res
             if res.get('error_id') == "NOAUTH":
-                if not self.reauth_tried:
+                if not auth_retried:
                     logging.info("re-auth due to noauth response")
-                    self._refresh_token()
-                    self._auth_retried = True
-                    return checked_reqf(self, *args, **kwargs)
+                    self._reauthenticate(token)
+                    return checked_reqf(self, event, True, *args, **kwargs)
                 logging.error("AUTH FAILED TWICE")
-            r.raise_for_status()
-            errid = res.get('error_id')
-            error = res.get('error')
-            errdesc = res.get('error_description') or ""
-            if errid.upper() == "SYNTAX" and "NOT FOUND" in error.upper():
-                raise NotFoundException(r.url)
-            raise ApiException("{}: {} {} ({})".format(errid, error, errdesc, r.url))
-        return checked_reqf
+            return checked_response(r, res)
+        instrumented_reqf.__name__ = reqf.__name__
+        instrumented_reqf.__doc__ = reqf.__doc__
+        return instrumented_reqf
+
+    def _paced(self, kind, send, event=None):
+        """ send a 'read' or 'write' request within the rate limits, resending it
+        while it is throttled. The responses are recorded in the request event.
+        returns the http response and its decoded response body
+        """
+        attempt = 0
+        while True:
+            self.rate_limiter.wait(kind)
+            r = send()
+            if event is not None:
+                event.responded(r)
+            res = response_body(r)
+            if attempt >= self.rate_limiter.max_retries or not is_throttled(r, res):
+                return r, res
+            seconds = self.rate_limiter.back_off(r, attempt)
+            logging.warning("throttled, retrying in {}s ({})".format(seconds, r.url))
+            attempt += 1
 
     def token(self):
         """ get a valid auth token to use in api calls """
-        # fetch the token if it's been more than 1 minute since the last fetch
-        if self._token_last_fetched < (time() - 60):
-            logging.info("re-auth due to time")
-            self._refresh_token()
+        if self._token_stale():
+            # single flight: one thread refreshes, the others wait for its token
+            with self._token_lock:
+                if self._token_stale():
+                    self._sync_token()
         return self._token
 
+    def _token_stale(self, fetched=None):
+        """ whether the token (fetched at this time) has to be fetched again """
+        if fetched is None:
+            fetched = self._token_last_fetched
+        return fetched < (time() - self.token_lifetime)
+
+    def _sync_token(self):
+        """ use the stored token if it is still fresh, or refresh it.
+        Only one holder of the token store refreshes at a time, the others
+        use the token it stored
+        """
+        if self._token_from_store():
+            return
+        with self._token_store.lock():
+            if not self._token_from_store():
+                logging.info("re-auth due to time")
+                self._refresh_token()
+
+    def _token_from_store(self, newer_than=0):
+        """ use the stored token if it is fresh and newer than a fetch time. returns success """
+        token, fetched = self._token_store.load()
+        if token and fetched > newer_than and not self._token_stale(fetched):
+            self._use_token(token, fetched)
+            return True
+        return False
+
+    def _use_token(self, token, fetched):
+        # the token is set first: threads that see the new fetch time use the new token
+        self._token = token
+        self._token_last_fetched = fetched
+        self._schedule_refresh()
+
+    def _refresh_delay(self):
+        """ seconds until the token should be refreshed in the background,
+        or None if 'token_refresh_ahead' is not configured or the client is closed
+        """
+        ahead = self._config.get('token_refresh_ahead')
+        if ahead and not self._closed:
+            return max(0, self._token_last_fetched + self.token_lifetime - ahead - time())
+
+    def _schedule_refresh(self):
+        """ refresh the token in the background, token_refresh_ahead seconds before it expires """
+        delay = self._refresh_delay()
+        if delay is None:
+            return
+        if self._refresh_timer:
+            self._refresh_timer.cancel()
+        self._refresh_timer = threading.Timer(delay, self._refresh_ahead)
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+
+    def close(self):
+        """ stop refreshing the token in the background, and close the pooled connections """
+        with self._token_lock:
+            self._closed = True
+            if self._refresh_timer:
+                self._refresh_timer.cancel()
+                self._refresh_timer = None
+        self._session.close()
+
+    def _reauthenticate(self, rejected):
+        """ replace the rejected token. Of the threads whose requests were rejected,
+        only the first gets a new token; the others use it
+        """
+        with self._token_lock:
+            if self._token != rejected:
+                return
+            fetched = self._token_last_fetched
+            with self._token_store.lock():
+                if not self._token_from_store(newer_than=fetched):
+                    self._refresh_token()
+
+    def _refresh_ahead(self):
+        try:
+            with self._token_lock:
+                fetched = self._token_last_fetched
+                with self._token_store.lock():
+                    if not self._token_from_store(newer_than=fetched):
+                        logging.info("re-auth ahead of expiry")
+                        self._refresh_token()
+        except Exception:
+            logging.exception("background token refresh failed")
+
     def _apiuri(self, term):
         """ prepend the base uri to a term """
         return urljoin(self.uri, term)
@@ -92,36 +245,41 @@ class AppNexusClient(object):
         return headers
 
     def _refresh_token(self):
-        """ gets a token from memcache, if so configured, or goes out to get it from
-        the appnexus auth api. Note that we do NOT attempt to store the token in memcache
-        here; the whole point of memcache is to avoid concurrent auth calls: if memcache is
-        used, there ought to be a separate process to populate it
+        """ gets a token from a read only store (memcache), if so configured, or goes
+        out to get it from the appnexus auth api. Note that by default we do NOT attempt to
+        store the token in memcache here; the whole point of memcache is to avoid concurrent
+        auth calls: if memcache is used, there ought to be a separate process to populate it
         """
-        if self.refresh_from_memcache:
-            key = "appnexus{}".format(self.env)
-            token = self.mcache.get(key)
-            if not token:
-                raise AuthException("Unable to get token from cache with key: {}".format(key))
-            self._token_last_fetched = time()
-            self._token = token
+        if self._token_store.read_only:
+            self._token_from_read_only_store()
         else:
-            u = self._config.get('username')
-            p = self._config.get('password')
-            if not u and p:
-                raise AuthException("username and/or password not set in config")
-            data = json.dumps({'auth': {'username': u, 'password': p}})
             uri = self._apiuri('auth')
-            res = self._post(uri, data=data, headers=self.CONTENT_HDR).json()['response']
-            if res.get('status') == "OK":
-                self._token = res['token']
-                self._token_last_fetched = time()
-                logging.info("new token: [{}] @ {}".format(self._token, self._token_last_fetched))
-                if self._token_file:
-                    with open(self._token_file, 'w') as f:
-                        f.write(self._token)
-            else:
-                raise AuthException("Unable to refresh token: {}".format(json.dumps(res, indent=4)))
+            res = self._post(uri, data=self._auth_data(), headers=self.CONTENT_HDR).json()['response']
+            self._set_token(res)
+
+    def _token_from_read_only_store(self):
+        """ use the token another process stored """
+        token, fetched = self._token_store.load()
+        if not token:
+            raise AuthException("Unable to get token from read only token store")
+        self._use_token(token, fetched)
+
+    def _auth_data(self):
+        """ the serialized credentials to post to the auth api """
+        u = self._config.get('username')
+        p = self._config.get('password')
+        if not u and p:
+            raise AuthException("username and/or password not set in config")
+        return json.dumps({'auth': {'username': u, 'password': p}})
 
+    def _set_token(self, res):
+        """ store the token from an auth api response """
+        if res.get('status') == "OK":
+            self._use_token(res['token'], time())
+            logging.info("new token: [{}] @ {}".format(self._token, self._token_last_fetched))
+            self._token_store.save(self._token, self._token_last_fetched)
+        else:
+            raise AuthException("Unable to refresh token: {}".format(json.dumps(res, indent=4)))
 
     @__error_checked
     def upload(self, where, data, name, headers=None):
@@ -134,16 +292,98 @@ class AppNexusClient(object):
         logging.info("POST {}".format(uri))
         return self._post(uri, headers=headers, files={'file': (name, data)}, data={'type': 'html'})
 
-    def data_get(self, what, headers=None):
-        """ basic api get request that returns binary data
+    @__error_checked
+    def upload_file(self, where, path, name, headers=None):
+        """ basic api post request that uploads a file, streamed from disk """
+        if not headers:
+            headers = {}
+        headers['Authorization'] = self.token()
+        body = MultipartFile(path, name, {'type': 'html'})
+        headers['Content-Type'] = body.content_type
+
+        uri = self._apiuri(where)
+        logging.info("POST {} ({})".format(uri, path))
+        try:
+            return self._post(uri, headers=headers, data=body)
+        finally:
+            body.close()
+
+    def data_get(self, what, headers=None, chunk_size=None):
+        """ basic api get request that returns binary data, downloaded as it is read
+            in chunks of chunk_size (default: the client's download_chunk_size) bytes
             Returns: an iterator for the data
         """
         uri = self._apiuri(what)
         headers = self._apihdr(headers)
         logging.info("GET {}".format(uri))
-        r = self._get(uri, headers=headers)
-        r.raise_for_status()
-        return r.iter_content(chunk_size=1024)
+
+        def send(event):
+            def fetch():
+                self.rate_limiter.wait('read')
+                r = self._get(uri, headers=headers, stream=True)
+                event.responded(r)
+                return (r,)
+            r, = self.retry_policy.call('GET', event.service, self._streamed_attempts(fetch))
+            r.raise_for_status()
+            return r.iter_content(chunk_size=chunk_size or self.download_chunk_size)
+        return self.instrumentation.call('GET', what, send)
+
+    def _streamed_attempts(self, fetch):
+        """ fetch() for the retry policy, closing the streamed response of the
+        previous, failed attempt before the next one
+        """
+        previous = []
+
+        def attempt():
+            while previous:
+                previous.pop().close()
+            result = fetch()
+            previous.append(result[0])
+            return result
+        return attempt
+
+    def get_stream(self, what, collection_name, headers=None):
+        """ api get request for a collection that is parsed as it downloads.
+            Returns: a StreamedResponse, whose items() generates the collection
+        """
+        uri = self._apiuri(what)
+        logging.info("GET {}".format(uri))
+
+        def send(event):
+            auth_retried = False
+            attempt = 0
+            while True:
+                request_headers = self._apihdr(headers)
+                def fetch():
+                    self.rate_limiter.wait('read')
+                    r = self._get(uri, headers=request_headers, stream=True)
+                    event.responded(r)
+                    return (r,)
+                r, = self.retry_policy.call('GET', event.service, self._streamed_attempts(fetch))
+                streamed = None
+                if r.status_code >= 400:
+                    # error bodies, like the html pages of a degraded api, are not streamed
+                    res = response_body(r)
+                else:
+                    streamed = StreamedResponse(r, collection_name, self.stream_chunk_size)
+                    if streamed.start():
+                        return streamed
+                    # without items, the whole response has been read
+                    res = streamed.envelope
+                if res.get('error_id') == "NOAUTH" and not auth_retried:
+                    logging.info("re-auth due to noauth response")
+                    self._reauthenticate(request_headers['Authorization'])
+                    auth_retried = True
+                    continue
+                if is_throttled(r, res) and attempt < self.rate_limiter.max_retries:
+                    seconds = self.rate_limiter.back_off(r, attempt)
+                    logging.warning("throttled, retrying in {}s ({})".format(seconds, r.url))
+                    attempt += 1
+                    continue
+                checked_response(r, res)
+                r.raise_for_status()
+                return streamed
+        return self.instrumentation.call('GET', what, send)
 
     @__error_checked
     def get(self, what, headers=None):
@@ -159,7 +399,8 @@ class AppNexusClient(object):
         uri = self._apiuri(what)
         headers = self._apihdr(headers)
         data = json.dumps(data)
-        logging.info("POST {}: {}".format(uri, data))
+        logging.info("POST %s", uri)
+        logging.debug("POST %s: %s", uri, data)
         return self._post(uri, data=data, headers=headers)
 
     @__error_checked
@@ -168,7 +409,8 @@ class AppNexusClient(object):
         uri = self._apiuri(what)
         headers = self._apihdr(headers)
         data = json.dumps(data)
-        logging.info("PUT {}: {}".format(uri, data))
+        logging.info("PUT %s", uri)
+        logging.debug("PUT %s: %s", uri, data)
         return self._put(uri, data=data, headers=headers)
 
     @__error_checked
@@ -2,6 +2,7 @@ from .sub_service import SubService
 class CreativeHtml(SubService):
     service_name = 'creative-html'
     collection_name = 'creatives'
+    __slots__ = ()
 
     def deactivate(self):
         """ sets the creative state to inactive """
@@ -14,11 +15,8 @@ class CreativeHtml(SubService):
                     }
                 }
             }
-            res = self._client.put('{service_name}?id={id}&advertiser_id={advertiser_id}'.format(
-                service_name=self.service_name,
-                id=self.data['id'],
-                advertiser_id=self.data['advertiser_id'],
-            ), payload)
-            self.data.update(res[self.service_name])
+            res = self._client.put(self._item_term(), payload)
+            self._saved_as(res[self.service_name])
+            self._forget()
 
         return True
\ No newline at end of file
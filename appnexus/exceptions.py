@@ -1,13 +1,33 @@
 class DataException(Exception):
     pass
 
+
 class AuthException(Exception):
     pass
 
+
 class ApiException(Exception):
     pass
 
+
 class NotFoundException(Exception):
     pass
 
 
+class RateLimitException(ApiException):
+    pass
+
+
+class CircuitOpenException(ApiException):
+    pass
+
+
+class ShardException(ApiException):
+    """ the errors of the advertisers whose jobs failed, by advertiser id,
+    and the results of the others
+    """
+    def __init__(self, errors, results=None):
+        super(ShardException, self).__init__("jobs failed for {} advertisers: {}".format(
+            len(errors), ", ".join(str(i) for i in sorted(errors, key=str))))
+        self.errors = errors
+        self.results = results or {}
@@ -0,0 +1,147 @@
+import csv
+import json
+
+# service_name -> ((column, type), ...), type being 'int', 'float', 'bool' or 'string'.
+# dates are kept as the api's strings, nested values are exported as json
+SCHEMAS = {
+    'advertiser': (
+        ('id', 'int'), ('code', 'string'), ('name', 'string'), ('state', 'string'),
+        ('timezone', 'string'), ('last_modified', 'string'),
+    ),
+    'insertion-order': (
+        ('id', 'int'), ('advertiser_id', 'int'), ('code', 'string'), ('name', 'string'),
+        ('state', 'string'), ('start_date', 'string'), ('end_date', 'string'),
+        ('last_modified', 'string'),
+    ),
+    'line-item': (
+        ('id', 'int'), ('advertiser_id', 'int'), ('code', 'string'), ('name', 'string'),
+        ('state', 'string'), ('start_date', 'string'), ('end_date', 'string'),
+        ('revenue_type', 'string'), ('revenue_value', 'float'), ('profile_id', 'int'),
+        ('last_modified', 'string'),
+    ),
+    'campaign': (
+        ('id', 'int'), ('advertiser_id', 'int'), ('line_item_id', 'int'), ('code', 'string'),
+        ('name', 'string'), ('state', 'string'), ('start_date', 'string'), ('end_date', 'string'),
+        ('cpm_bid_type', 'string'), ('base_bid', 'float'), ('profile_id', 'int'),
+        ('last_modified', 'string'),
+    ),
+    'creative-html': (
+        ('id', 'int'), ('advertiser_id', 'int'), ('code', 'string'), ('name', 'string'),
+        ('state', 'string'), ('width', 'int'), ('height', 'int'), ('audit_status', 'string'),
+        ('last_modified', 'string'),
+    ),
+    'profile': (
+        ('id', 'int'), ('advertiser_id', 'int'), ('code', 'string'), ('description', 'string'),
+        ('last_modified', 'string'),
+    ),
+    'brand': (
+        ('id', 'int'), ('name', 'string'), ('category_id', 'int'), ('is_premium', 'bool'),
+    ),
+    'category': (
+        ('id', 'int'), ('name', 'string'), ('is_sensitive', 'bool'), ('last_modified', 'string'),
+    ),
+}
+
+ARROW_TYPES = {'int': 'int64', 'float': 'float64', 'bool': 'bool_', 'string': 'string'}
+
+
+def _string(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+CONVERTERS = {'int': int, 'float': float, 'bool': bool, 'string': _string}
+
+
+def schema(service, columns=None):
+    """ the (column, type) pairs to export for a service, or only these columns of it """
+    declared = SCHEMAS[service.service_name]
+    if columns is None:
+        return declared
+    types = dict(declared)
+    return tuple((column, types.get(column, 'string')) for column in columns)
+
+
+def columns(service):
+    """ the column names of a service, e.g. to list only those with fields= """
+    return [column for column, kind in SCHEMAS[service.service_name]]
+
+
+def _value(data, column, kind):
+    value = data.get(column)
+    if value is None or value == '':
+        return None
+    try:
+        return CONVERTERS[kind](value)
+    except (TypeError, ValueError):
+        return None
+
+
+def batches(items, service, columns=None, batch_size=10000):
+    """ generates the items as dicts of column name -> list of values, batch_size items at a time """
+    pairs = schema(service, columns)
+    batch = dict((column, []) for column, kind in pairs)
+    count = 0
+    for item in items:
+        for column, kind in pairs:
+            batch[column].append(_value(item._data, column, kind))
+        count += 1
+        if count == batch_size:
+            yield batch
+            batch = dict((column, []) for column, kind in pairs)
+            count = 0
+    if count:
+        yield batch
+
+
+def write_csv(items, f, service, columns=None, batch_size=10000):
+    """ write the items as csv with a header row to an open text file.
+    returns the number of rows written
+    """
+    pairs = schema(service, columns)
+    names = [column for column, kind in pairs]
+    writer = csv.writer(f)
+    writer.writerow(names)
+    rows = 0
+    for batch in batches(items, service, columns, batch_size):
+        writer.writerows(zip(*(batch[name] for name in names)))
+        rows += len(batch[names[0]])
+    return rows
+
+
+def arrow_schema(service, columns=None):
+    """ the pyarrow schema of a service """
+    import pyarrow as pa
+    return pa.schema([(column, getattr(pa, ARROW_TYPES[kind])()) for column, kind in schema(service, columns)])
+
+
+def record_batches(items, service, columns=None, batch_size=10000):
+    """ generates pyarrow RecordBatches of the items """
+    import pyarrow as pa
+    arrow = arrow_schema(service, columns)
+    for batch in batches(items, service, columns, batch_size):
+        yield pa.RecordBatch.from_arrays([pa.array(batch[f.name], type=f.type) for f in arrow], schema=arrow)
+
+
+def write_arrow(items, path, service, columns=None, batch_size=10000):
+    """ write the items to an Arrow IPC file. returns the number of rows written """
+    import pyarrow as pa
+    rows = 0
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, arrow_schema(service, columns)) as writer:
+            for batch in record_batches(items, service, columns, batch_size):
+                writer.write_batch(batch)
+                rows += batch.num_rows
+    return rows
+
+
+def write_parquet(items, path, service, columns=None, batch_size=10000):
+    """ write the items to a Parquet file, a row group per batch. returns the number of rows written """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    rows = 0
+    with pq.ParquetWriter(path, arrow_schema(service, columns)) as writer:
+        for batch in record_batches(items, service, columns, batch_size):
+            writer.write_table(pa.Table.from_batches([batch]))
+            rows += batch.num_rows
+    return rows
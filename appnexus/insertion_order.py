@@ -6,13 +6,15 @@ from .paginator import paginator
 class InsertionOrder(SubService):
     service_name = 'insertion-order'
     collection_name = 'insertion-orders'
+    line_item_summary_keys = ('id', 'name', 'code', 'state', 'start_date', 'end_date', 'timezone')
+    __slots__ = ('_line_items',)
 
     def __init__(self,  *args, **kwargs):
         super(InsertionOrder, self).__init__(*args, **kwargs)
-        self._line_items = []
+        self._line_items = None  # created line items, a list once there are any
 
     def _new_line_items(self):
-        return [li for li in self._line_items if li.id is None]
+        return [li for li in self._line_items or () if li.id is None]
 
     def budget_by_dates(self, start, end, tz):
         """ get a budget matching the start and end date
@@ -36,16 +38,19 @@ class InsertionOrder(SubService):
             'insertion_orders': [ { 'id': self.id }],
         }
         data.update(kwargs)
-        line_item = LineItem(self._client, data=data)
+        line_item = self._service_class(LineItem)(self._client, data=data)
         line_item.update_budgets(self.data.get('budget_intervals', []))
+        if self._line_items is None:
+            self._line_items = []
         self._line_items.append(line_item)
         return line_item
 
-    def line_items(self):
-        """ return all line_items """
-        line_item_refs = self.data.get('line_items') or []
-        print("refs: {}".format(line_item_refs))
-        remote_line_items = self.line_items_by_ids(li['id'] for li in line_item_refs)
+    def line_items(self, fields=None, records=False):
+        """ return all line_items, with summaries of only these fields for the saved ones """
+        remote_line_items = self._prefetched('line_items')
+        if remote_line_items is None:
+            line_item_refs = self.data.get('line_items') or []
+            remote_line_items = self.line_items_by_ids((li['id'] for li in line_item_refs), fields, records)
         return chain(remote_line_items, self._new_line_items())
 
     def line_item_by_name(self, name):
@@ -60,28 +65,19 @@ class InsertionOrder(SubService):
         """ return the line_item with this id, or None if not found """
         return self._by_exact_key(LineItem, 'id', line_item_id)
 
-    def line_items_by_ids(self, line_item_ids):
+    def line_items_by_ids(self, line_item_ids, fields=None, records=False):
         """ return an iterator for line items with these ids """
-        return self._by_ids(LineItem, line_item_ids)
+        return self._by_ids(LineItem, line_item_ids, fields=fields, records=records)
 
+    def _dependencies(self):
+        return self._new_line_items()
 
-    def save(self):
-        """ creates or updates the item remotely """
-        advid = self.advertiser_id
+    def _merge_dependencies(self, saved):
+        if not saved:
+            return
         existing_line_items = self.data.get('line_items', []) or []
-        for li in self._new_line_items():
-            li.save()
-            li_summary = {k:li.data.get(k) for k in ('id', 'name', 'code', 'state', 'start_date', 'end_date', 'timezone')}
+        for li in saved:
+            li_summary = {k:li.data.get(k) for k in self.line_item_summary_keys}
             existing_line_items.append(li_summary)
         self.data['line_items'] = existing_line_items
 
-        payload = { self.service_name: self.data }
-        if self.data.get('id') is None:
-            #new
-            res = self._client.post('{}?advertiser_id={}'.format(self.service_name, advid), payload)
-        else:
-            #update
-            res = self._client.put('{}?id={}&advertiser_id={}'.format(self.service_name, self.data['id'], advid), payload)
-        self.data.update(res[self.service_name])
-        return True
-
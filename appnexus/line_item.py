@@ -6,13 +6,18 @@ from .campaign import Campaign
 class LineItem(SubService):
     service_name = 'line-item'
     collection_name = 'line-items'
+    campaign_summary_keys = (
+        "cpm_bid_type", "creative_count", "end_date", "id", "inventory_type",
+        "name", "priority", "profile_id", "start_date", "statei"
+    )
+    __slots__ = ('_campaigns',)
 
     def __init__(self,  *args, **kwargs):
         super(LineItem, self).__init__(*args, **kwargs)
-        self._campaigns = []
+        self._campaigns = None  # created campaigns, a list once there are any
 
     def _new_campaigns(self):
-        return [c for c in self._campaigns if c.id is None]
+        return [c for c in self._campaigns or () if c.id is None]
 
     def budget_by_parent_id(self, budget_id):
         budgets = self.data['budget_intervals']
@@ -30,14 +35,20 @@ class LineItem(SubService):
         """ return the optionally attached profile """
         profile_id = self.data.get('profile_id')
         if not profile_id is None:
-            return self._by_exact_key(Profile, 'id', profile_id)
+            return self._prefetched('profile') or self._by_exact_key(Profile, 'id', profile_id)
 
-    def campaigns(self):
-        """ return all campaigns """
-        campaign_refs = self.data.get('campaigns') or []
-        remote_campaigns = self._by_ids(Campaign, [c['id'] for c in campaign_refs])
+    def campaigns(self, fields=None, records=False):
+        """ return all campaigns, with summaries of only these fields for the saved ones """
+        remote_campaigns = self._prefetched('campaigns')
+        if remote_campaigns is None:
+            campaign_refs = self.data.get('campaigns') or []
+            remote_campaigns = self.campaigns_by_ids((c['id'] for c in campaign_refs), fields, records)
         return chain(remote_campaigns, self._new_campaigns())
 
+    def campaigns_by_ids(self, campaign_ids, fields=None, records=False):
+        """ return an iterator for campaigns with these ids """
+        return self._by_ids(Campaign, campaign_ids, fields=fields, records=records)
+
     def campaign_by_code(self, code):
         """ return the first campaign that matches the code """
         return next((c for c in self.campaigns() if c.code == code), None)
@@ -50,21 +61,23 @@ class LineItem(SubService):
         """ create a new campaign """
         data = { 'name': name, 'advertiser_id': self.advertiser_id, 'line_item_id': self.id }
         data.update(kwargs)
-        campaign = Campaign(self._client, data=data)
+        campaign = self._service_class(Campaign)(self._client, data=data)
+        if self._campaigns is None:
+            self._campaigns = []
         self._campaigns.append(campaign)
         return campaign
 
-    def save(self):
+    def _dependencies(self):
+        return self._new_campaigns()
+
+    def _merge_dependencies(self, saved):
+        if not saved:
+            return
         existing_campaigns = self.data.get('campaigns', []) or []
-        for ca in self._new_campaigns():
-            ca.save()
-            ca_summary = {k:ca.data.get(k) for k in (
-                "cpm_bid_type", "creative_count", "end_date", "id", "inventory_type",
-                "name", "priority", "profile_id", "start_date", "statei"
-            )}
+        for ca in saved:
+            ca_summary = {k:ca.data.get(k) for k in self.campaign_summary_keys}
             existing_campaigns.append(ca_summary)
         self.data['campaigns'] = existing_campaigns
-        super(LineItem, self).save()
 
     def delete(self):
         super(LineItem, self).delete()
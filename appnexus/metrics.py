@@ -0,0 +1,182 @@
+from bisect import bisect_left
+import logging
+import socket
+import threading
+from time import time
+
+
+class RequestEvent(object):
+    """ an api request, passed to the instrumentation hooks.
+    status and size are those of the last response; attempts counts the responses,
+    including the throttled or unauthorized ones that were retried
+    """
+    __slots__ = ('verb', 'what', 'service', 'status', 'size', 'attempts', 'started', 'latency', 'error')
+
+    def __init__(self, verb, what):
+        self.verb = verb
+        self.what = what
+        self.service = what.partition('?')[0].split('/')[0]
+        self.status = None
+        self.size = 0
+        self.attempts = 0
+        self.started = time()
+        self.latency = None
+        self.error = None
+
+    @property
+    def retries(self):
+        return max(self.attempts - 1, 0)
+
+    def responded(self, r):
+        """ record a response to the request """
+        self.attempts += 1
+        self.status = r.status_code
+        self.size += response_size(r)
+
+
+def response_size(r):
+    """ the size of a response body: its Content-Length, or the length of the body read """
+    length = r.headers.get('Content-Length')
+    if length:
+        return int(length)
+    content = getattr(r, '_content', None)
+    return len(content) if isinstance(content, bytes) else 0
+
+
+class Instrumentation(object):
+    """ hooks called before each api request, after it succeeded, or after it failed,
+    with its RequestEvent. Exceptions raised by hooks are logged and ignored
+    """
+    def __init__(self):
+        self.hooks = {'before': [], 'after': [], 'error': []}
+        self.metrics = None
+
+    @classmethod
+    def from_config(cls, config):
+        """ instrumentation with the built in hooks the config asks for:
+        'metrics' to collect Metrics, 'statsd_host' (and 'statsd_port', 'statsd_prefix')
+        to send them to StatsD
+        """
+        instrumentation = cls()
+        if config.get('metrics'):
+            instrumentation.metrics = Metrics()
+            instrumentation.add_hook('after', instrumentation.metrics.observe)
+            instrumentation.add_hook('error', instrumentation.metrics.observe)
+        if config.get('statsd_host'):
+            statsd = StatsdHook(config['statsd_host'], config.get('statsd_port', 8125), config.get('statsd_prefix', 'appnexus'))
+            instrumentation.add_hook('after', statsd)
+            instrumentation.add_hook('error', statsd)
+        return instrumentation
+
+    def add_hook(self, when, hook):
+        """ call hook(event) 'before', 'after' or on 'error' of each request """
+        self.hooks[when].append(hook)
+
+    def _run(self, when, event):
+        for hook in self.hooks[when]:
+            try:
+                hook(event)
+            except Exception:
+                logging.exception("{} request hook failed".format(when))
+
+    def started(self, verb, what):
+        event = RequestEvent(verb, what)
+        self._run('before', event)
+        return event
+
+    def finished(self, event):
+        event.latency = time() - event.started
+        self._run('after', event)
+
+    def failed(self, event, error):
+        event.latency = time() - event.started
+        event.error = error
+        self._run('error', event)
+
+    def call(self, verb, what, send):
+        """ send(event) a request, calling the hooks around it """
+        event = self.started(verb, what)
+        try:
+            result = send(event)
+        except Exception as e:
+            self.failed(event, e)
+            raise
+        self.finished(event)
+        return result
+
+
+class Metrics(object):
+    """ request counts, retries, response sizes and latency histograms per service and verb """
+    buckets = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+    def __init__(self, buckets=None):
+        if buckets is not None:
+            self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self.requests = {}  # (service, verb, status) -> count
+        self.errors = {}  # (service, verb) -> count
+        self.retries = {}  # (service, verb) -> count
+        self.sizes = {}  # (service, verb) -> bytes
+        self.latencies = {}  # (service, verb) -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, event):
+        key = (event.service, event.verb)
+        with self._lock:
+            status_key = key + (event.status,)
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+            if event.error is not None:
+                self.errors[key] = self.errors.get(key, 0) + 1
+            self.retries[key] = self.retries.get(key, 0) + event.retries
+            self.sizes[key] = self.sizes.get(key, 0) + event.size
+            histogram = self.latencies.get(key)
+            if histogram is None:
+                histogram = self.latencies[key] = [0] * (len(self.buckets) + 2)
+            histogram[bisect_left(self.buckets, event.latency)] += 1
+            histogram[-1] += event.latency
+
+    def prometheus(self, prefix='appnexus'):
+        """ the metrics in the Prometheus text exposition format """
+        lines = []
+        with self._lock:
+            lines.append("# TYPE {}_requests_total counter".format(prefix))
+            for (service, verb, status), count in sorted(self.requests.items(), key=str):
+                lines.append('{}_requests_total{{service="{}",verb="{}",status="{}"}} {}'.format(
+                    prefix, service, verb, status or '', count))
+            for name, values in (('errors', self.errors), ('retries', self.retries), ('response_bytes', self.sizes)):
+                lines.append("# TYPE {}_{}_total counter".format(prefix, name))
+                for (service, verb), value in sorted(values.items()):
+                    lines.append('{}_{}_total{{service="{}",verb="{}"}} {}'.format(prefix, name, service, verb, value))
+            lines.append("# TYPE {}_request_duration_seconds histogram".format(prefix))
+            for (service, verb), histogram in sorted(self.latencies.items()):
+                labels = 'service="{}",verb="{}"'.format(service, verb)
+                cumulative = 0
+                for bound, count in zip(self.buckets + ('+Inf',), histogram[:-1]):
+                    cumulative += count
+                    lines.append('{}_request_duration_seconds_bucket{{{},le="{}"}} {}'.format(prefix, labels, bound, cumulative))
+                lines.append('{}_request_duration_seconds_sum{{{}}} {}'.format(prefix, labels, histogram[-1]))
+                lines.append('{}_request_duration_seconds_count{{{}}} {}'.format(prefix, labels, cumulative))
+        return "\n".join(lines) + "\n"
+
+
+class StatsdHook(object):
+    """ sends the latency, count, status and size of each request to StatsD over udp """
+    def __init__(self, host, port=8125, prefix='appnexus'):
+        self._address = (host, int(port))
+        self._prefix = prefix
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def __call__(self, event):
+        name = "{}.{}.{}".format(self._prefix, event.service, event.verb.lower())
+        lines = [
+            "{}.latency:{}|ms".format(name, int(event.latency * 1000)),
+            "{}.status_{}:1|c".format(name, event.status or 'none'),
+            "{}.bytes:{}|c".format(name, event.size),
+        ]
+        if event.retries:
+            lines.append("{}.retries:{}|c".format(name, event.retries))
+        if event.error is not None:
+            lines.append("{}.errors:1|c".format(name))
+        try:
+            self._socket.sendto("\n".join(lines).encode('utf-8'), self._address)
+        except socket.error:
+            pass
@@ -0,0 +1,87 @@
+import json
+import sqlite3
+import threading
+
+# lookup keys with a column, and an index, of their own
+MIRRORED_KEYS = ('id', 'code', 'name')
+
+
+class Mirror(object):
+    """ a local copy of items in an SQLite database, indexed by id, code and name
+    (per advertiser). Items are stored as they are looked up, listed into the
+    mirror or saved, and removed when deleted.
+    """
+    def __init__(self, path):
+        self._path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                " service TEXT NOT NULL, id INTEGER NOT NULL, advertiser_id INTEGER,"
+                " code TEXT, name TEXT, data TEXT NOT NULL,"
+                " PRIMARY KEY (service, id))"
+            )
+            for key_name in ('code', 'name', 'advertiser_id'):
+                self._db.execute(
+                    "CREATE INDEX IF NOT EXISTS items_{0} ON items (service, {0})".format(key_name)
+                )
+
+    @classmethod
+    def from_config(cls, config):
+        """ a mirror if a 'mirror_file' is configured, else None """
+        if config.get('mirror_file'):
+            return cls(config['mirror_file'])
+
+    @staticmethod
+    def _row(service_name, data):
+        return (
+            service_name, data['id'], data.get('advertiser_id'),
+            data.get('code'), data.get('name'), json.dumps(data),
+        )
+
+    def get(self, service_name, key_name, key_value, advertiser_id=None):
+        """ the data of the first mirrored item with this key, or None """
+        if key_name not in MIRRORED_KEYS:
+            return None
+        query = "SELECT data FROM items WHERE service = ? AND {} = ?".format(key_name)
+        args = [service_name, key_value]
+        if advertiser_id is not None:
+            query += " AND advertiser_id = ?"
+            args.append(advertiser_id)
+        with self._lock:
+            row = self._db.execute(query + " ORDER BY id LIMIT 1", args).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, item):
+        """ store or replace a saved item """
+        self.put_all(item.service_name, [item])
+
+    def put_all(self, service_name, items):
+        """ store or replace saved items of a service """
+        # _data: reading the items' data does not snapshot it
+        rows = [self._row(service_name, item._data) for item in items if item._data.get('id') is not None]
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def remove(self, item):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM items WHERE service = ? AND id = ?", (item.service_name, item.id))
+
+    def clear(self, service_name=None, advertiser_id=None):
+        """ remove all items, or those of a service and/or advertiser """
+        query = "DELETE FROM items WHERE 1"
+        args = []
+        if service_name is not None:
+            query += " AND service = ?"
+            args.append(service_name)
+        if advertiser_id is not None:
+            query += " AND advertiser_id = ?"
+            args.append(advertiser_id)
+        with self._lock, self._db:
+            self._db.execute(query, args)
+
+    def count(self, service_name):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM items WHERE service = ?", (service_name,)).fetchone()[0]
@@ -1,12 +1,50 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from requests.compat import quote_plus
+from .exceptions import NotFoundException
 
-def paginator(client, term, collection_name, cls):
-    """ returns a generator that fetches elements as needed """
+
+def fields_term(term, fields):
+    """ limit the fields the api returns for a term to these, and the id """
+    if not fields:
+        return term
+    fields = list(fields)
+    if 'id' not in fields:
+        fields.insert(0, 'id')
+    separator = '&' if '?' in term else '?'
+    return '{}{}fields={}'.format(term, separator, ','.join(quote_plus(f) for f in fields))
+
+
+def paginator(client, term, collection_name, cls, workers=None, max_pending=None, fields=None, stream=None):
+    """ returns a generator that fetches elements as needed.
+    With more than one worker (default: the client's page_workers), the pages
+    after the first one are fetched concurrently, with at most max_pending
+    (default: twice the number of workers) pages in flight at any time.
+    fields limits the data returned for each element.
+    With stream (default: the client's stream_pages), pages are fetched one at a
+    time and their elements are decoded as they download.
+    """
+    workers = workers or client.page_workers
+    term = fields_term(term, fields)
+    if stream or (stream is None and client.stream_pages):
+        for item in _streamed(client, term, collection_name, cls):
+            yield item
+        return
     res = client.get(term)
     if res["status"] == "OK":
         for item in res.get(collection_name, []):
             yield cls(client=client, data=item)
         thusfar = res["start_element"] + res["num_elements"]
         separator = '&' if '?' in term else '?'
+        if workers > 1:
+            pages = _prefetched_pages(client, term + separator, res["num_elements"],
+                                      thusfar, res["count"], workers, max_pending or 2 * workers)
+            for page in pages:
+                if not collection_name in page:
+                    return
+                for item in page[collection_name]:
+                    yield cls(client=client, data=item)
+            return
         while res["count"] > thusfar:
             res = client.get('{}{}start_element={}'.format(term, separator, thusfar))
             if not collection_name in res:
@@ -14,3 +52,123 @@ def paginator(client, term, collection_name, cls):
             for item in res[collection_name]:
                 yield cls(client=client, data=item)
             thusfar = res["start_element"] + res["num_elements"]
+
+
+def _streamed(client, term, collection_name, cls):
+    """ generates the elements of all pages, decoding them as they download """
+    separator = '&' if '?' in term else '?'
+    page = client.get_stream(term, collection_name)
+    while True:
+        for item in page.items():
+            yield cls(client=client, data=item)
+        res = page.envelope
+        thusfar = res["start_element"] + res["num_elements"]
+        if res["count"] <= thusfar:
+            return
+        page = client.get_stream('{}{}start_element={}'.format(term, separator, thusfar), collection_name)
+
+
+def _prefetched_pages(client, term, page_size, start, count, workers, max_pending):
+    """ generates the responses for all pages from start to count in order,
+    fetching up to max_pending of them concurrently
+    """
+    if page_size <= 0:
+        return
+    offsets = iter(range(start, count, page_size))
+    pending = deque()
+    executor = ThreadPoolExecutor(max_workers=workers)
+
+    def fetch_next():
+        for offset in offsets:
+            page_term = '{}start_element={}&num_elements={}'.format(term, offset, page_size)
+            pending.append(executor.submit(client.get, page_term))
+            return
+
+    try:
+        for _ in range(max_pending):
+            fetch_next()
+        while pending:
+            page = pending.popleft().result()
+            fetch_next()
+            yield page
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+ID_CHUNK_SIZE = 100  # ids per request, the largest page the api returns
+ID_CHUNK_LENGTH = 1500  # characters of ids per request, to stay within url limits
+
+
+def id_chunks(ids, size=ID_CHUNK_SIZE, length=ID_CHUNK_LENGTH):
+    """ split ids into unique, url quoted, comma separated values of at most
+    size ids and about length characters each
+    """
+    chunks = []
+    chunk = []
+    chunk_length = 0
+    seen = set()
+    for i in ids:
+        value = quote_plus(str(i))
+        if value in seen:
+            continue
+        seen.add(value)
+        if chunk and (len(chunk) >= size or chunk_length + len(value) > length):
+            chunks.append(','.join(chunk))
+            chunk = []
+            chunk_length = 0
+        chunk.append(value)
+        chunk_length += len(value) + 1
+    if chunk:
+        chunks.append(','.join(chunk))
+    return chunks
+
+
+def fetch_id_chunk(client, term, collection_name, service_name):
+    """ the items returned for a term with a chunk of ids.
+    A single id returns the item itself rather than a collection
+    """
+    try:
+        res = client.get(term)
+    except NotFoundException:
+        return []
+    if collection_name not in res:
+        return [res[service_name]] if service_name in res else []
+    items = list(res[collection_name])
+    thusfar = res["start_element"] + res["num_elements"]
+    while res["count"] > thusfar:
+        res = client.get('{}&start_element={}'.format(term, thusfar))
+        if not collection_name in res:
+            break
+        items.extend(res[collection_name])
+        thusfar = res["start_element"] + res["num_elements"]
+    return items
+
+
+def unique_items(chunks):
+    """ generates the items of all chunks, skipping ids seen before """
+    seen = set()
+    for items in chunks:
+        for item in items:
+            if item.get('id') in seen:
+                continue
+            seen.add(item.get('id'))
+            yield item
+
+
+def by_ids(client, ids, term_for, collection_name, service_name, cls, workers=None):
+    """ returns a generator for the items with these ids. The ids are fetched in
+    url safe chunks, using up to workers (default: the client's page_workers)
+    concurrent requests. term_for builds the uri term for a chunk of ids.
+    """
+    workers = workers or client.page_workers
+    terms = [term_for(values) for values in id_chunks(ids)]
+    fetch = lambda term: fetch_id_chunk(client, term, collection_name, service_name)
+    if workers > 1 and len(terms) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            chunks = list(executor.map(fetch, terms))
+    else:
+        chunks = (fetch(term) for term in terms)
+    for item in unique_items(chunks):
+        yield cls(client=client, data=item)
@@ -2,4 +2,5 @@ from .sub_service import SubService
 class Profile(SubService):
     service_name = 'profile'
     collection_name = 'profiles'
+    __slots__ = ()
 
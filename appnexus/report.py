@@ -0,0 +1,109 @@
+from concurrent.futures import ThreadPoolExecutor
+import codecs
+import csv
+import logging
+from time import time, sleep
+
+from .exceptions import ApiException
+
+
+class ReportJob(object):
+    """ a report requested from the report service. The report is generated
+    asynchronously; once ready it can be downloaded, to a file or as parsed rows.
+    """
+    def __init__(self, client, report_id):
+        self._client = client
+        self.report_id = report_id
+        self.status = 'pending'
+        self.report = None
+
+    def poll(self):
+        """ fetch the execution status of the report: 'pending', 'ready' or 'error' """
+        res = self._client.get('report?id={}'.format(self.report_id))
+        self.status = res.get('execution_status', self.status)
+        self.report = res.get('report', self.report)
+        return self.status
+
+    @property
+    def done(self):
+        return self.status in ('ready', 'error')
+
+    def chunks(self, chunk_size=None):
+        """ an iterator for the downloaded report, in chunks of chunk_size bytes
+        (default: the client's download_chunk_size)
+        """
+        if self.status != 'ready':
+            raise ApiException("report {} is {}, not ready".format(self.report_id, self.status))
+        return self._client.data_get('report-download?id={}'.format(self.report_id), chunk_size=chunk_size)
+
+    def download(self, f, chunk_size=None):
+        """ write the report to a file opened in binary mode, or a file with this name.
+        returns the number of bytes written
+        """
+        if not hasattr(f, 'write'):
+            with open(f, 'wb') as out:
+                return self.download(out, chunk_size)
+        written = 0
+        for chunk in self.chunks(chunk_size):
+            f.write(chunk)
+            written += len(chunk)
+        return written
+
+    def rows(self, types=None, chunk_size=None):
+        """ generates the rows of a csv report as they download, as dicts of column -> value.
+        types maps columns to a conversion for their values, e.g. {'imps': int};
+        empty values are None
+        """
+        types = types or {}
+        reader = csv.DictReader(csv_lines(self.chunks(chunk_size)))
+        for row in reader:
+            for column, convert in types.items():
+                value = row.get(column)
+                row[column] = convert(value) if value not in (None, '') else None
+            yield row
+
+
+def csv_lines(chunks, encoding='utf-8'):
+    """ the lines of a text downloaded in chunks, with their line endings for the csv reader """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    rest = ''
+    for chunk in chunks:
+        lines = (rest + decoder.decode(chunk)).split('\n')
+        rest = lines.pop()
+        for line in lines:
+            yield line + '\n'
+    rest += decoder.decode(b'', final=True)
+    if rest:
+        yield rest
+
+
+def submit(client, report, advertiser_id=None):
+    """ request a report, e.g. {'report_type': 'network_analytics', 'columns': [...],
+    'report_interval': 'yesterday', 'format': 'csv'}. returns its ReportJob
+    """
+    term = 'report'
+    if advertiser_id is not None:
+        term += '?advertiser_id={}'.format(advertiser_id)
+    res = client.post(term, {'report': report})
+    return ReportJob(client, res['report_id'])
+
+
+def wait_all(jobs, interval=1, max_interval=60, timeout=3600, workers=8):
+    """ poll the jobs until all are done. The pending jobs are polled concurrently, first
+    after interval seconds, then twice as long after each poll, up to max_interval.
+    returns the jobs; raises an ApiException when they are not done within timeout seconds
+    """
+    deadline = time() + timeout
+    pending = [job for job in jobs if not job.done]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while pending:
+            if time() + interval > deadline:
+                raise ApiException("{} reports not ready after {}s".format(len(pending), timeout))
+            sleep(interval)
+            list(executor.map(lambda job: job.poll(), pending))
+            for job in pending:
+                if job.status == 'error':
+                    logging.error("report {} failed".format(job.report_id))
+            pending = [job for job in pending if not job.done]
+            interval = min(interval * 2, max_interval)
+    return jobs
@@ -1,53 +1,149 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
 from requests.compat import quote_plus
-from .exceptions import NotFoundException
+from .exceptions import DataException, NotFoundException
 from .client import AppNexusClient
-from .paginator import paginator
+from .paginator import paginator, by_ids, fields_term
+from .summary import Summary
+from .bulk import bulk_save
+from .catalog import Catalog
+from .sync import IncrementalSync, watermark_store
+from .report import submit, wait_all
+from .upload import UploadIndex, bulk_upload
+from .shard import sharded
 from .advertiser import Advertiser
+from .insertion_order import InsertionOrder
+from .line_item import LineItem
+from .campaign import Campaign
+from .creative_html import CreativeHtml
+from .profile import Profile
 from .brand import Brand
 from .category import Category
 
 class AppNexusResource(object):
+    client_class = AppNexusClient
+    # the services of an advertiser that refresh_mirror copies, with the collection of
+    # their listings when it is not the service's collection_name
+    advertiser_services = (
+        (InsertionOrder, None), (LineItem, None), (Campaign, None), (CreativeHtml, 'creative-html'), (Profile, None)
+    )
+    # the services looked up in a catalog, with a 'catalog_dir' configured
+    catalog_services = (Brand, Category)
+
     def __init__(self, config):
-        self._client = AppNexusClient(config)
-
-    def _all(self, service):
-        """ return all hosted items of a service """
-        return paginator(self._client, service.service_name, service.collection_name, service)
-
-    def _by_ids(self, service, ids):
-        """ return multiple items by id """
-        values = ','.join(quote_plus(str(i)) for i in ids)
-        term = '{}?id={}'.format(service.service_name, values)
-        if ',' in values:
-            return paginator(self._client, term, service.collection_name, service)
-        else:
-            try:
-                res = self._client.get(term)
-                return [service(client=self._client, data=res[service.service_name])]
-            except NotFoundException:
-                return []
+        self._client = self.client_class(config)
+        self._catalogs = {}
+        self._catalog_lock = threading.Lock()
+        self._upload_index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """ stop the client's background token refreshes and close its connections """
+        self._client.close()
+
+    def _service_class(self, service):
+        """ the class to instantiate for items of a service """
+        return service
+
+    def _listing_class(self, service, fields, records=False):
+        """ full items of a service, or read only summaries as records or when only some fields are listed """
+        return Summary.of(service) if fields or records else self._service_class(service)
+
+    def _ids_term(self, service, values):
+        """ the uri term for items by comma separated ids """
+        return '{}?id={}'.format(service.service_name, values)
+
+    def _key_term(self, service, key_name, key_value):
+        """ the uri term for items by key """
+        return '{}?{}={}'.format(service.service_name, quote_plus(str(key_name)), key_value)
+
+    def _all(self, service, fields=None, records=False):
+        """ return all hosted items of a service.
+        With fields, return summaries holding only those fields, with records summaries of all fields
+        """
+        cls = self._listing_class(service, fields, records)
+        return paginator(self._client, service.service_name, service.collection_name, cls, fields=fields)
+
+    def _by_ids(self, service, ids, fields=None, records=False):
+        """ return multiple items by id, fetched in chunks of ids.
+        With fields, return summaries holding only those fields, with records summaries of all fields
+        """
+        return by_ids(
+            self._client, ids,
+            lambda values: fields_term(self._ids_term(service, values), fields),
+            service.collection_name,
+            service.service_name,
+            self._listing_class(service, fields, records)
+        )
+
+    def _from_local(self, service, key_name, key_value):
+        """ the item with this key from a catalog or the client's local mirror, or None """
+        if service in self.catalog_services and key_name in ('id', 'name') and self._client._config.get('catalog_dir'):
+            catalog = self.catalog(service)
+            item = catalog.by_id(key_value) if key_name == 'id' else catalog.by_name(key_value)
+            if item is not None:
+                return item
+        mirror = self._client.mirror
+        if mirror:
+            data = mirror.get(service.service_name, key_name, key_value, None)
+            if data is not None:
+                return self._service_class(service)(client=self._client, data=data)
 
     def _by_exact_key(self, service, key_name, key_value):
         """ return a specific item by an exact key (generally code or id) """
-        try:
-            res = self._client.get('{}?{}={}'.format(service.service_name, quote_plus(str(key_name)), quote_plus(str(key_value))))
-            return service(client=self._client, data=res[service.service_name])
-        except NotFoundException:
-            return None
+        identity_map = self._client.identity_map
+        if identity_map:
+            key = identity_map.key(service.service_name, key_name, key_value, None)
+            item = identity_map.get(key)
+            if item is not None:
+                return item
+        item = self._from_local(service, key_name, key_value)
+        if item is None:
+            try:
+                res = self._client.get(self._key_term(service, key_name, quote_plus(str(key_value))))
+                item = self._service_class(service)(client=self._client, data=res[service.service_name])
+            except NotFoundException:
+                return None
+            if self._client.mirror:
+                self._client.mirror.put(item)
+        if identity_map:
+            identity_map.put(key, item)
+        return item
+
+    def metrics(self):
+        """ the request Metrics of the client, or None if 'metrics' is not configured """
+        return self._client.metrics
+
+    def cache_stats(self):
+        """ hit and miss counts of the identity map, or None if it is not configured """
+        if self._client.identity_map:
+            return self._client.identity_map.stats()
 
     def _by_inexact_key(self, service, key_name, key_value):
         """ return the first item with this key/value """
-        term = '{}?{}={}'.format(service.service_name, quote_plus(str(key_name)), key_value)
-        it = paginator(self._client, term, service.collection_name, service)
-        return next(it, None)
+        item = self._from_local(service, key_name, key_value)
+        if item is None:
+            term = self._key_term(service, key_name, key_value)
+            it = paginator(self._client, term, service.collection_name, self._service_class(service))
+            item = next(it, None)
+            if item is not None and self._client.mirror:
+                self._client.mirror.put(item)
+        return item
 
 
-    def brands(self):
+    def brands(self, fields=None, records=False):
         """ return all brands.
         without simple=true, this counts all attached creatives, which take a long time
         """
         term = "{}?simple=true".format(Brand.service_name)
-        return paginator(self._client, term, Brand.collection_name, Brand)
+        cls = self._listing_class(Brand, fields, records)
+        return paginator(self._client, term, Brand.collection_name, cls, fields=fields)
 
     def brand_by_id(self, brand_id):
         """ return the brand with this id, or None if not found """
@@ -58,9 +154,9 @@ class AppNexusResource(object):
         return self._by_inexact_key(Brand, 'name', brand_name)
 
 
-    def categories(self):
+    def categories(self, fields=None, records=False):
         """ return all categories """
-        return self._all(Category)
+        return self._all(Category, fields, records)
 
     def category_by_id(self, category_id):
         """ return the category with this id, or None if not found """
@@ -71,15 +167,38 @@ class AppNexusResource(object):
         return self._by_inexact_key(Category, 'name', category_name)
 
 
+    def catalog(self, service):
+        """ the Catalog of all brands or categories, with lookups by id, name and name prefix.
+        It is kept in memory and, with a 'catalog_dir' configured, in a snapshot file there.
+        Once older than 'catalog_max_age' seconds (default a day) it is downloaded again
+        """
+        config = self._client._config
+        max_age = config.get('catalog_max_age', 86400)
+        path = None
+        if config.get('catalog_dir'):
+            path = os.path.join(config['catalog_dir'], "{}.json.gz".format(service.collection_name))
+        with self._catalog_lock:
+            catalog = self._catalogs.get(service)
+            if catalog is None and path:
+                catalog = Catalog.load(path, self._service_class(service), self._client)
+            if catalog is None or catalog.age() > max_age:
+                listing = self.brands() if service is Brand else self._all(service)
+                catalog = Catalog(self._service_class(service), [item._data for item in listing], self._client)
+                if path:
+                    catalog.save(path)
+            self._catalogs[service] = catalog
+        return catalog
+
+
     def create_advertiser(self, name, **kwargs):
         """ create a new advertiser """
         data = { 'name': name }
         data.update(kwargs)
-        return Advertiser(self._client, data=data)
+        return self._service_class(Advertiser)(self._client, data=data)
 
-    def advertisers(self):
-        """ return all advertisers """
-        return self._all(Advertiser)
+    def advertisers(self, fields=None, records=False):
+        """ return all advertisers, or summaries with only these fields, or as records """
+        return self._all(Advertiser, fields, records)
 
     def advertiser_by_name(self, name):
         """ return the first advertiser with this name, or None if not found """
@@ -93,13 +212,111 @@ class AppNexusResource(object):
         """ return the advertiser with this id, or None if not found """
         return self._by_exact_key(Advertiser, 'id', advertiser_id)
 
-    def advertisers_by_ids(self, advertiser_ids):
+    def advertisers_by_ids(self, advertiser_ids, fields=None, records=False):
         """ return an iterator for advertisers with these ids """
-        return self._by_ids(Advertiser, advertiser_ids)
+        return self._by_ids(Advertiser, advertiser_ids, fields, records)
+
 
+    def save_all(self, items, workers=None):
+        """ save items with all their unsaved children, saving the children of each
+        level concurrently (up to workers, default the 'save_workers' config, or 8).
+        returns a BulkSaveResult listing the saved, failed and skipped items
+        """
+        return bulk_save(items, workers or self._client._config.get('save_workers', 8))
+
+    def map(self, fn, items, workers=None):
+        """ call fn on each item in threads (up to workers, default the 'map_workers'
+        config, or 8) sharing this resource's client, its token and connections,
+        e.g. resource.map(resource.advertiser_by_id, ids) or resource.map(lambda li: li.save(), lis).
+        returns the results in the order of the items; the first exception raised by fn is raised
+        """
+        with ThreadPoolExecutor(max_workers=workers or self._client._config.get('map_workers', 8)) as executor:
+            return list(executor.map(fn, items))
+
+    def sharded(self, job, advertisers=None, processes=None, shard_size=None):
+        """ run job(resource, advertiser) for each advertiser (default: all) in a pool of
+        processes (up to processes, default the 'sync_processes' config, or one per cpu),
+        shard_size advertisers (default the 'shard_size' config, or 1) at a time.
+        Each process has a client of its own, starting with this client's token.
+        generates a ShardResult (advertiser_id, result, error) per advertiser as the
+        jobs complete; shard.collect gathers them, raising the errors all at once
+        """
+        config = self._client._config
+        if advertisers is None:
+            advertisers = self.advertisers()
+        return sharded(self, job, advertisers, processes or config.get('sync_processes'),
+                       shard_size or config.get('shard_size', 1))
+
+    def changes(self, services=None):
+        """ generates a Change (kind, service_name, item) for each advertiser, insertion order
+        and line item (or item of these services) created or modified since the previous call,
+        according to the watermarks kept in the 'sync_file' config
+        """
+        sync = IncrementalSync(self._client, watermark_store(self._client._config), services)
+        return sync.changes()
+
+    def refresh_mirror(self, advertiser_ids=None):
+        """ replace the mirrored brands, categories and advertisers, and the insertion orders,
+        line items, campaigns, creatives and profiles of these advertisers (default: all).
+        returns the number of mirrored items per service
+        """
+        mirror = self._client.mirror
+        if not mirror:
+            raise DataException("A mirror requires a 'mirror_file' in the config")
+        counts = {}
+        if advertiser_ids is None:
+            for service, items in ((Brand, self.brands()), (Category, self.categories())):
+                items = list(items)
+                mirror.clear(service.service_name)
+                counts[service.service_name] = mirror.put_all(service.service_name, items)
+            advertisers = list(self.advertisers())
+            mirror.clear(Advertiser.service_name)
+        else:
+            advertisers = list(self.advertisers_by_ids(advertiser_ids))
+        counts[Advertiser.service_name] = mirror.put_all(Advertiser.service_name, advertisers)
+        for adv in advertisers:
+            for service, collection_name in self.advertiser_services:
+                items = list(adv._all(service, override_collection_name=collection_name))
+                mirror.clear(service.service_name, adv.id)
+                count = mirror.put_all(service.service_name, items)
+                counts[service.service_name] = counts.get(service.service_name, 0) + count
+        return counts
+
+    def submit_report(self, report, advertiser_id=None):
+        """ request a report from the report service, for an advertiser or the member.
+        returns a ReportJob to poll and download it
+        """
+        return submit(self._client, report, advertiser_id)
+
+    def wait_for_reports(self, jobs, interval=1, max_interval=60, timeout=3600, workers=None):
+        """ poll report jobs concurrently (up to workers, default the 'report_workers'
+        config, or 8), backing off exponentially, until all are done
+        """
+        return wait_all(jobs, interval, max_interval, timeout, workers or self._client._config.get('report_workers', 8))
+
+    def _upload_term(self, member_id):
+        """ the uri term to upload creative packages to """
+        return "creative-upload?member_id={}".format(member_id)
 
     def creative_upload(self, data, name, member_id):
         """ upload a creative package to the creative upload service """
-        response = self._client.upload("creative-upload?member_id={}".format(member_id), data, name)
+        response = self._client.upload(self._upload_term(member_id), data, name)
         return response['media-asset'][0]
 
+    def creative_upload_file(self, path, member_id, name=None):
+        """ upload a creative package file, streamed from disk, to the creative upload service """
+        response = self._client.upload_file(self._upload_term(member_id), path, name or os.path.basename(path))
+        return response['media-asset'][0]
+
+    def creative_uploads(self, paths, member_id, workers=None):
+        """ upload creative package files concurrently (up to workers, default the
+        'upload_workers' config, or 4), once per distinct content. Files with the same
+        content as one uploaded before reuse its media asset; with an 'upload_index'
+        file configured, the uploaded content hashes are remembered across runs.
+        returns an UploadResult with the media asset per path
+        """
+        config = self._client._config
+        if self._upload_index is None:
+            self._upload_index = UploadIndex(config.get('upload_index'))
+        upload = lambda path, name: self.creative_upload_file(path, member_id, name)
+        return bulk_upload(upload, paths, member_id, self._upload_index, workers or config.get('upload_workers', 4))
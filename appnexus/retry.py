@@ -0,0 +1,218 @@
+from collections import deque
+import logging
+import random
+import threading
+from time import time, sleep
+
+from requests.exceptions import ConnectionError, ConnectTimeout, Timeout, ChunkedEncodingError
+
+from .exceptions import CircuitOpenException
+
+# verbs whose requests may be sent again without changing their outcome
+IDEMPOTENT_VERBS = ('GET', 'PUT', 'DELETE')
+# http statuses of a degraded api
+RETRY_STATUSES = (500, 502, 503, 504)
+# errors of requests that never reached the api, which any verb may resend
+CONNECT_ERRORS = (ConnectTimeout,)
+# errors of requests that may or may not have reached the api
+TRANSIENT_ERRORS = (ConnectionError, Timeout, ChunkedEncodingError)
+
+
+class RetryBudget(object):
+    """ caps the retries over the last period seconds to a ratio of the requests
+    made in that time, plus min_retries, so retries do not pile onto an api that
+    is failing for everyone
+    """
+    def __init__(self, ratio=0.2, min_retries=10, period=10):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.period = period
+        self._requests = deque()
+        self._retries = deque()
+        self._lock = threading.Lock()
+
+    def _prune(self, now):
+        for calls in (self._requests, self._retries):
+            while calls and calls[0] <= now - self.period:
+                calls.popleft()
+
+    def request(self):
+        """ record a request """
+        with self._lock:
+            now = time()
+            self._prune(now)
+            self._requests.append(now)
+
+    def withdraw(self):
+        """ take a retry from the budget. returns False when none is left """
+        with self._lock:
+            now = time()
+            self._prune(now)
+            if len(self._retries) >= self.min_retries + self.ratio * len(self._requests):
+                return False
+            self._retries.append(now)
+            return True
+
+
+class CircuitBreaker(object):
+    """ fails calls to an endpoint fast after threshold consecutive failed calls.
+    The circuit stays open for reset_timeout seconds; then one trial call is let
+    through, which closes it when it succeeds and opens it again when it fails
+    """
+    def __init__(self, threshold=5, reset_timeout=30):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._failures = {}  # endpoint -> consecutive failures
+        self._opened = {}  # endpoint -> time the circuit opened
+        self._trials = set()  # endpoints with a trial call in flight
+        self._lock = threading.Lock()
+
+    def state(self, endpoint):
+        """ 'closed', 'open' or 'half-open' """
+        opened = self._opened.get(endpoint)
+        if opened is None:
+            return 'closed'
+        if endpoint in self._trials or time() < opened + self.reset_timeout:
+            return 'open'
+        return 'half-open'
+
+    def allow(self, endpoint):
+        """ raises a CircuitOpenException unless a call to the endpoint may be made """
+        with self._lock:
+            state = self.state(endpoint)
+            if state == 'open':
+                raise CircuitOpenException("circuit open for {}".format(endpoint))
+            if state == 'half-open':
+                self._trials.add(endpoint)
+
+    def record(self, endpoint, failed):
+        """ record the outcome of a call to the endpoint """
+        with self._lock:
+            self._trials.discard(endpoint)
+            if not failed:
+                self._failures.pop(endpoint, None)
+                self._opened.pop(endpoint, None)
+                return
+            failures = self._failures.get(endpoint, 0) + 1
+            self._failures[endpoint] = failures
+            if failures >= self.threshold or endpoint in self._opened:
+                if endpoint not in self._opened:
+                    logging.error("circuit opened for {} after {} failures".format(endpoint, failures))
+                self._opened[endpoint] = time()
+
+
+class RetryPolicy(object):
+    """ when and how long to wait before resending a request that failed with a
+    connection error, a timeout or a 5xx response. Requests of idempotent verbs are
+    retried up to max_retries times, other ones only when they never reached the
+    api; the waits grow exponentially from backoff up to max_backoff seconds, with
+    full jitter. Retries are limited by an optional RetryBudget, and calls to
+    failing endpoints are failed fast by an optional CircuitBreaker
+    """
+    def __init__(self, max_retries=3, backoff=0.5, max_backoff=30, jitter=True,
+                 statuses=RETRY_STATUSES, idempotent=IDEMPOTENT_VERBS, budget=None, breaker=None):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = tuple(statuses)
+        self.idempotent = tuple(idempotent)
+        self.budget = budget
+        self.breaker = breaker
+        self._random = random.Random()
+
+    @classmethod
+    def from_config(cls, config):
+        """ the policy of a client config: 'retries' ('max_retries' in older configs),
+        'retry_wait', 'retry_max_wait', 'retry_jitter', 'retry_statuses' and 'retry_verbs', the idempotent verbs;
+        'retry_budget', a ratio of requests, with 'retry_budget_min' and 'retry_budget_period';
+        'breaker_threshold' failed calls, 0 for no circuit breaker, and 'breaker_reset' seconds
+        """
+        budget = None
+        if config.get('retry_budget', 0.2):
+            budget = RetryBudget(config.get('retry_budget', 0.2), config.get('retry_budget_min', 10),
+                                 config.get('retry_budget_period', 10))
+        breaker = None
+        if config.get('breaker_threshold', 5):
+            breaker = CircuitBreaker(config.get('breaker_threshold', 5), config.get('breaker_reset', 30))
+        return cls(
+            max_retries=config.get('retries', config.get('max_retries', 3)),
+            backoff=config.get('retry_wait', 0.5),
+            max_backoff=config.get('retry_max_wait', 30),
+            jitter=config.get('retry_jitter', True),
+            statuses=config.get('retry_statuses', RETRY_STATUSES),
+            idempotent=config.get('retry_verbs', IDEMPOTENT_VERBS),
+            budget=budget,
+            breaker=breaker,
+        )
+
+    def failed(self, r=None, error=None):
+        """ whether a response, or an error instead of one, is a failure to retry on """
+        return error is not None or r.status_code in self.statuses
+
+    def retryable(self, verb, r=None, error=None, errors=None):
+        """ whether a failed request may be resent. errors are the (connect, transient)
+        error classes of the http library, those of requests by default
+        """
+        connect_errors, transient_errors = errors or (CONNECT_ERRORS, TRANSIENT_ERRORS)
+        if error is not None:
+            if isinstance(error, connect_errors):
+                return True
+            return verb in self.idempotent and isinstance(error, transient_errors)
+        return verb in self.idempotent and r.status_code in self.statuses
+
+    def delay(self, attempt):
+        """ the seconds to wait before the retry after attempt failed ones """
+        seconds = min(self.max_backoff, self.backoff * 2 ** attempt)
+        return self._random.uniform(0, seconds) if self.jitter else seconds
+
+    def retry_delay(self, verb, attempt, r=None, error=None, errors=None):
+        """ the seconds to wait before resending a failed request, or None when it is not resent """
+        if attempt >= self.max_retries or not self.retryable(verb, r, error, errors):
+            return None
+        if self.budget is not None and not self.budget.withdraw():
+            logging.warning("retry budget exhausted")
+            return None
+        return self.delay(attempt)
+
+    def started(self, endpoint):
+        """ before a call: raises a CircuitOpenException when the endpoint fails fast """
+        if self.breaker is not None:
+            self.breaker.allow(endpoint)
+        if self.budget is not None:
+            self.budget.request()
+
+    def finished(self, endpoint, failed):
+        """ after a call, with its retries """
+        if self.breaker is not None:
+            self.breaker.record(endpoint, failed)
+
+    def call(self, verb, endpoint, send):
+        """ send() a request, resending it as the policy allows. send returns a tuple
+        starting with the http response. returns the result of the last send
+        """
+        self.started(endpoint)
+        attempt = 0
+        failed = True
+        try:
+            while True:
+                try:
+                    result = send()
+                except TRANSIENT_ERRORS as e:
+                    seconds = self.retry_delay(verb, attempt, error=e)
+                    if seconds is None:
+                        raise
+                    logging.warning("{}, retrying in {:.2f}s".format(e, seconds))
+                else:
+                    r = result[0]
+                    if not self.failed(r):
+                        failed = False
+                        return result
+                    seconds = self.retry_delay(verb, attempt, r)
+                    if seconds is None:
+                        return result
+                    logging.warning("{} response, retrying in {:.2f}s ({})".format(r.status_code, seconds, r.url))
+                sleep(seconds)
+                attempt += 1
+        finally:
+            self.finished(endpoint, failed)
@@ -1,87 +1,260 @@
 from requests.compat import quote_plus
-from .paginator import paginator
-from .exceptions import NotFoundException
+from .paginator import paginator, by_ids, fields_term
+from .exceptions import DataException, NotFoundException
+from .summary import Summary
+
+
+def _snapshot(value):
+    """ a copy of json data: its dicts and lists are copied, the values shared """
+    if isinstance(value, dict):
+        return {k: _snapshot(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_snapshot(v) for v in value]
+    return value
+
 
 class Service(object):
     """  The subclass should set _service_name to the name of the AppNexus API service """
     service_name = None
     collection_name = None
+    # subclasses declare __slots__ as well, empty unless they add attributes
+    __slots__ = ('_client', '_data', '_saved', '_children')
 
     def __init__(self, client, data):
         if not (self.service_name and self.collection_name):
             raise NotImplemented("Service should be subclassed with a service and collection name.")
         self._client = client
-        self.data = data
+        self._data = data
+        self._saved = None  # a snapshot of the saved data, taken when data is first handed out
+        self._children = None
+
+    @property
+    def data(self):
+        """ the item's fields. The first access snapshots them, to find the changed ones on save """
+        if self._saved is None:
+            self._saved = _snapshot(self._data)
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        if self._saved is None:
+            self._saved = _snapshot(self._data)
+        self._data = data
+
+    def _service_class(self, service):
+        """ the class to instantiate for items of a service """
+        return service
+
+    def _listing_class(self, service, fields, records=False):
+        """ full items of a service, or read only summaries as records or when only some fields are listed """
+        return Summary.of(service) if fields or records else self._service_class(service)
+
+    def _scope(self):
+        """ the advertiser id that lookups from this item are limited to """
+        return self.id
+
+    def _lookup_scope(self):
+        """ the identity map scope of lookups from this item, which are filtered by its id """
+        return (self.service_name, self.id)
+
+    def _prefetched(self, name):
+        """ the children stitched to this item by a prefetch, or None """
+        if self._children:
+            return self._children.get(name)
+
+    def _prefetch(self, name, children):
+        """ stitch prefetched children to this item """
+        if self._children is None:
+            self._children = {}
+        self._children[name] = children
+
+    def _forget(self, deleted=False):
+        """ drop this item from the client's identity map, and update it in
+        (or once deleted, remove it from) the client's mirror
+        """
+        if self._client.identity_map:
+            self._client.identity_map.invalidate(self)
+        if self._client.mirror:
+            if deleted:
+                self._client.mirror.remove(self)
+            else:
+                self._client.mirror.put(self)
 
     def _for_this_service(self, term):
         """ add a filter for this service id to the uri term """
         separator = '&' if '?' in term else '?'
         return term + "{}{}_id={}".format(separator, self.service_name, self.id)
 
-    def _all(self, service):
-        """ return all hosted items of a service, filtered by this service's id """
+    def _collection_term(self):
+        """ the uri term to create a new item of this service """
+        return self.service_name
+
+    def _item_term(self):
+        """ the uri term for this item """
+        return '{}?id={}'.format(self.service_name, self.data['id'])
+
+    def _ids_term(self, service, values):
+        """ the uri term for items by comma separated ids, filtered by this service's id """
+        return self._for_this_service('{}?id={}'.format(service.service_name, values))
+
+    def _key_term(self, service, key_name, key_value):
+        """ the uri term for items by key, filtered by this service's id """
+        term = '{}?{}={}'.format(service.service_name, quote_plus(str(key_name)), key_value)
+        return self._for_this_service(term)
+
+    def _all(self, service, fields=None, records=False, override_collection_name=None):
+        """ return all hosted items of a service, filtered by this service's id.
+        With fields, return summaries holding only those fields, with records summaries of all fields
+        """
         if self.id:
             term = self._for_this_service(service.service_name)
-            return paginator(self._client, term, service.collection_name, service)
+            cls = self._listing_class(service, fields, records)
+            collection_name = override_collection_name or service.collection_name
+            return paginator(self._client, term, collection_name, cls, fields=fields)
         return []
 
-    def _by_ids(self, service, ids, override_collection_name=None):
-        """ return multiple items by id """
+    def _by_ids(self, service, ids, override_collection_name=None, fields=None, records=False):
+        """ return multiple items by id, fetched in chunks of ids.
+        With fields, return summaries holding only those fields, with records summaries of all fields
+        """
         if self.id:
-            values = ','.join(quote_plus(str(i)) for i in ids)
-            if values:
-                term = '{}?id={}'.format(service.service_name, values)
-                term = self._for_this_service(term)
-                if ',' in values:
-                    return paginator(self._client, term, override_collection_name or service.collection_name, service)
-                res = self._client.get(term)
-                return [service(client=self._client, data=res[service.service_name])]
+            return by_ids(
+                self._client, ids,
+                lambda values: fields_term(self._ids_term(service, values), fields),
+                override_collection_name or service.collection_name,
+                service.service_name,
+                self._listing_class(service, fields, records)
+            )
         return []
-        
+
+    def _from_mirror(self, service, key_name, key_value):
+        """ the item with this key from the client's local mirror, or None """
+        mirror = self._client.mirror
+        if mirror:
+            data = mirror.get(service.service_name, key_name, key_value, self._scope())
+            if data is not None:
+                return self._service_class(service)(client=self._client, data=data)
+
     def _by_exact_key(self, service, key_name, key_value):
         """ return a specific item by an exact key (generally code or id) """
-        try:
-            term = '{}?{}={}'.format(service.service_name, quote_plus(str(key_name)), key_value)
-            term = self._for_this_service(term)
-            res = self._client.get(term)
-            return service(client=self._client, data=res[service.service_name])
-        except NotFoundException:
-            return None
+        identity_map = self._client.identity_map
+        if identity_map:
+            key = identity_map.key(service.service_name, key_name, key_value, self._lookup_scope())
+            item = identity_map.get(key)
+            if item is not None:
+                return item
+        item = self._from_mirror(service, key_name, key_value)
+        if item is None:
+            try:
+                res = self._client.get(self._key_term(service, key_name, key_value))
+                item = self._service_class(service)(client=self._client, data=res[service.service_name])
+            except NotFoundException:
+                return None
+            if self._client.mirror:
+                self._client.mirror.put(item)
+        if identity_map:
+            identity_map.put(key, item)
+        return item
 
     def _by_inexact_key(self, service, key_name, key_value):
         """ return the first item with this key/value """
-        term = '{}?{}={}'.format(service.service_name, quote_plus(str(key_name)), key_value)
-        term = self._for_this_service(term)
-        it = paginator(self._client, term, service.collection_name, service)
-        return next(it, None)
+        item = self._from_mirror(service, key_name, key_value)
+        if item is None:
+            term = self._key_term(service, key_name, key_value)
+            it = paginator(self._client, term, service.collection_name, self._service_class(service))
+            item = next(it, None)
+            if item is not None and self._client.mirror:
+                self._client.mirror.put(item)
+        return item
 
     @property
     def id(self):
-        return self.data.get('id')
+        return self._data.get('id')
 
     @property
     def code(self):
-        return self.data.get('code')
+        return self._data.get('code')
 
     @property
     def name(self):
-        return self.data.get('name')
+        return self._data.get('name')
 
     def meta(self):
         """ retrieve the service's meta information """
         res = self._client.get('{}/meta'.format(self.service_name))
         return res
 
+    def changes(self):
+        """ the fields changed since the item was loaded or last saved, as {key: (old, new)}.
+        Fields removed from data are not included
+        """
+        if self._saved is None:
+            return {}
+        return {
+            key: (self._saved.get(key), value)
+            for key, value in self.data.items()
+            if key not in self._saved or self._saved[key] != value
+        }
+
+    def _payload(self):
+        """ all the data of a new item, the changed fields of a saved item,
+        or None when nothing changed
+        """
+        if self._data.get('id') is None:
+            return { self.service_name: self._data }
+        changed = self.changes()
+        if changed:
+            return { self.service_name: {key: self.data[key] for key in changed} }
+
+    def _saved_as(self, values, everything=False):
+        """ update the data with the values returned by the api, and remember them as saved.
+        with everything, all the data is now saved
+        """
+        self._data.update(values)
+        if self._saved is None:
+            # the data was not handed out since the last snapshot, so it is all saved
+            return
+        if everything:
+            self._saved = _snapshot(self._data)
+        else:
+            self._saved.update(_snapshot(values))
+
+    def _dependencies(self):
+        """ unsaved items that have to be saved before this one """
+        return []
+
+    def _merge_dependencies(self, saved):
+        """ reference the saved dependencies in this item's data """
+        pass
+
+    def _discarded(self):
+        """ replaced items to delete once the dependencies are saved """
+        return []
+
     def save(self):
         """ creates or updates the item remotely """
-        payload = { self.service_name: self.data }
+        dependencies = self._dependencies()
+        for item in dependencies:
+            item.save()
+        return self._save_with(dependencies)
+
+    def _save_with(self, dependencies):
+        """ creates or updates the item remotely, once its dependencies are saved """
+        self._merge_dependencies(dependencies)
+        for item in self._discarded():
+            item.delete()
+        payload = self._payload()
+        if payload is None:
+            # unchanged
+            return True
         if self.data.get('id') is None:
             #new
-            res = self._client.post(self.service_name, payload)
+            res = self._client.post(self._collection_term(), payload)
         else:
             #update
-            res = self._client.put('{}?id={}'.format(self.service_name, self.data['id']), payload)
-        self.data.update(res[self.service_name])
+            res = self._client.put(self._item_term(), payload)
+        self._saved_as(res[self.service_name], everything=True)
+        self._forget()
         return True
 
     def delete(self):
@@ -89,7 +262,8 @@ class Service(object):
         Saving it after this will recreate it with a new id
         """
         if not self.data.get('id') is None:
-            res = self._client.delete('{}?id={}'.format(self.service_name, self.data['id']))
+            res = self._client.delete(self._item_term())
+            self._forget(deleted=True)
             self.data['id'] = None
         else:
             raise DataException("unable to delete {} without an id".format(self.service_name))
@@ -0,0 +1,29 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def pooled_session(config):
+    """ build a requests session that keeps connections to the api alive and
+    reuses them between calls. Pool settings are read from the config dict:
+        pool_connections: number of per-host pools to keep (default 10)
+        pool_maxsize: number of connections kept alive per host (default 10, or
+            more for the page_workers, map_workers, save_workers or report_workers configured,
+            so every worker thread keeps its connection)
+        pool_block: wait for a free connection instead of opening extra ones
+            when a host's pool is exhausted (default False)
+        keep_alive: set to False to close the connection after each call
+    The adapter does not retry: failed requests are resent by the client's RetryPolicy
+    """
+    adapter = HTTPAdapter(
+        pool_connections=config.get('pool_connections', 10),
+        pool_maxsize=config.get('pool_maxsize', max(
+            10, config.get('page_workers', 0), config.get('map_workers', 0), config.get('save_workers', 0),
+            config.get('report_workers', 0))),
+        pool_block=config.get('pool_block', False),
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if not config.get('keep_alive', True):
+        session.headers['Connection'] = 'close'
+    return session
@@ -0,0 +1,108 @@
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import logging
+import multiprocessing
+
+from .exceptions import ShardException
+from .advertiser import Advertiser
+
+# the outcome of a job for an advertiser: its result, or the exception it raised
+ShardResult = namedtuple('ShardResult', ['advertiser_id', 'result', 'error'])
+
+# the resource of a worker process
+_resource = None
+
+
+def _worker_resource(resource_class, config, token, fetched):
+    """ the resource of this worker process, built for its first shard with the
+    token of the parent process
+    """
+    global _resource
+    if _resource is None:
+        _resource = resource_class(config)
+        if token:
+            _resource._client._use_token(token, fetched)
+    return _resource
+
+
+def _run_shard(worker, job, advertisers):
+    """ run job(resource, advertiser) for each advertiser of a shard in a worker process.
+    worker holds the arguments of _worker_resource
+    """
+    resource = _worker_resource(*worker)
+    results = []
+    for data in advertisers:
+        advertiser = resource._service_class(Advertiser)(client=resource._client, data=data)
+        try:
+            results.append(ShardResult(advertiser.id, job(resource, advertiser), None))
+        except Exception as e:
+            logging.exception("job failed for advertiser {}".format(advertiser.id))
+            results.append(ShardResult(advertiser.id, None, e))
+    return results
+
+
+def shards(advertisers, shard_size):
+    """ generates lists of the data of shard_size advertisers """
+    shard = []
+    for advertiser in advertisers:
+        shard.append(advertiser._data)
+        if len(shard) == shard_size:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
+
+
+def sharded(resource, job, advertisers, processes=None, shard_size=1, max_pending=None):
+    """ generates a ShardResult for each advertiser as its job completes. The
+    advertisers are split in shards of shard_size, which are run by a pool of processes
+    (default: one per cpu), with at most max_pending shards (default: twice the
+    processes) queued at any time. Each process has a resource of its own, of the same
+    class and config, starting with the token of this resource.
+    job(resource, advertiser) runs in the worker processes, so it has to be a module
+    level function, and its result has to be picklable
+    """
+    client = resource._client
+    token = client.token()
+    processes = processes or multiprocessing.cpu_count()
+    max_pending = max_pending or 2 * processes
+    pending = {}
+    queued = shards(advertisers, shard_size)
+    # sent with each shard, as python 2 pools have no initializer
+    worker = (type(resource), client._config, token, client._token_last_fetched)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        def submit_next():
+            for shard in queued:
+                pending[executor.submit(_run_shard, worker, job, shard)] = shard
+                return
+        for _ in range(max_pending):
+            submit_next()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                shard = pending.pop(future)
+                submit_next()
+                error = future.exception()
+                if error is not None:
+                    # the shard could not be run, or its results could not be sent back
+                    for data in shard:
+                        yield ShardResult(data.get('id'), None, error)
+                    continue
+                for result in future.result():
+                    yield result
+
+
+def collect(results):
+    """ the result of each advertiser's job by advertiser id. Raises a ShardException
+    with the errors of all failed advertisers once every job is done
+    """
+    collected = {}
+    errors = {}
+    for result in results:
+        if result.error is None:
+            collected[result.advertiser_id] = result.result
+        else:
+            errors[result.advertiser_id] = result.error
+    if errors:
+        raise ShardException(errors, collected)
+    return collected
@@ -0,0 +1,139 @@
+import codecs
+import json
+
+WHITESPACE = ' \t\n\r'
+_decoder = json.JSONDecoder()
+_end = object()
+
+
+class StreamedResponse(object):
+    """ parses an api response body as it downloads. The items of the collection
+    are decoded one at a time, so only the current item is held in memory;
+    the other fields of the response end up in envelope.
+    """
+    def __init__(self, r, collection_name, chunk_size=65536):
+        self._r = r
+        self._chunks = r.iter_content(chunk_size=chunk_size)
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        self.collection_name = collection_name
+        self.envelope = {}
+        self._parsed = self._parse()
+        self._first = None
+
+    def start(self):
+        """ parse up to the first item of the collection, or the end of the response.
+        returns whether the collection has items; if not, the envelope is complete
+        """
+        if self._first is None:
+            self._first = next(self._parsed, _end)
+        return self._first is not _end
+
+    def items(self):
+        """ generates the items of the collection """
+        try:
+            if self.start():
+                yield self._first
+                for item in self._parsed:
+                    yield item
+        finally:
+            self._r.close()
+
+    def _more(self, size=1):
+        """ read chunks into the buffer until it holds at least size more characters,
+        or the body ends. returns False when the body had already ended
+        """
+        if self._eof:
+            return False
+        pieces = [self._buf[self._pos:]]
+        read = 0
+        while read < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._eof = True
+                pieces.append(self._text.decode(b'', final=True))
+                break
+            text = self._text.decode(chunk)
+            pieces.append(text)
+            read += len(text)
+        self._buf = ''.join(pieces)
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        """ the next non whitespace character, or None at the end of the body """
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._more():
+                return None
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError("expected '{}' in response at {}".format(char, self._buf[self._pos:self._pos + 20]))
+        self._pos += 1
+
+    def _value(self):
+        """ decode the next complete json value. While it is incomplete, the text
+        read ahead is doubled before decoding it again, so a value spanning many
+        chunks is decoded a logarithmic number of times
+        """
+        self._peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buf, self._pos)
+                # a number at the end of the buffer may continue in the next chunk
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except ValueError:
+                if self._eof:
+                    raise
+            self._more(len(self._buf) - self._pos)
+
+    def _members(self):
+        """ generates the keys of an object, leaving the position at each value """
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self._value()
+            self._expect(':')
+            yield key
+            char = self._peek()
+            self._pos += 1
+            if char == '}':
+                return
+            if char != ',':
+                raise ValueError("expected ',' or '}}' in response, got {}".format(char))
+
+    def _parse(self):
+        for key in self._members():
+            if key != 'response':
+                self._value()
+                continue
+            for name in self._members():
+                if name == self.collection_name and self._peek() == '[':
+                    for item in self._array():
+                        yield item
+                else:
+                    self.envelope[name] = self._value()
+
+    def _array(self):
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self._value()
+            char = self._peek()
+            self._pos += 1
+            if char == ']':
+                return
+            if char != ',':
+                raise ValueError("expected ',' or ']' in response, got {}".format(char))
@@ -4,6 +4,8 @@ from .exceptions import DataException
 class SubService(Service):
     """ An AppNexus API service that requires an advertiser
     The subclass should set _service_name to the name of the AppNexus API service """
+    __slots__ = ('_advertiser_id',)
+
     def __init__(self, client, data):
         if not self.service_name:
             raise NotImplemented("SubService should be subclassed.")
@@ -12,39 +14,35 @@ class SubService(Service):
 
         self._advertiser_id = data['advertiser_id']
         self._client = client
-        self.data = data
+        self._data = data
+        self._saved = None
+        self._children = None
 
     def _for_this_service(self, term):
         """ add a filter for this service id to the uri term """
         separator = '&' if '?' in term else '?'
         return term + "{}{}_id={}&advertiser_id={}".format(separator, self.service_name, self.id, self.advertiser_id)
 
+    def _scope(self):
+        """ the advertiser id that lookups from this item are limited to """
+        return self.advertiser_id
+
+    def _from_mirror(self, service, key_name, key_value):
+        """ None: the mirror does not know the parents of an item, so lookups filtered
+        by this item always go to the api
+        """
+        return None
+
+    def _collection_term(self):
+        """ the uri term to create a new item of this service """
+        return '{}?advertiser_id={}'.format(self.service_name, self.advertiser_id)
+
+    def _item_term(self):
+        """ the uri term for this item """
+        return '{}?id={}&advertiser_id={}'.format(self.service_name, self.data['id'], self.advertiser_id)
+
     @property
     def advertiser_id(self):
         return self._advertiser_id
 
-    def save(self):
-        """ creates or updates the item remotely """
-        advid = self.advertiser_id
-        payload = { self.service_name: self.data }
-        if self.data.get('id') is None:
-            #new
-            res = self._client.post('{}?advertiser_id={}'.format(self.service_name, advid), payload)
-        else:
-            #update
-            res = self._client.put('{}?id={}&advertiser_id={}'.format(self.service_name, self.data['id'], advid), payload)
-        self.data.update(res[self.service_name])
-        return True
-
-    def delete(self):
-        """ deletes the item remotely.
-        Saving it after this will recreate it with a new id
-        """
-        advid = self.advertiser_id
-        if not self.data.get('id') is None:
-            res = self._client.delete('{}?id={}&advertiser_id={}'.format(self.service_name, self.data['id'], advid))
-            self.data['id'] = None
-        else:
-            raise DataException("unable to delete {} without an id".format(self.service_name))
-
 
@@ -0,0 +1,46 @@
+from functools import partial
+
+
+class Summary(object):
+    """ a lightweight item from a listing that requested only some fields.
+    Unlike a Service it holds just the service class and the returned data,
+    use the service lookups to get the full item.
+    """
+    __slots__ = ('service', 'data')
+
+    def __init__(self, service, client, data):
+        self.service = service
+        self.data = data
+
+    @classmethod
+    def of(cls, service):
+        """ a constructor for summaries of a service, to pass to the paginator """
+        return partial(cls, service)
+
+    @property
+    def service_name(self):
+        return self.service.service_name
+
+    @property
+    def _data(self):
+        """ the data, read like that of a full item without taking its snapshot """
+        return self.data
+
+    @property
+    def id(self):
+        return self.data.get('id')
+
+    @property
+    def code(self):
+        return self.data.get('code')
+
+    @property
+    def name(self):
+        return self.data.get('name')
+
+    @property
+    def state(self):
+        return self.data.get('state')
+
+    def __repr__(self):
+        return "<{} summary {}>".format(self.service.service_name, self.data)
@@ -0,0 +1,135 @@
+from collections import namedtuple
+import json
+import os
+import sqlite3
+import threading
+
+from requests.compat import quote_plus
+from .exceptions import DataException
+from .paginator import paginator
+from .advertiser import Advertiser
+from .insertion_order import InsertionOrder
+from .line_item import LineItem
+
+# kind is 'created' or 'modified'
+Change = namedtuple('Change', ['kind', 'service_name', 'item'])
+
+
+class WatermarkStore(object):
+    """ keeps the last_modified time up to which each service was synced """
+    def load(self, key):
+        """ returns the watermark for this key, or None """
+        raise NotImplementedError
+
+    def save(self, key, watermark):
+        raise NotImplementedError
+
+
+class FileWatermarkStore(WatermarkStore):
+    """ watermarks in a json file on disk """
+    def __init__(self, path):
+        self._path = path
+        self._lock = threading.Lock()
+
+    def _load_all(self):
+        try:
+            with open(self._path) as f:
+                return json.load(f)
+        except (IOError, OSError):
+            return {}
+
+    def load(self, key):
+        return self._load_all().get(key)
+
+    def save(self, key, watermark):
+        with self._lock:
+            watermarks = self._load_all()
+            watermarks[key] = watermark
+            tmp = "{}.{}.tmp".format(self._path, os.getpid())
+            with open(tmp, 'w') as f:
+                json.dump(watermarks, f, indent=2, sort_keys=True)
+            os.rename(tmp, self._path)
+
+
+class SqliteWatermarkStore(WatermarkStore):
+    """ watermarks in a table of an SQLite database """
+    def __init__(self, path, table='watermarks'):
+        self._path = path
+        self._table = table
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS {} (key TEXT PRIMARY KEY, watermark TEXT)".format(table))
+
+    def _connect(self):
+        return sqlite3.connect(self._path)
+
+    def load(self, key):
+        db = self._connect()
+        try:
+            row = db.execute("SELECT watermark FROM {} WHERE key = ?".format(self._table), (key,)).fetchone()
+        finally:
+            db.close()
+        return row[0] if row else None
+
+    def save(self, key, watermark):
+        db = self._connect()
+        try:
+            with db:
+                db.execute("INSERT OR REPLACE INTO {} (key, watermark) VALUES (?, ?)".format(self._table), (key, watermark))
+        finally:
+            db.close()
+
+
+def watermark_store(config):
+    """ the watermark store for a client config: 'sync_file' is the json file or,
+    ending in .db, .sqlite or .sqlite3, the SQLite database to keep watermarks in
+    """
+    path = config.get('sync_file')
+    if not path:
+        raise DataException("Incremental sync requires a 'sync_file' in the config")
+    if os.path.splitext(path)[1] in ('.db', '.sqlite', '.sqlite3'):
+        return SqliteWatermarkStore(path)
+    return FileWatermarkStore(path)
+
+
+class IncrementalSync(object):
+    """ lists only the items modified since the previous sync of their service.
+    The watermark of a service, the latest last_modified seen, is saved once all its
+    changes are consumed, so an interrupted sync repeats its changes the next time.
+    Items modified exactly at the watermark are listed again by the next sync.
+    """
+    services = (Advertiser, InsertionOrder, LineItem)
+
+    def __init__(self, client, store, services=None):
+        self._client = client
+        self._store = store
+        if services is not None:
+            self.services = services
+
+    def _key(self, service):
+        return "{}:{}".format(self._client._config.get('env'), service.service_name)
+
+    def _term(self, service, watermark):
+        if watermark is None:
+            return service.service_name
+        return "{}?min_last_modified={}".format(service.service_name, quote_plus(watermark))
+
+    def service_changes(self, service):
+        """ generates a Change for each item of this service modified since its watermark """
+        key = self._key(service)
+        watermark = self._store.load(key)
+        latest = watermark
+        for item in paginator(self._client, self._term(service, watermark), service.collection_name, service):
+            created_on = item._data.get('created_on')
+            created = watermark is None or (created_on is not None and created_on >= watermark)
+            yield Change('created' if created else 'modified', service.service_name, item)
+            last_modified = item._data.get('last_modified')
+            if last_modified and (latest is None or last_modified > latest):
+                latest = last_modified
+        if latest != watermark:
+            self._store.save(key, latest)
+
+    def changes(self):
+        """ generates the changes of all the synced services """
+        for service in self.services:
+            for change in self.service_changes(service):
+                yield change
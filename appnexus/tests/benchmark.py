@@ -0,0 +1,127 @@
+""" benchmarks of the sdk against a replayed api, reporting requests per second,
+wall time and peak memory of each scenario. Run from this directory, e.g.
+
+    PYTHONPATH=../.. python benchmark.py --items 10000 --latency 0.01 --page-workers 4
+"""
+import argparse
+from time import time
+import tracemalloc
+
+from replay import Cassette, ReplayTransport
+from appnexus.resource import AppNexusResource
+from appnexus.advertiser import Advertiser
+
+
+class BenchmarkResult(object):
+    def __init__(self, name, requests, seconds, peak, items):
+        self.name = name
+        self.requests = requests
+        self.seconds = seconds
+        self.peak = peak  # bytes
+        self.items = items
+
+    @property
+    def requests_per_second(self):
+        return self.requests / self.seconds if self.seconds else 0
+
+    def __str__(self):
+        return "{:<14} {:>8} {:>8} {:>10.1f} {:>9.3f} {:>10.1f}".format(
+            self.name, self.items, self.requests, self.requests_per_second, self.seconds, self.peak / 1048576.0)
+
+
+def generated_cassette(items):
+    """ a cassette with a listing of this many advertisers """
+    cassette = Cassette()
+    cassette.add_collection('advertiser', 'advertisers', [
+        {'id': i, 'code': 'adv{}'.format(i), 'name': 'advertiser {}'.format(i), 'state': 'active',
+         'timezone': 'US/Mountain', 'last_modified': '2016-01-01 00:00:00'}
+        for i in range(1, items + 1)
+    ])
+    return cassette
+
+
+def new_hierarchy(client, line_items, campaigns, creatives):
+    """ a new insertion order with line items, campaigns, profiles and creatives """
+    io = Advertiser(client, {'id': 1}).create_insertion_order('io')
+    for l in range(line_items):
+        li = io.create_line_item('li{}'.format(l))
+        for c in range(campaigns):
+            campaign = li.create_campaign('ca{}.{}'.format(l, c))
+            campaign.create_profile('pr{}.{}'.format(l, c))
+            for r in range(creatives):
+                campaign.create_creative('cr{}.{}.{}'.format(l, c, r))
+    return io
+
+
+def scenarios(resource, items, refreshes):
+    """ name -> function running the scenario, returning the number of items it handled """
+    client = resource._client
+    ids = list(range(1, items + 1, 2))
+
+    def save():
+        io = new_hierarchy(client, 4, 4, 4)
+        io.save()
+        return 4 + 4 * 4 * 6 + 1
+
+    def refresh():
+        for _ in range(refreshes):
+            client._refresh_token()
+        return refreshes
+
+    return [
+        ('paginator', lambda: sum(1 for _ in resource._all(Advertiser))),
+        ('by_ids', lambda: sum(1 for _ in resource._by_ids(Advertiser, ids))),
+        ('save', save),
+        ('token_refresh', refresh),
+    ]
+
+
+def measure(name, scenario, transport):
+    requests = transport.requests
+    tracemalloc.start()
+    started = time()
+    try:
+        items = scenario()
+        seconds = time() - started
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return BenchmarkResult(name, transport.requests - requests, seconds, peak, items)
+
+
+def run(items=1000, latency=0, page_size=100, error_rate=0, page_workers=1, refreshes=100, only=None):
+    """ run the scenarios (or only those named) against a generated cassette.
+    returns a BenchmarkResult per scenario
+    """
+    transport = ReplayTransport(generated_cassette(items), latency, page_size, error_rate)
+    resource = AppNexusResource({
+        'username': 'benchmark', 'password': 'benchmark',
+        'page_workers': page_workers, 'throttle_backoff': 0,
+    })
+    transport.install(resource._client)
+    return [
+        measure(name, scenario, transport)
+        for name, scenario in scenarios(resource, items, refreshes)
+        if not only or name in only
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('.')[0])
+    parser.add_argument('--items', type=int, default=1000, help="advertisers in the listing")
+    parser.add_argument('--latency', type=float, default=0, help="seconds each request takes")
+    parser.add_argument('--page-size', type=int, default=100, help="most items per page")
+    parser.add_argument('--error-rate', type=float, default=0, help="fraction of requests throttled")
+    parser.add_argument('--page-workers', type=int, default=1, help="pages fetched concurrently")
+    parser.add_argument('--refreshes', type=int, default=100, help="token refreshes")
+    parser.add_argument('scenarios', nargs='*', help="scenarios to run (default: all)")
+    args = parser.parse_args()
+    results = run(args.items, args.latency, args.page_size, args.error_rate,
+                  args.page_workers, args.refreshes, args.scenarios)
+    print("{:<14} {:>8} {:>8} {:>10} {:>9} {:>10}".format('scenario', 'items', 'requests', 'req/s', 'seconds', 'peak MiB'))
+    for result in results:
+        print(result)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,28 @@
 from time import time
+import json
 
 from appnexus.client import AppNexusClient
 from requests import HTTPError
 
 
 class MockResponse(object):
-    def __init__(self, data, code=200):
+    def __init__(self, data, code=200, url=None):
         self._data = data
+        self.url = url
         self.code = code
+        self.status_code = code
+        self.headers = {}
 
     def raise_for_status(self):
         if self.code != 200:
-            raise HttpError("code = {}".format(self.code))
+            raise HTTPError("code = {}".format(self.code))
 
     def iter_content(self, chunk_size=1):
-        return (b for b in self._data)
+        body = json.dumps(self.json()).encode('utf-8')
+        return (body[i:i + chunk_size] for i in range(0, len(body), chunk_size))
+
+    def close(self):
+        pass
 
     def json(self):
         if 'status' not in self._data:
@@ -25,12 +33,7 @@ class MockResponse(object):
 class MockAppNexusClient(AppNexusClient):
     def __init__(self, config):
         """ Mocked low level wrapper for the app nexus REST API """
-        self._config = config
-        self.env = self._config.get('env')
-        self.uri = self.PROD_URI if self.env == "prod" else self.TEST_URI
-        self._token = None
-        self._token_last_fetched = 0  # seconds since epoch
-        self.refresh_from_memcache = False
+        super(MockAppNexusClient, self).__init__(config)
         # override the requests methods
         self._get = self._mk_mock('GET', self.handler)
         self._put = self._mk_mock('PUT', self.handler)
@@ -44,8 +47,8 @@ class MockAppNexusClient(AppNexusClient):
     def _dissect_uri(self, uri):
         """ break apart an AppNexus uri into the service and parameters """
         bare = uri.replace(self.uri, '').strip('/')
-        service, param_str = bare.split("?")
-        param_pairs = param_str.split('&')
+        service, _, param_str = bare.partition("?")
+        param_pairs = param_str.split('&') if param_str else []
         pairs = [tuple(p.split("=")) for p in param_pairs]
         params = dict(pairs)
         return service, params
@@ -55,10 +58,10 @@ class MockAppNexusClient(AppNexusClient):
         break apart components and return a mock requests response
         object
         """
-        def mock_response(uri, data=None, headers=None, files=None):
+        def mock_response(uri, data=None, headers=None, files=None, stream=False):
             (service, params) = self._dissect_uri(uri)
             response_data = handler(method, service, params, data, headers)
-            return MockResponse(response_data)
+            return MockResponse(response_data, url=uri)
         return mock_response
 
     def handler(self, method, service, params, data, headers):
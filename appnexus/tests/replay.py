@@ -0,0 +1,219 @@
+from itertools import count
+import json
+import random
+import threading
+from time import sleep
+
+from requests import HTTPError
+from requests.compat import urlparse, urlencode
+try:
+    from urllib.parse import parse_qsl
+except ImportError:
+    from urlparse import parse_qsl
+
+from appnexus.client import AppNexusClient
+
+# query parameters that select a page of a listing, or fields of its items,
+# rather than the listing
+VIEW_PARAMS = ('start_element', 'num_elements', 'fields')
+
+
+def split_uri(uri):
+    """ the path of an api uri, and its query parameters without the paging and fields ones """
+    parts = urlparse(uri)
+    params = dict((k, v) for k, v in parse_qsl(parts.query) if k not in VIEW_PARAMS)
+    return parts.path.strip('/'), params
+
+
+def params_key(method, path, params):
+    return "{} {}?{}".format(method, path, urlencode(sorted(params.items())))
+
+
+def interaction_key(method, uri):
+    return params_key(method, *split_uri(uri))
+
+
+def collection_name(response):
+    """ the name of the list of items in a listing response, or None """
+    if 'count' not in response:
+        return None
+    return next((k for k, v in sorted(response.items()) if isinstance(v, list)), None)
+
+
+class ReplayResponse(object):
+    """ the parts of a requests response the client uses """
+    def __init__(self, status_code, response, url, headers=None):
+        self.status_code = status_code
+        self.url = url
+        self._content = json.dumps({'response': response}).encode('utf-8')
+        self.headers = dict(headers or {}, **{'Content-Length': str(len(self._content))})
+
+    def json(self):
+        return json.loads(self._content.decode('utf-8'))
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HTTPError("{} Error for url: {}".format(self.status_code, self.url))
+
+    def iter_content(self, chunk_size=1):
+        return (self._content[i:i + chunk_size] for i in range(0, len(self._content), chunk_size))
+
+    def close(self):
+        pass
+
+
+class Cassette(object):
+    """ recorded api responses by request. The responses of listings hold all their
+    items, which are served in pages of the requested size when replayed
+    """
+    def __init__(self, interactions=None):
+        self.interactions = interactions or {}
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.interactions, f, indent=1, sort_keys=True)
+
+    def add(self, method, uri, response):
+        """ record a response; pages of a listing are merged into one response """
+        key = interaction_key(method, uri)
+        name = collection_name(response)
+        recorded = self.interactions.get(key)
+        if recorded is not None and name and collection_name(recorded) == name:
+            recorded[name].extend(response[name])
+            recorded['count'] = response['count']
+        else:
+            self.interactions[key] = dict(response)
+
+    def add_collection(self, term, name, items):
+        """ record a listing of these items """
+        self.interactions[interaction_key('GET', term)] = {
+            'status': 'OK', name: list(items), 'count': len(items), 'start_element': 0, 'num_elements': len(items),
+        }
+
+    def get(self, method, uri):
+        """ the recorded response to a request. Items by id that were not requested
+        that way are looked up in the recorded listing of their service
+        """
+        recorded = self.interactions.get(interaction_key(method, uri))
+        path, params = split_uri(uri)
+        if recorded is not None or method != 'GET' or 'id' not in params:
+            return recorded
+        ids = set(params.pop('id').split(','))
+        listing = self.interactions.get(params_key(method, path, params))
+        name = listing and collection_name(listing)
+        if not name:
+            return None
+        items = [item for item in listing[name] if str(item.get('id')) in ids]
+        return dict(listing, count=len(items), **{name: items})
+
+
+class ReplayTransport(object):
+    """ serves a client's requests from a cassette instead of the network.
+    latency: seconds each request takes
+    page_size: the most items a page of a listing holds, whatever the request asks
+    error_rate: the fraction of requests, other than auth ones, answered with error_status
+    (by default a 429 rate limit response, which the client retries)
+    Writes and auth requests that were not recorded are answered by echoing the
+    payload, with new ids for created items.
+    """
+    def __init__(self, cassette, latency=0, page_size=100, error_rate=0, error_status=429, seed=0):
+        self.cassette = cassette
+        self.latency = latency
+        self.page_size = page_size
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._ids = count(1000000)
+        self._lock = threading.Lock()
+
+    def install(self, client):
+        """ send the client's requests to this transport """
+        client._get = self.method('GET')
+        client._put = self.method('PUT')
+        client._post = self.method('POST')
+        client._delete = self.method('DELETE')
+        return client
+
+    def method(self, method):
+        def send(uri, data=None, headers=None, files=None, stream=False):
+            return self.respond(method, uri, data, files)
+        return send
+
+    def respond(self, method, uri, data=None, files=None):
+        path, params = split_uri(uri)
+        service = path.split('/')[-1]
+        with self._lock:
+            self.requests += 1
+            # auth requests are not retried by the client, so they never fail here
+            failed = service != 'auth' and self.error_rate and self._random.random() < self.error_rate
+            new_id = next(self._ids)
+        if self.latency:
+            sleep(self.latency)
+        if failed:
+            return ReplayResponse(self.error_status, {
+                'status': 'error', 'error_id': 'SYSTEM', 'error_code': 'RATE_EXCEEDED', 'error': 'replayed error',
+            }, uri, {'Retry-After': '0'})
+        recorded = self.cassette.get(method, uri)
+        if recorded is not None:
+            return ReplayResponse(200, self._page(recorded, uri), uri)
+        if method == 'POST' and service == 'auth':
+            return ReplayResponse(200, {'status': 'OK', 'token': 'replayed-token'}, uri)
+        if method == 'POST' and files is not None or hasattr(data, 'read'):
+            return ReplayResponse(200, {'status': 'OK', 'media-asset': [{'id': new_id}]}, uri)
+        if method in ('POST', 'PUT') and data:
+            item = json.loads(data)[service]
+            item = dict(item, id=item.get('id') or (int(params['id']) if 'id' in params else new_id))
+            return ReplayResponse(200, {'status': 'OK', 'id': item['id'], service: item}, uri)
+        if method == 'DELETE':
+            return ReplayResponse(200, {'status': 'OK'}, uri)
+        # the api answers unknown items with an ok http status and an error response
+        return ReplayResponse(200, {
+            'status': 'error', 'error_id': 'SYNTAX', 'error': '{} not found'.format(service),
+        }, uri)
+
+    def _page(self, recorded, uri):
+        name = collection_name(recorded)
+        if name is None:
+            return dict(recorded, status='OK')
+        params = dict(parse_qsl(urlparse(uri).query))
+        start = int(params.get('start_element', 0))
+        size = min(int(params.get('num_elements', 100)), self.page_size)
+        items = recorded[name][start:start + size]
+        if params.get('fields'):
+            fields = params['fields'].split(',')
+            items = [dict((f, item[f]) for f in fields if f in item) for item in items]
+        return dict(recorded, status='OK', start_element=start, num_elements=len(items), **{name: items})
+
+
+class Recorder(object):
+    """ records the responses a client gets from the api in a cassette """
+    def __init__(self, cassette=None):
+        self.cassette = cassette or Cassette()
+
+    def install(self, client):
+        """ record the responses to the client's requests """
+        for method in ('get', 'put', 'post', 'delete'):
+            setattr(client, '_' + method, self._recording(method.upper(), getattr(client, '_' + method)))
+        return client
+
+    def _recording(self, method, send):
+        def recording_send(uri, *args, **kwargs):
+            r = send(uri, *args, **kwargs)
+            if not kwargs.get('stream') and not uri.rstrip('/').endswith('auth'):
+                response = r.json().get('response', {})
+                if response.get('status') == 'OK':
+                    self.cassette.add(method, uri, response)
+            return r
+        return recording_send
+
+
+def replay_client(transport, config=None):
+    """ a client whose requests are served by a replay transport """
+    config = dict({'username': 'replay', 'password': 'replay', 'throttle_backoff': 0}, **(config or {}))
+    return transport.install(AppNexusClient(config))
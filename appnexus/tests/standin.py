@@ -0,0 +1,316 @@
+""" a local stand-in of the AppNexus api, for load tests of the sdk. It keeps items
+in memory, pages listings, expires tokens and answers with rate limit responses
+beyond the configured limits. Use it as a fixture:
+
+    with StandinServer(read_limit=1000) as server:
+        resource = AppNexusResource(server.client_config())
+
+or run it on its own, e.g. PYTHONPATH=../.. python standin.py --port 8080
+"""
+import argparse
+from collections import OrderedDict, deque
+from itertools import count
+import json
+import re
+import threading
+from time import time, gmtime, strftime
+from uuid import uuid4
+
+from requests.compat import urlparse
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qsl
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qsl
+
+# service name -> name of the collection in its listings
+COLLECTIONS = {
+    'advertiser': 'advertisers',
+    'insertion-order': 'insertion-orders',
+    'line-item': 'line-items',
+    'campaign': 'campaigns',
+    'creative-html': 'creative-html',
+    'profile': 'profiles',
+    'brand': 'brands',
+    'category': 'categories',
+}
+# query parameters that are not filters on the items
+VIEW_PARAMS = ('start_element', 'num_elements', 'fields', 'simple', 'member_id', 'min_last_modified')
+MAX_PAGE_SIZE = 100
+
+
+def error(error_id, message, **kwargs):
+    return dict({'status': 'error', 'error_id': error_id, 'error': message}, **kwargs)
+
+
+def now():
+    return strftime('%Y-%m-%d %H:%M:%S', gmtime())
+
+
+class StandinApi(object):
+    """ the in memory state and the responses of the stand-in api.
+    token_lifetime: seconds after which tokens are answered with NOAUTH
+    read_limit, write_limit: the most GET, and other, requests per rate_period seconds;
+    beyond them requests are answered with 429 responses
+    """
+    def __init__(self, token_lifetime=7200, read_limit=None, write_limit=None, rate_period=60):
+        self.token_lifetime = token_lifetime
+        self.limits = {'read': read_limit, 'write': write_limit}
+        self.rate_period = rate_period
+        self.items = dict((service, OrderedDict()) for service in COLLECTIONS)  # service -> id -> item
+        self.uploads = {}  # media asset id -> name
+        self.tokens = {}  # token -> time issued
+        self.requests = 0
+        self.throttled = 0
+        self._calls = {'read': deque(), 'write': deque()}
+        self._ids = count(1)
+        self._lock = threading.Lock()
+
+    def add(self, service, data):
+        """ store a new item of a service. returns it, with its id """
+        with self._lock:
+            return self._add(service, dict(data))
+
+    def _add(self, service, item):
+        item['id'] = next(self._ids)
+        item.setdefault('created_on', now())
+        item['last_modified'] = item['created_on']
+        self.items[service][item['id']] = item
+        return item
+
+    def expire_tokens(self):
+        """ answer all tokens issued so far with NOAUTH """
+        with self._lock:
+            self.tokens.clear()
+
+    def handle(self, method, uri, body, headers):
+        """ the http status, headers and response body of a request """
+        parts = urlparse(uri)
+        service = parts.path.strip('/').split('/')[-1]
+        params = dict(parse_qsl(parts.query))
+        with self._lock:
+            self.requests += 1
+            if service == 'auth':
+                return self._auth(body)
+            issued = self.tokens.get(headers.get('Authorization'))
+            if issued is None or time() - issued > self.token_lifetime:
+                return 401, {}, error('NOAUTH', 'Authentication failed - not logged in')
+            retry_after = self._throttle('read' if method == 'GET' else 'write')
+            if retry_after:
+                self.throttled += 1
+                return 429, {'Retry-After': str(retry_after)}, error(
+                    'SYSTEM', 'You have exceeded your request limit', error_code='RATE_EXCEEDED')
+            if service == 'creative-upload' and method == 'POST':
+                return self._upload(body)
+            if service not in COLLECTIONS:
+                return 404, {}, error('SYNTAX', 'Service {} not found'.format(service))
+            try:
+                if method == 'GET':
+                    return self._get(service, params)
+                if method == 'POST':
+                    return self._post(service, params, body)
+                if method == 'PUT':
+                    return self._put(service, params, body)
+                if method == 'DELETE':
+                    return self._delete(service, params)
+            except ValueError as e:
+                return 400, {}, error('SYNTAX', 'Invalid request: {}'.format(e))
+            return 405, {}, error('SYNTAX', 'Method {} not allowed'.format(method))
+
+    def _auth(self, body):
+        try:
+            auth = json.loads(body.decode('utf-8'))['auth']
+        except (ValueError, KeyError, TypeError):
+            return 400, {}, error('SYNTAX', 'Invalid auth request')
+        if not auth.get('username') or not auth.get('password'):
+            return 401, {}, error('UNAUTH', 'No match found for user/pass')
+        token = uuid4().hex
+        self.tokens[token] = time()
+        return 200, {}, {'status': 'OK', 'token': token}
+
+    def _throttle(self, kind):
+        """ records a call; returns the seconds to wait when it exceeds the limit """
+        limit = self.limits[kind]
+        if not limit:
+            return 0
+        calls = self._calls[kind]
+        started = time()
+        while calls and calls[0] <= started - self.rate_period:
+            calls.popleft()
+        if len(calls) >= limit:
+            return max(round(calls[0] + self.rate_period - started, 3), 0.001)
+        calls.append(started)
+        return 0
+
+    def _matches(self, service, item, key, values):
+        """ whether a filter on key matches the item: one of its fields, the id of a
+        related item it lists (e.g. campaign_id for a creative), or the id of a parent
+        listing it (e.g. insertion_order_id for a line item). Like the api, filters
+        that do not apply to the item are ignored
+        """
+        if key in item:
+            return str(item[key]) in values
+        if not key.endswith('_id'):
+            return True
+        related = item.get(key[:-3] + 's')
+        if isinstance(related, list):
+            return any(isinstance(r, dict) and str(r.get('id')) in values for r in related)
+        parents = self.items.get(key[:-3].replace('_', '-'), {})
+        field = COLLECTIONS[service].replace('-', '_')
+        listed = [parents[i].get(field) for i in parents if str(i) in values and field in parents[i]]
+        if not listed:
+            return True
+        return any(isinstance(r, dict) and r.get('id') == item['id'] for refs in listed for r in refs or ())
+
+    def _found(self, service, params):
+        filters = [(k, v.split(',')) for k, v in params.items() if k not in VIEW_PARAMS]
+        items = [
+            item for item in self.items[service].values()
+            if all(self._matches(service, item, key, values) for key, values in filters)
+        ]
+        if params.get('min_last_modified'):
+            items = [item for item in items if item['last_modified'] >= params['min_last_modified']]
+        return items
+
+    def _get(self, service, params):
+        items = self._found(service, params)
+        if params.get('fields'):
+            fields = params['fields'].split(',')
+            items = [dict((f, item[f]) for f in fields if f in item) for item in items]
+        # an item by id or code is returned by itself, except a campaign's creatives
+        single = 'code' in params or ('id' in params and ',' not in params['id'])
+        if service == 'creative-html' and 'campaign_id' in params:
+            single = False
+        if single:
+            if not items:
+                return 200, {}, error('SYNTAX', '{} not found'.format(service))
+            return 200, {}, {'status': 'OK', service: items[0]}
+        start = int(params.get('start_element', 0))
+        size = min(int(params.get('num_elements', MAX_PAGE_SIZE)), MAX_PAGE_SIZE)
+        page = items[start:start + size]
+        response = {
+            'status': 'OK', COLLECTIONS[service]: page,
+            'count': len(items), 'start_element': start, 'num_elements': len(page),
+        }
+        return 200, {}, response
+
+    def _payload(self, service, body):
+        try:
+            return json.loads(body.decode('utf-8'))[service]
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    def _post(self, service, params, body):
+        data = self._payload(service, body)
+        if data is None:
+            return 400, {}, error('SYNTAX', 'Invalid {} object'.format(service))
+        item = dict(data, created_on=now())
+        if 'advertiser_id' in params and service != 'advertiser':
+            item['advertiser_id'] = int(params['advertiser_id'])
+        item = self._add(service, item)
+        return 200, {}, {'status': 'OK', 'id': item['id'], service: item}
+
+    def _put(self, service, params, body):
+        data = self._payload(service, body)
+        item = self.items[service].get(int(params.get('id', 0)))
+        if data is None or item is None:
+            return 200, {}, error('SYNTAX', '{} not found'.format(service))
+        item.update(data, id=item['id'], last_modified=now())
+        return 200, {}, {'status': 'OK', 'id': item['id'], service: item}
+
+    def _delete(self, service, params):
+        if self.items[service].pop(int(params.get('id', 0)), None) is None:
+            return 200, {}, error('SYNTAX', '{} not found'.format(service))
+        return 200, {}, {'status': 'OK'}
+
+    def _upload(self, body):
+        match = re.search(br'filename="([^"]*)"', body)
+        asset_id = next(self._ids)
+        self.uploads[asset_id] = match.group(1).decode('utf-8') if match else None
+        return 200, {}, {'status': 'OK', 'media-asset': [{'id': asset_id, 'size': len(body)}]}
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        status, headers, response = self.server.api.handle(self.command, self.path, body, self.headers)
+        content = json.dumps({'response': response}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandinHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StandinServer(object):
+    """ the stand-in api served over http on localhost, in a background thread.
+    The keyword arguments configure its StandinApi; port 0 picks a free port
+    """
+    def __init__(self, port=0, **kwargs):
+        self.api = StandinApi(**kwargs)
+        self._server = StandinHTTPServer(('127.0.0.1', port), StandinHandler)
+        self._server.api = self.api
+        self._thread = None
+
+    @property
+    def uri(self):
+        return "http://127.0.0.1:{}".format(self._server.server_address[1])
+
+    def client_config(self, **config):
+        """ a client config using this server """
+        return dict({'api_uri': self.uri, 'username': 'standin', 'password': 'standin'}, **config)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="a local stand-in of the AppNexus api")
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--token-lifetime', type=int, default=7200)
+    parser.add_argument('--read-limit', type=int, help="GET requests per rate period")
+    parser.add_argument('--write-limit', type=int, help="other requests per rate period")
+    parser.add_argument('--rate-period', type=int, default=60, help="seconds")
+    args = parser.parse_args()
+    server = StandinServer(args.port, token_lifetime=args.token_lifetime, read_limit=args.read_limit,
+                           write_limit=args.write_limit, rate_period=args.rate_period)
+    print("serving on {}".format(server.uri))
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server._server.server_close()
+
+
+if __name__ == '__main__':
+    main()
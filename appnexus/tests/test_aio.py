@@ -0,0 +1,86 @@
+from unittest import TestCase
+import asyncio
+import json
+from time import time
+
+from mock_client import MockAppNexusClient
+from appnexus.aio.client import AsyncAppNexusClient, AsyncResponse
+from appnexus.aio.resource import AsyncAppNexusResource
+from appnexus.aio.service import AsyncCampaign, AsyncInsertionOrder
+
+class MockAsyncClient(AsyncAppNexusClient):
+    _dissect_uri = MockAppNexusClient._dissect_uri
+
+    def __init__(self, config):
+        super(MockAsyncClient, self).__init__(config)
+        self.calls = []
+
+    async def _refresh_token(self):
+        self._token = "MOCKTOKEN"
+        self._token_last_fetched = time()
+
+    async def _request(self, method, uri, data=None, headers=None, files=None):
+        service, params = self._dissect_uri(uri)
+        self.calls.append((method, service, params))
+        response_data = self.handler(method, service, params, data, headers)
+        response_data.setdefault('status', "OK")
+        return AsyncResponse(200, uri, json.dumps({'response': response_data}))
+
+    def handler(self, method, service, params, data, headers):
+        if method == 'POST':
+            return {service: {'id': len(self.calls), 'advertiser_id': 1}}
+        if service == 'line-item' and ',' in params['id']:
+            ids = params['id'].split(',')
+            return {
+                'line-items': [{'id': int(i), 'advertiser_id': 1} for i in ids],
+                'start_element': 0, 'num_elements': len(ids), 'count': len(ids),
+            }
+        if service == 'insertion-order':
+            return {service: {'id': 1, 'advertiser_id': 1, 'line_items': [{'id': 1}, {'id': 2}]}}
+        return {service: {'id': int(params.get('id', 1)), 'advertiser_id': 1}}
+
+def mock_resource():
+    cfg = {}
+    res = AsyncAppNexusResource(cfg)
+    res._client = MockAsyncClient(cfg)
+    return res
+
+class TestAsync(TestCase):
+    def test_lookup(self):
+        async def lookup():
+            res = mock_resource()
+            adv = await res.advertiser_by_id(1)
+            io = await adv.insertion_order_by_id(1)
+            return io, [li.id async for li in io.line_items()]
+        io, line_item_ids = asyncio.run(lookup())
+        self.assertIsInstance(io, AsyncInsertionOrder)
+        self.assertEqual(line_item_ids, [1, 2])
+
+    def test_save_tree(self):
+        async def save():
+            res = mock_resource()
+            adv = await res.advertiser_by_id(1)
+            io = adv.create_insertion_order(name='io')
+            li = io.create_line_item(name='li')
+            campaigns = [li.create_campaign(name='cp{}'.format(i)) for i in range(3)]
+            for cp in campaigns:
+                cp.create_creative(name='crea')
+            await io.save()
+            return res._client, io, li, campaigns
+        client, io, li, campaigns = asyncio.run(save())
+        self.assertIsInstance(campaigns[0], AsyncCampaign)
+        self.assertTrue(all(cp.id for cp in campaigns))
+        self.assertEqual(len(li.data['campaigns']), 3)
+        self.assertEqual(io.data['line_items'][0]['id'], li.id)
+        self.assertEqual(len([c for c in client.calls if c[0] == 'POST']), 8)
+
+    def test_close(self):
+        async def use():
+            cfg = {'token_lifetime': 10, 'token_refresh_ahead': 5}
+            async with AsyncAppNexusResource(cfg) as res:
+                res._client._use_token('TOKEN', time())
+                handle = res._client._refresh_timer
+            return res._client, handle
+        client, handle = asyncio.run(use())
+        self.assertTrue(handle.cancelled())
+        self.assertIsNone(client._refresh_timer)
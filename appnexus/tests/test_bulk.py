@@ -0,0 +1,76 @@
+from unittest import TestCase
+import itertools
+import json
+import threading
+
+from mock_client import MockAppNexusClient
+from appnexus import resource
+from appnexus.advertiser import Advertiser
+from appnexus.bulk import bulk_save, save_levels
+
+class BulkMockClient(MockAppNexusClient):
+    fail = None
+
+    def __init__(self, config):
+        super(BulkMockClient, self).__init__(config)
+        self.ids = itertools.count(1)
+        self.saved = []
+        self.lock = threading.Lock()
+
+    def handler(self, method, service, params, data, headers):
+        item = json.loads(data)[service]
+        if item.get('name') == self.fail:
+            return {'status': 'error', 'error_id': 'SYSTEM', 'error': 'failed'}
+        with self.lock:
+            self.saved.append((method, service, item.get('name')))
+            item_id = item.get('id') or next(self.ids)
+        saved = dict(item, id=item_id)
+        return {service: saved}
+
+def new_io(client, line_items=2, campaigns=2, creatives=2):
+    adv = Advertiser(client, {'id': 1})
+    io = adv.create_insertion_order('io')
+    for l in range(line_items):
+        li = io.create_line_item('li{}'.format(l))
+        for c in range(campaigns):
+            ca = li.create_campaign('ca{}.{}'.format(l, c))
+            ca.create_profile('pr{}.{}'.format(l, c))
+            for r in range(creatives):
+                ca.create_creative('cr{}.{}.{}'.format(l, c, r))
+    return io
+
+class TestBulkSave(TestCase):
+    def test_levels(self):
+        io = new_io(BulkMockClient({}))
+        levels, dependencies = save_levels([io])
+        self.assertEqual([len(level) for level in levels], [12, 4, 2, 1])
+        self.assertEqual(levels[-1], [io])
+        self.assertEqual(len(dependencies), 19)
+
+    def test_save(self):
+        client = BulkMockClient({})
+        io = new_io(client)
+        result = bulk_save([io], workers=4)
+        self.assertTrue(result.ok)
+        self.assertEqual(len(result.saved), 19)
+        self.assertEqual(len(client.saved), 19)
+        # parents are saved after their children, with summaries of them
+        self.assertEqual(client.saved[-1][:2], ('POST', 'insertion-order'))
+        self.assertEqual(len(io.data['line_items']), 2)
+        li = io._line_items[0]
+        self.assertEqual(len(li.data['campaigns']), 2)
+        ca = li._campaigns[0]
+        self.assertEqual(len(ca.data['creatives']), 2)
+        self.assertEqual(ca.data['profile_id'], ca._profile.id)
+
+    def test_failure(self):
+        client = BulkMockClient({})
+        client.fail = 'cr0.0.1'
+        io = new_io(client)
+        res = resource.AppNexusResource({})
+        res._client = client
+        result = res.save_all([io])
+        self.assertFalse(result.ok)
+        self.assertEqual([item.name for item, e in result.failed], ['cr0.0.1'])
+        self.assertEqual([item.name for item in result.skipped], ['ca0.0', 'li0', 'io'])
+        self.assertEqual(len(result.saved), 15)
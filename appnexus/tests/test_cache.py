@@ -0,0 +1,78 @@
+from unittest import TestCase
+from time import sleep
+
+from mock_client import MockAppNexusClient
+from appnexus import resource
+from appnexus.cache import IdentityMap
+from appnexus.insertion_order import InsertionOrder
+
+class CountingMockClient(MockAppNexusClient):
+    def handler(self, method, service, params, data, headers):
+        self.calls.append((method, service))
+        return {
+            'advertiser': {'id': 1, 'profile_id': 2},
+            'profile': {'id': 2, 'advertiser_id': 1},
+        }
+
+def mock_resource(cfg):
+    res = resource.AppNexusResource(cfg)
+    res._client = CountingMockClient(cfg)
+    res._client.calls = []
+    return res
+
+class TestIdentityMap(TestCase):
+    def test_lru(self):
+        cache = IdentityMap(max_size=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.stats(), {'hits': 2, 'misses': 1, 'size': 2})
+
+    def test_ttl(self):
+        cache = IdentityMap(ttl=0.05)
+        cache.put('a', 1)
+        sleep(0.1)
+        self.assertEqual(cache.get('a'), None)
+
+    def test_disabled_by_default(self):
+        res = mock_resource({})
+        res.advertiser_by_id(1)
+        res.advertiser_by_id(1)
+        self.assertEqual(len(res._client.calls), 2)
+        self.assertEqual(res.cache_stats(), None)
+
+    def test_repeated_lookups(self):
+        res = mock_resource({'cache_ttl': 60})
+        adv = res.advertiser_by_id(1)
+        self.assertIs(res.advertiser_by_id(1), adv)
+        profile = adv.profile()
+        self.assertIs(res.advertiser_by_id(1).profile(), profile)
+        self.assertEqual(res._client.calls, [('GET', 'advertiser'), ('GET', 'profile')])
+        self.assertEqual(res.cache_stats()['hits'], 3)
+
+    def test_invalidate_on_save(self):
+        res = mock_resource({'cache_ttl': 60})
+        adv = res.advertiser_by_id(1)
+        adv.data['name'] = 'renamed'
+        adv.save()
+        self.assertIsNot(res.advertiser_by_id(1), adv)
+        self.assertEqual(len(res._client.calls), 3)
+
+    def test_scoped_by_parent(self):
+        class ParentMockClient(CountingMockClient):
+            def handler(self, method, service, params, data, headers):
+                self.calls.append((method, service))
+                return {'line-item': {'id': 5, 'advertiser_id': 1, 'io': params.get('insertion-order_id')}}
+        res = resource.AppNexusResource({'cache_ttl': 60})
+        res._client = ParentMockClient({'cache_ttl': 60})
+        res._client.calls = []
+        io10 = res._service_class(InsertionOrder)(res._client, {'id': 10, 'advertiser_id': 1})
+        io20 = res._service_class(InsertionOrder)(res._client, {'id': 20, 'advertiser_id': 1})
+        self.assertEqual(io10.line_item_by_id(5).data['io'], '10')
+        self.assertEqual(io20.line_item_by_id(5).data['io'], '20')
+        self.assertEqual(len(res._client.calls), 2)
+        self.assertIs(io10.line_item_by_id(5), io10.line_item_by_id(5))
+        self.assertEqual(len(res._client.calls), 2)
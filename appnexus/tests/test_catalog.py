@@ -0,0 +1,67 @@
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+
+from mock_client import MockAppNexusClient
+from appnexus import resource
+from appnexus.brand import Brand
+from appnexus.catalog import Catalog
+
+BRANDS = [
+    {'id': 1, 'name': 'Acme'},
+    {'id': 2, 'name': 'acme foods'},
+    {'id': 3, 'name': 'Zebra'},
+]
+
+class CatalogMockClient(MockAppNexusClient):
+    def __init__(self, config):
+        super(CatalogMockClient, self).__init__(config)
+        self.calls = 0
+
+    def handler(self, method, service, params, data, headers):
+        self.calls += 1
+        return {
+            'brands': BRANDS,
+            'start_element': 0,
+            'num_elements': len(BRANDS),
+            'count': len(BRANDS),
+        }
+
+class TestCatalog(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def mock_resource(self, **config):
+        config['catalog_dir'] = self.dir
+        res = resource.AppNexusResource(config)
+        res._client = CatalogMockClient(config)
+        return res
+
+    def test_indexes(self):
+        catalog = Catalog(Brand, BRANDS)
+        self.assertEqual(catalog.by_id('2').name, 'acme foods')
+        self.assertIsNone(catalog.by_id(4))
+        self.assertEqual(catalog.by_name('Acme').id, 1)
+        self.assertIsNone(catalog.by_name('acme'))
+        self.assertEqual([b.id for b in catalog.by_prefix('ACM')], [1, 2])
+        self.assertEqual([b.id for b in catalog.by_prefix('acme ')], [2])
+        self.assertEqual(catalog.by_prefix('b'), [])
+
+    def test_snapshot(self):
+        res = self.mock_resource()
+        self.assertEqual(res.brand_by_name('Zebra').id, 3)
+        self.assertEqual(res.brand_by_id(1).name, 'Acme')
+        self.assertEqual(res._client.calls, 1)
+        self.assertTrue(os.path.exists(os.path.join(self.dir, 'brands.json.gz')))
+        # a new resource uses the snapshot
+        res = self.mock_resource()
+        self.assertEqual(res.brand_by_id(2).name, 'acme foods')
+        self.assertEqual(res._client.calls, 0)
+        # until it is stale
+        res = self.mock_resource(catalog_max_age=-1)
+        self.assertEqual(len(res.catalog(Brand)), 3)
+        self.assertEqual(res._client.calls, 1)
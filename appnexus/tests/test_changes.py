@@ -0,0 +1,61 @@
+from unittest import TestCase
+import json
+
+from mock_client import MockAppNexusClient
+from appnexus.line_item import LineItem
+
+class ChangesMockClient(MockAppNexusClient):
+    def __init__(self, config):
+        super(ChangesMockClient, self).__init__(config)
+        self.writes = []
+
+    def handler(self, method, service, params, data, headers):
+        if method in ('PUT', 'POST'):
+            sent = json.loads(data)['line-item']
+            self.writes.append((method, sent))
+            return {'line-item': dict(sent, id=1, advertiser_id=1)}
+        return {
+            'line-item': {
+                'id': 1, 'advertiser_id': 1, 'name': 'li', 'state': 'active',
+                'budget_intervals': [{'id': 1, 'parent_interval_id': 2}],
+            }
+        }
+
+def fetch_line_item(client):
+    res = client.get('line-item?id=1&advertiser_id=1')
+    return LineItem(client, res['line-item'])
+
+class TestChanges(TestCase):
+    def test_unchanged(self):
+        client = ChangesMockClient({})
+        li = fetch_line_item(client)
+        self.assertEqual(li.changes(), {})
+        li.save()
+        self.assertEqual(client.writes, [])
+
+    def test_only_changed_fields(self):
+        client = ChangesMockClient({})
+        li = fetch_line_item(client)
+        li.data['state'] = 'inactive'
+        li.data['budget_intervals'][0]['parent_interval_id'] = 3
+        self.assertEqual(li.changes()['state'], ('active', 'inactive'))
+        li.save()
+        method, sent = client.writes[0]
+        self.assertEqual(method, 'PUT')
+        self.assertEqual(sorted(sent), ['budget_intervals', 'state'])
+        self.assertEqual(li.changes(), {})
+        li.save()
+        self.assertEqual(len(client.writes), 1)
+
+    def test_snapshot_on_first_access(self):
+        client = ChangesMockClient({})
+        li = fetch_line_item(client)
+        self.assertIsNone(li._saved)
+        self.assertEqual(li.id, 1)
+        self.assertIsNone(li._saved)
+        data = li.data
+        data['state'] = 'inactive'
+        li.save()
+        data['name'] = 'renamed'
+        li.save()
+        self.assertEqual([sorted(sent) for _, sent in client.writes], [['state'], ['name']])
@@ -0,0 +1,48 @@
+from unittest import TestCase, skipIf
+import io
+import os
+import shutil
+import tempfile
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+from appnexus import export
+from appnexus.line_item import LineItem
+from appnexus.summary import Summary
+
+def line_items(count):
+    for i in range(count):
+        yield Summary(LineItem, None, {
+            'id': i, 'advertiser_id': 7, 'name': 'li{}'.format(i), 'state': 'active',
+            'revenue_value': '1.5' if i % 2 else None, 'campaigns': [{'id': 1}],
+        })
+
+class TestExport(TestCase):
+    def test_batches(self):
+        batches = list(export.batches(line_items(5), LineItem, batch_size=2))
+        self.assertEqual([len(b['id']) for b in batches], [2, 2, 1])
+        self.assertEqual(batches[0]['revenue_value'], [None, 1.5])
+        self.assertEqual(batches[0]['code'], [None, None])
+
+    def test_csv(self):
+        f = io.StringIO()
+        rows = export.write_csv(line_items(3), f, LineItem, columns=['id', 'name', 'campaigns'])
+        self.assertEqual(rows, 3)
+        lines = f.getvalue().splitlines()
+        self.assertEqual(lines[0], 'id,name,campaigns')
+        self.assertEqual(lines[1], '0,li0,"[{""id"": 1}]"')
+
+    @skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_parquet(self):
+        import pyarrow.parquet as pq
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, 'line_items.parquet')
+            self.assertEqual(export.write_parquet(line_items(25), path, LineItem, batch_size=10), 25)
+            table = pq.read_table(path)
+            self.assertEqual(table.num_rows, 25)
+            self.assertEqual(table.column_names, export.columns(LineItem))
+        finally:
+            shutil.rmtree(tmp)
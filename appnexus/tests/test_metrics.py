@@ -0,0 +1,63 @@
+from unittest import TestCase
+import socket
+
+from mock_client import MockAppNexusClient
+from appnexus.exceptions import NotFoundException
+from appnexus.metrics import Metrics, RequestEvent
+
+class MetricsMockClient(MockAppNexusClient):
+    throttled_calls = 1
+
+    def handler(self, method, service, params, data, headers):
+        if service == 'profile':
+            return {'status': 'error', 'error_id': 'SYNTAX', 'error': 'profile not found'}
+        if self.throttled_calls:
+            self.throttled_calls -= 1
+            return {'status': 'error', 'error_id': 'SYSTEM', 'error_code': 'RATE_EXCEEDED', 'error': 'rate'}
+        return {'advertiser': {'id': 1}}
+
+class TestMetrics(TestCase):
+    def test_hooks(self):
+        client = MetricsMockClient({'throttle_backoff': 0, 'metrics': True})
+        events = []
+        client.instrumentation.add_hook('before', lambda event: events.append(('before', event.service)))
+        client.instrumentation.add_hook('after', lambda event: events.append(('after', event.verb, event.retries)))
+        client.instrumentation.add_hook('error', lambda event: events.append(('error', type(event.error))))
+        client.get('advertiser?id=1')
+        client.put('advertiser?id=1', {'advertiser': {'name': 'x'}})
+        with self.assertRaises(NotFoundException):
+            client.get('profile?id=2')
+        self.assertEqual(events, [
+            ('before', 'advertiser'), ('after', 'GET', 1),
+            ('before', 'advertiser'), ('after', 'PUT', 0),
+            ('before', 'profile'), ('error', NotFoundException),
+        ])
+        text = client.metrics.prometheus()
+        self.assertIn('appnexus_requests_total{service="advertiser",verb="GET",status="200"} 1', text)
+        self.assertIn('appnexus_retries_total{service="advertiser",verb="GET"} 1', text)
+        self.assertIn('appnexus_errors_total{service="profile",verb="GET"} 1', text)
+        self.assertIn('appnexus_request_duration_seconds_bucket{service="advertiser",verb="PUT",le="+Inf"} 1', text)
+
+    def test_histogram(self):
+        metrics = Metrics(buckets=[0.1, 1])
+        for latency in (0.05, 0.1, 0.5, 2):
+            event = RequestEvent('GET', 'campaign?id=1')
+            event.latency = latency
+            metrics.observe(event)
+        text = metrics.prometheus()
+        self.assertIn('le="0.1"} 2', text)
+        self.assertIn('le="1"} 3', text)
+        self.assertIn('le="+Inf"} 4', text)
+        self.assertIn('appnexus_request_duration_seconds_sum{service="campaign",verb="GET"} 2.65', text)
+
+    def test_statsd(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server.bind(('127.0.0.1', 0))
+        server.settimeout(5)
+        client = MetricsMockClient({'statsd_host': '127.0.0.1', 'statsd_port': server.getsockname()[1]})
+        client.throttled_calls = 0
+        client.get('advertiser?id=1')
+        packet = server.recv(4096).decode('utf-8')
+        server.close()
+        self.assertIn('appnexus.advertiser.get.status_200:1|c', packet)
+        self.assertIn('appnexus.advertiser.get.latency:', packet)
@@ -0,0 +1,88 @@
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+
+from mock_client import MockAppNexusClient
+from appnexus import resource
+from appnexus.insertion_order import InsertionOrder
+
+LISTINGS = {
+    'brand': ('brands', [{'id': 1, 'name': 'Acme'}]),
+    'category': ('categories', [{'id': 2, 'name': 'Food'}]),
+    'advertiser': ('advertisers', [{'id': 7, 'name': 'adv', 'code': 'ADV'}]),
+    'insertion-order': ('insertion-orders', [{'id': 10, 'advertiser_id': 7, 'name': 'io', 'code': 'IO'}]),
+    'line-item': ('line-items', [{'id': 11, 'advertiser_id': 7, 'name': 'li'}]),
+    'campaign': ('campaigns', []),
+    'creative-html': ('creative-html', []),
+    'profile': ('profiles', [{'id': 12, 'advertiser_id': 7}]),
+}
+
+class MirrorMockClient(MockAppNexusClient):
+    def __init__(self, config):
+        super(MirrorMockClient, self).__init__(config)
+        self.calls = []
+
+    def handler(self, method, service, params, data, headers):
+        self.calls.append((method, service))
+        if method == 'DELETE':
+            return {}
+        if service == 'line-item' and params.get('insertion-order_id') == '20':
+            # io 20 is a sibling of io 10, without line items
+            if 'id' in params:
+                return {'status': 'error', 'error_id': 'SYNTAX', 'error': 'line-item not found'}
+            return {'line-items': [], 'start_element': 0, 'num_elements': 0, 'count': 0}
+        if service == 'advertiser' and params.get('id') == '8':
+            return {'advertiser': {'id': 8, 'name': 'other'}}
+        collection_name, items = LISTINGS[service]
+        return {
+            collection_name: items,
+            'start_element': 0,
+            'num_elements': len(items),
+            'count': len(items),
+        }
+
+class TestMirror(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        cfg = {'mirror_file': os.path.join(self.dir, 'mirror.db')}
+        self.res = resource.AppNexusResource(cfg)
+        self.res._client = MirrorMockClient(cfg)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_refresh_and_lookup(self):
+        counts = self.res.refresh_mirror()
+        self.assertEqual(counts['advertiser'], 1)
+        self.assertEqual(counts['profile'], 1)
+        self.assertEqual(counts['campaign'], 0)
+        calls = len(self.res._client.calls)
+        self.assertEqual(self.res.brand_by_name('Acme').id, 1)
+        self.assertEqual(self.res.category_by_name('Food').id, 2)
+        adv = self.res.advertiser_by_code('ADV')
+        self.assertEqual(adv.id, 7)
+        self.assertEqual(adv.insertion_order_by_code('IO').id, 10)
+        self.assertEqual(adv.insertion_order_by_id(10).name, 'io')
+        self.assertEqual(len(self.res._client.calls), calls)
+
+    def test_read_through(self):
+        self.assertEqual(self.res.advertiser_by_id(8).name, 'other')
+        self.assertEqual(self.res.advertiser_by_id(8).name, 'other')
+        self.assertEqual(self.res._client.calls, [('GET', 'advertiser')])
+        adv = self.res.advertiser_by_id(8)
+        adv.delete()
+        self.assertIsNone(self.res._client.mirror.get('advertiser', 'id', 8))
+
+    def test_sibling_parent(self):
+        self.res.refresh_mirror()
+        io = self.res.advertiser_by_id(7).insertion_order_by_id(10)
+        sibling = self.res._service_class(InsertionOrder)(self.res._client, {'id': 20, 'advertiser_id': 7})
+        self.assertIsNone(sibling.line_item_by_id(11))
+        self.assertIsNone(sibling.line_item_by_name('li'))
+        self.assertEqual(io.line_item_by_name('li').id, 11)
+
+    def test_refresh_does_not_copy(self):
+        items = list(self.res.advertiser_by_id(8)._all(InsertionOrder))
+        self.res._client.mirror.put_all('insertion-order', items)
+        self.assertEqual([item._saved for item in items], [None])
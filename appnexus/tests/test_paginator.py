@@ -0,0 +1,115 @@
+from unittest import TestCase
+
+from mock_client import MockAppNexusClient
+from appnexus import resource
+from appnexus.advertiser import Advertiser
+from appnexus.campaign import Campaign
+from appnexus.paginator import paginator, by_ids, id_chunks, fields_term
+from appnexus.summary import Summary
+
+class PagingMockClient(MockAppNexusClient):
+    count = 250
+
+    def handler(self, method, service, params, data, headers):
+        start = int(params.get('start_element', 0))
+        num = min(int(params.get('num_elements', 100)), self.count - start)
+        return {
+            'advertisers': [{'id': i} for i in range(start, start + num)],
+            'start_element': start,
+            'num_elements': num,
+            'count': self.count,
+        }
+
+class TestPaginator(TestCase):
+    def test_sequential(self):
+        client = PagingMockClient({})
+        ids = [a.id for a in paginator(client, 'advertiser?state=active', 'advertisers', Advertiser)]
+        self.assertEqual(ids, list(range(250)))
+
+    def test_parallel(self):
+        client = PagingMockClient({})
+        it = paginator(client, 'advertiser?state=active', 'advertisers', Advertiser, workers=4, max_pending=2)
+        ids = [a.id for a in it]
+        self.assertEqual(ids, list(range(250)))
+
+    def test_parallel_from_config(self):
+        client = PagingMockClient({})
+        client.page_workers = 3
+        client.count = 1001
+        ids = [a.id for a in paginator(client, 'advertiser?state=active', 'advertisers', Advertiser)]
+        self.assertEqual(ids, list(range(1001)))
+
+class IdsMockClient(MockAppNexusClient):
+    def handler(self, method, service, params, data, headers):
+        self.requested.append(params['id'])
+        ids = [int(i) for i in params['id'].split(',')]
+        if len(ids) == 1:
+            return {'advertiser': {'id': ids[0]}}
+        return {
+            'advertisers': [{'id': i} for i in ids],
+            'start_element': 0,
+            'num_elements': len(ids),
+            'count': len(ids),
+        }
+
+class TestByIds(TestCase):
+    def test_chunks(self):
+        chunks = id_chunks([1, 2, 2, 3, 4, 5], size=2)
+        self.assertEqual(chunks, ['1,2', '3,4', '5'])
+        chunks = id_chunks(range(1000, 1100), length=50)
+        self.assertTrue(all(len(c) <= 50 for c in chunks))
+        self.assertEqual(sum(c.count(',') + 1 for c in chunks), 100)
+
+    def test_chunked_lookup(self):
+        client = IdsMockClient({'page_workers': 4})
+        client.requested = []
+        ids = list(range(250)) + [1, 2, 3]
+        advertisers = by_ids(client, ids, 'advertiser?id={}'.format, 'advertisers', 'advertiser', Advertiser)
+        self.assertEqual([a.id for a in advertisers], list(range(250)))
+        self.assertEqual(len(client.requested), 3)
+
+    def test_single_id(self):
+        client = IdsMockClient({})
+        client.requested = []
+        advertisers = list(by_ids(client, [7], 'advertiser?id={}'.format, 'advertisers', 'advertiser', Advertiser))
+        self.assertEqual([a.id for a in advertisers], [7])
+
+class FieldsMockClient(MockAppNexusClient):
+    def handler(self, method, service, params, data, headers):
+        self.fields = params.get('fields')
+        return {
+            'advertisers': [{'id': 1, 'state': 'active'}, {'id': 2, 'state': 'inactive'}],
+            'start_element': 0,
+            'num_elements': 2,
+            'count': 2,
+        }
+
+class TestFields(TestCase):
+    def test_fields_term(self):
+        self.assertEqual(fields_term('advertiser', ['state']), 'advertiser?fields=id,state')
+        self.assertEqual(fields_term('advertiser?id=1', ('id', 'code')), 'advertiser?id=1&fields=id,code')
+        self.assertEqual(fields_term('advertiser', None), 'advertiser')
+
+    def test_summaries(self):
+        res = resource.AppNexusResource({})
+        res._client = FieldsMockClient({})
+        advertisers = list(res.advertisers(fields=['state']))
+        self.assertEqual(res._client.fields, 'id,state')
+        self.assertIsInstance(advertisers[0], Summary)
+        self.assertEqual([a.state for a in advertisers], ['active', 'inactive'])
+        self.assertEqual(advertisers[1].service, Advertiser)
+
+    def test_records(self):
+        res = resource.AppNexusResource({})
+        res._client = FieldsMockClient({})
+        advertisers = list(res.advertisers(records=True))
+        self.assertIsNone(res._client.fields)
+        self.assertIsInstance(advertisers[0], Summary)
+        self.assertEqual(advertisers[0].data, {'id': 1, 'state': 'active'})
+
+    def test_slots(self):
+        campaign = Campaign(None, {'id': 1, 'advertiser_id': 1})
+        self.assertFalse(hasattr(campaign, '__dict__'))
+        self.assertIsNone(campaign._creatives)
+        campaign.create_creative('creative')
+        self.assertEqual(len(campaign._new_creatives()), 1)
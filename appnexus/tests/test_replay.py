@@ -0,0 +1,72 @@
+from unittest import TestCase
+
+from replay import Cassette, ReplayTransport, Recorder, replay_client
+from mock_client import MockAppNexusClient
+from appnexus.exceptions import NotFoundException
+from appnexus.paginator import paginator
+from appnexus.summary import Summary
+from appnexus.advertiser import Advertiser
+import benchmark
+
+
+def advertisers(count):
+    return [{'id': i, 'name': 'adv{}'.format(i), 'state': 'active'} for i in range(1, count + 1)]
+
+class PagedMockClient(MockAppNexusClient):
+    def handler(self, method, service, params, data, headers):
+        start = int(params.get('start_element', 0))
+        items = advertisers(5)[start:start + 2]
+        return {'advertisers': items, 'count': 5, 'start_element': start, 'num_elements': len(items)}
+
+class TestReplay(TestCase):
+    def setUp(self):
+        self.cassette = Cassette()
+        self.cassette.add_collection('advertiser', 'advertisers', advertisers(25))
+
+    def test_pages(self):
+        transport = ReplayTransport(self.cassette, page_size=10)
+        client = replay_client(transport, {'username': 'test_pages'})
+        items = list(paginator(client, 'advertiser', 'advertisers', Advertiser))
+        self.assertEqual([a.id for a in items], list(range(1, 26)))
+        # one auth request, then three pages
+        self.assertEqual(transport.requests, 4)
+
+    def test_ids_and_fields(self):
+        client = replay_client(ReplayTransport(self.cassette))
+        items = list(paginator(client, 'advertiser?id=3,5', 'advertisers', Summary.of(Advertiser), fields=['name']))
+        self.assertEqual([a.data for a in items], [{'id': 3, 'name': 'adv3'}, {'id': 5, 'name': 'adv5'}])
+
+    def test_not_found(self):
+        client = replay_client(ReplayTransport(self.cassette))
+        with self.assertRaises(NotFoundException):
+            client.get('brand?id=1')
+
+    def test_errors_are_retried(self):
+        transport = ReplayTransport(self.cassette, page_size=5, error_rate=0.3, seed=1)
+        client = replay_client(transport, {'throttle_retries': 20})
+        items = list(paginator(client, 'advertiser', 'advertisers', Advertiser))
+        self.assertEqual(len(items), 25)
+        self.assertGreater(transport.requests, 6)
+
+    def test_writes_are_echoed(self):
+        client = replay_client(ReplayTransport(self.cassette))
+        res = client.post('advertiser', {'advertiser': {'name': 'new'}})
+        self.assertEqual(res['advertiser']['name'], 'new')
+        self.assertEqual(res['advertiser']['id'], res['id'])
+        res = client.put('advertiser?id=7', {'advertiser': {'name': 'renamed'}})
+        self.assertEqual(res['advertiser']['id'], 7)
+
+    def test_record(self):
+        recorder = Recorder()
+        recorded = recorder.install(PagedMockClient({}))
+        self.assertEqual(len(list(paginator(recorded, 'advertiser', 'advertisers', Advertiser))), 5)
+        # the recorded pages are replayed as one listing, in pages of any size
+        client = replay_client(ReplayTransport(recorder.cassette, page_size=3))
+        items = list(paginator(client, 'advertiser', 'advertisers', Advertiser))
+        self.assertEqual([a.id for a in items], [1, 2, 3, 4, 5])
+
+    def test_benchmark(self):
+        results = benchmark.run(items=50, page_size=10, page_workers=2, refreshes=3)
+        self.assertEqual([r.name for r in results], ['paginator', 'by_ids', 'save', 'token_refresh'])
+        self.assertEqual([r.items for r in results], [50, 25, 101, 3])
+        self.assertTrue(all(r.requests and r.peak for r in results))
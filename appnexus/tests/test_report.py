@@ -0,0 +1,89 @@
+from unittest import TestCase
+import io
+import json
+
+from mock_client import MockAppNexusClient
+from appnexus import resource
+from appnexus.exceptions import ApiException
+from appnexus.report import csv_lines
+
+CSV = b'day,imps,revenue,name\n2017-03-01,10,1.5,"multi\nline"\n2017-03-02,,2.25,caf\xc3\xa9\n'
+
+class CsvResponse(object):
+    def __init__(self, body):
+        self.body = body
+        self.status_code = 200
+        self.headers = {'Content-Length': str(len(body))}
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=1):
+        self.chunk_size = chunk_size
+        return (self.body[i:i + chunk_size] for i in range(0, len(self.body), chunk_size))
+
+class ReportMockClient(MockAppNexusClient):
+    def __init__(self, config):
+        super(ReportMockClient, self).__init__(config)
+        self.polls = {}
+        self.submitted = []
+        get = self._get
+        def download(uri, headers=None, stream=False):
+            if 'report-download' in uri:
+                self.download = CsvResponse(CSV)
+                return self.download
+            return get(uri, headers=headers)
+        self._get = download
+
+    def handler(self, method, service, params, data, headers):
+        if method == 'POST':
+            self.submitted.append(json.loads(data)['report'])
+            return {'report_id': 'r{}'.format(len(self.submitted))}
+        polls = self.polls[params['id']] = self.polls.get(params['id'], 0) + 1
+        ready = polls >= int(params['id'][1:])
+        return {'execution_status': 'ready' if ready else 'pending', 'report': {}}
+
+def mock_resource():
+    res = resource.AppNexusResource({'download_chunk_size': 7})
+    res._client = ReportMockClient({'download_chunk_size': 7})
+    return res
+
+class TestReport(TestCase):
+    def test_workflow(self):
+        res = mock_resource()
+        jobs = [res.submit_report({'report_type': 'network_analytics'}, advertiser_id=1) for i in range(3)]
+        self.assertEqual(jobs[2].report_id, 'r3')
+        self.assertRaises(ApiException, jobs[0].download, io.BytesIO())
+        res.wait_for_reports(jobs, interval=0.01)
+        self.assertEqual([job.status for job in jobs], ['ready'] * 3)
+        self.assertEqual(res._client.polls, {'r1': 1, 'r2': 2, 'r3': 3})
+        f = io.BytesIO()
+        self.assertEqual(jobs[0].download(f), len(CSV))
+        self.assertEqual(f.getvalue(), CSV)
+        self.assertEqual(res._client.download.chunk_size, 7)
+
+    def test_workers(self):
+        res = mock_resource()
+        res._client._config['report_workers'] = 2
+        used = []
+        def wait_all(jobs, interval, max_interval, timeout, workers):
+            used.append(workers)
+        original, resource.wait_all = resource.wait_all, wait_all
+        try:
+            res.wait_for_reports([])
+            res.wait_for_reports([], workers=5)
+        finally:
+            resource.wait_all = original
+        self.assertEqual(used, [2, 5])
+
+    def test_rows(self):
+        res = mock_resource()
+        job = res.submit_report({'report_type': 'network_analytics'})
+        job.status = 'ready'
+        rows = list(job.rows(types={'imps': int, 'revenue': float}))
+        self.assertEqual(rows[0], {'day': '2017-03-01', 'imps': 10, 'revenue': 1.5, 'name': 'multi\nline'})
+        self.assertEqual(rows[1]['imps'], None)
+        self.assertEqual(rows[1]['name'], u'caf\xe9')
+
+    def test_lines(self):
+        self.assertEqual(list(csv_lines([b'a,b\r', b'\n1,2', b'\n3'])), ['a,b\r\n', '1,2\n', '3'])
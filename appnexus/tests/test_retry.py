@@ -0,0 +1,146 @@
+from unittest import TestCase
+from time import sleep
+
+from requests import HTTPError
+from requests.exceptions import ConnectionError, ConnectTimeout
+
+from mock_client import MockAppNexusClient, MockResponse
+from appnexus.advertiser import Advertiser
+from appnexus.exceptions import CircuitOpenException
+from appnexus.paginator import paginator
+from appnexus.retry import RetryPolicy, RetryBudget, CircuitBreaker
+
+UNAVAILABLE = {'status': 'error', 'error_id': 'SYSTEM', 'error': 'unavailable'}
+
+class FlakyClient(MockAppNexusClient):
+    """ fails the first failures requests with errors, or 503 responses """
+    def __init__(self, config, failures=0, error=None):
+        config = dict({'retry_wait': 0.001}, **config)
+        super(FlakyClient, self).__init__(config)
+        self.failures = failures
+        self.error = error
+        self.sent = 0
+
+    def _mk_mock(self, method, handler):
+        def mock_response(uri, data=None, headers=None, files=None, stream=False):
+            self.sent += 1
+            if self.sent <= self.failures:
+                if self.error is not None:
+                    raise self.error
+                return MockResponse(dict(UNAVAILABLE), code=503, url=uri)
+            return MockResponse(self.handler(method, *self._dissect_uri(uri) + (data, headers)), url=uri)
+        return mock_response
+
+class TestRetryPolicy(TestCase):
+    def test_delay(self):
+        policy = RetryPolicy(backoff=1, max_backoff=5, jitter=False)
+        self.assertEqual([policy.delay(a) for a in range(5)], [1, 2, 4, 5, 5])
+        policy.jitter = True
+        self.assertTrue(all(0 <= policy.delay(3) <= 5 for _ in range(20)))
+
+    def test_retryable(self):
+        policy = RetryPolicy()
+        self.assertTrue(policy.retryable('GET', MockResponse({}, code=503)))
+        self.assertFalse(policy.retryable('POST', MockResponse({}, code=503)))
+        self.assertFalse(policy.retryable('GET', MockResponse({}, code=400)))
+        self.assertTrue(policy.retryable('PUT', error=ConnectionError()))
+        self.assertFalse(policy.retryable('POST', error=ConnectionError()))
+        self.assertTrue(policy.retryable('POST', error=ConnectTimeout()))
+
+    def test_budget(self):
+        budget = RetryBudget(ratio=0.5, min_retries=1)
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        budget.request()
+        budget.request()
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+
+class TestClientRetries(TestCase):
+    def test_5xx(self):
+        client = FlakyClient({}, failures=2)
+        self.assertEqual(client.get('advertiser?id=1')['status'], 'OK')
+        self.assertEqual(client.sent, 3)
+        client = FlakyClient({}, failures=5)
+        with self.assertRaises(HTTPError):
+            client.get('advertiser?id=1')
+        self.assertEqual(client.sent, 4)
+
+    def test_post_is_not_retried(self):
+        client = FlakyClient({}, failures=1)
+        with self.assertRaises(HTTPError):
+            client.post('advertiser', {'advertiser': {}})
+        self.assertEqual(client.sent, 1)
+        client = FlakyClient({}, failures=1, error=ConnectTimeout())
+        self.assertEqual(client.post('advertiser', {'advertiser': {}})['status'], 'OK')
+
+    def test_connection_errors(self):
+        client = FlakyClient({}, failures=2, error=ConnectionError("reset"))
+        self.assertEqual(client.delete('advertiser?id=1')['status'], 'OK')
+        client = FlakyClient({'retries': 1}, failures=2, error=ConnectionError("reset"))
+        with self.assertRaises(ConnectionError):
+            client.get('advertiser?id=1')
+
+    def test_circuit_breaker(self):
+        client = FlakyClient({'retries': 0, 'breaker_threshold': 2, 'breaker_reset': 0.05}, failures=4)
+        for _ in range(2):
+            with self.assertRaises(HTTPError):
+                client.get('advertiser?id=1')
+        with self.assertRaises(CircuitOpenException):
+            client.get('advertiser?id=1')
+        self.assertEqual(client.sent, 2)
+        # other services are not affected
+        with self.assertRaises(HTTPError):
+            client.get('brand?id=1')
+        sleep(0.06)
+        # the trial call fails, opening the circuit again
+        with self.assertRaises(HTTPError):
+            client.get('advertiser?id=1')
+        with self.assertRaises(CircuitOpenException):
+            client.get('advertiser?id=1')
+        sleep(0.06)
+        self.assertEqual(client.get('advertiser?id=1')['status'], 'OK')
+        self.assertEqual(client.retry_policy.breaker.state('advertiser'), 'closed')
+
+    def test_breaker_states(self):
+        breaker = CircuitBreaker(threshold=1, reset_timeout=0.05)
+        breaker.record('brand', failed=True)
+        self.assertEqual(breaker.state('brand'), 'open')
+        sleep(0.06)
+        self.assertEqual(breaker.state('brand'), 'half-open')
+        breaker.allow('brand')
+        # one trial at a time
+        with self.assertRaises(CircuitOpenException):
+            breaker.allow('brand')
+        breaker.record('brand', failed=False)
+        self.assertEqual(breaker.state('brand'), 'closed')
+
+    def test_reauth_each_time(self):
+        class ExpiringClient(FlakyClient):
+            def handler(self, method, service, params, data, headers):
+                if self.sent % 2:
+                    return {'status': 'error', 'error_id': 'NOAUTH', 'error': 'expired'}
+                return {'id': 1}
+        client = ExpiringClient({})
+        self.assertEqual(client.get('advertiser?id=1')['id'], 1)
+        self.assertEqual(client.get('advertiser?id=1')['id'], 1)
+        self.assertEqual(client.sent, 4)
+
+    def test_streamed_pages(self):
+        class ListingClient(FlakyClient):
+            def handler(self, method, service, params, data, headers):
+                return {'advertisers': [{'id': 1}, {'id': 2}], 'start_element': 0, 'num_elements': 2, 'count': 2}
+        client = ListingClient({'stream_pages': True}, failures=2)
+        ids = [a.id for a in paginator(client, 'advertiser', 'advertisers', Advertiser)]
+        self.assertEqual(ids, [1, 2])
+        self.assertEqual(client.sent, 3)
+        client = ListingClient({'stream_pages': True}, failures=1, error=ConnectionError("reset"))
+        self.assertEqual([a.id for a in paginator(client, 'advertiser', 'advertisers', Advertiser)], [1, 2])
+
+    def test_downloads(self):
+        client = FlakyClient({}, failures=2, error=ConnectionError("reset"))
+        self.assertIn(b'"status": "OK"', b''.join(client.data_get('report-download?id=1')))
+        self.assertEqual(client.sent, 3)
+        client = FlakyClient({'retries': 1}, failures=2)
+        with self.assertRaises(HTTPError):
+            client.data_get('report-download?id=1')
@@ -0,0 +1,24 @@
+from unittest import TestCase
+
+from appnexus.client import AppNexusClient
+from appnexus.session import pooled_session
+
+class TestSession(TestCase):
+    def test_pool_config(self):
+        session = pooled_session({'pool_maxsize': 20, 'pool_block': True, 'max_retries': 3})
+        adapter = session.get_adapter(AppNexusClient.PROD_URI)
+        self.assertEqual(adapter._pool_maxsize, 20)
+        self.assertTrue(adapter._pool_block)
+        # retries are left to the client's retry policy
+        self.assertEqual(adapter.max_retries.total, 0)
+        self.assertEqual(AppNexusClient({'max_retries': 1}).retry_policy.max_retries, 1)
+        self.assertEqual(session.headers['Connection'], 'keep-alive')
+
+    def test_no_keep_alive(self):
+        session = pooled_session({'keep_alive': False})
+        self.assertEqual(session.headers['Connection'], 'close')
+
+    def test_client_uses_session(self):
+        client = AppNexusClient({})
+        self.assertEqual(client._get, client._session.get)
+        self.assertEqual(client._post, client._session.post)
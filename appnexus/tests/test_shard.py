@@ -0,0 +1,51 @@
+from unittest import TestCase
+import os
+
+from mock_client import MockAppNexusClient
+from appnexus.resource import AppNexusResource
+from appnexus.exceptions import ShardException
+from appnexus import shard
+
+class ShardMockClient(MockAppNexusClient):
+    def handler(self, method, service, params, data, headers):
+        if service == 'advertiser':
+            advertisers = [{'id': i, 'name': 'adv{}'.format(i)} for i in range(1, 9)]
+            return {'advertisers': advertisers, 'count': 8, 'start_element': 0, 'num_elements': 8}
+        advertiser_id = int(params['advertiser_id'])
+        ios = [{'id': advertiser_id * 10 + i, 'advertiser_id': advertiser_id, 'name': 'io{}'.format(i)}
+               for i in range(advertiser_id)]
+        return {'insertion-orders': ios, 'count': len(ios), 'start_element': 0, 'num_elements': len(ios)}
+
+class ShardMockResource(AppNexusResource):
+    client_class = ShardMockClient
+
+def count_insertion_orders(resource, advertiser):
+    if advertiser.id == 3:
+        raise ValueError("no sync for 3")
+    return len(list(advertiser.insertion_orders())), resource._client._token, os.getpid()
+
+class TestShard(TestCase):
+    def test_sharded(self):
+        resource = ShardMockResource({'username': 'sharded'})
+        results = list(resource.sharded(count_insertion_orders, processes=2, shard_size=3))
+        self.assertEqual(sorted(r.advertiser_id for r in results), list(range(1, 9)))
+        failed = [r for r in results if r.error is not None]
+        self.assertEqual([r.advertiser_id for r in failed], [3])
+        self.assertIsInstance(failed[0].error, ValueError)
+        for r in results:
+            if r.error is None:
+                count, token, pid = r.result
+                self.assertEqual(count, r.advertiser_id)
+                # the workers use the parent's token
+                self.assertEqual(token, resource._client._token)
+                self.assertNotEqual(pid, os.getpid())
+
+    def test_collect(self):
+        resource = ShardMockResource({'username': 'sharded'})
+        advertisers = [a for a in resource.advertisers() if a.id != 3]
+        collected = shard.collect(resource.sharded(count_insertion_orders, advertisers, processes=2))
+        self.assertEqual(sorted(collected), [1, 2, 4, 5, 6, 7, 8])
+        with self.assertRaises(ShardException) as raised:
+            shard.collect(resource.sharded(count_insertion_orders, processes=2, shard_size=2))
+        self.assertEqual(list(raised.exception.errors), [3])
+        self.assertEqual(len(raised.exception.results), 7)
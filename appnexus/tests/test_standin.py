@@ -0,0 +1,85 @@
+from unittest import TestCase
+import os
+import tempfile
+
+import requests
+
+from standin import StandinServer
+from appnexus.resource import AppNexusResource
+
+class TestStandin(TestCase):
+    def setUp(self):
+        self.server = StandinServer().start()
+        self.api = self.server.api
+
+    def tearDown(self):
+        self.server.stop()
+
+    def resource(self, **config):
+        return AppNexusResource(self.server.client_config(**config))
+
+    def test_pages(self):
+        for i in range(250):
+            self.api.add('advertiser', {'name': 'adv{}'.format(i), 'code': 'adv{}'.format(i)})
+        resource = self.resource(page_workers=4)
+        names = [a.name for a in resource.advertisers()]
+        self.assertEqual(names, ['adv{}'.format(i) for i in range(250)])
+        self.assertEqual(resource.advertiser_by_code('adv7').name, 'adv7')
+        self.assertIsNone(resource.advertiser_by_code('nope'))
+        ids = [a.id for a in resource.advertisers(fields=['code'])][:3]
+        self.assertEqual([a.code for a in resource.advertisers_by_ids(ids)], ['adv0', 'adv1', 'adv2'])
+
+    def test_hierarchy(self):
+        resource = self.resource()
+        adv = resource.create_advertiser('adv')
+        adv.save()
+        io = adv.create_insertion_order('io')
+        li = io.create_line_item('li')
+        campaign = li.create_campaign('campaign')
+        campaign.create_profile('profile')
+        campaign.create_creative('creative', content='<div/>')
+        io.save()
+        self.assertEqual(len(self.api.items['creative-html']), 1)
+        fetched = [ca for i in adv.insertion_orders() for l in i.line_items() for ca in l.campaigns()]
+        self.assertEqual([ca.name for ca in fetched], ['campaign'])
+        self.assertEqual([c.name for c in fetched[0].creatives()], ['creative'])
+        self.assertEqual(fetched[0].profile().data['name'], 'profile')
+        walked = adv.walk()
+        self.assertEqual([l.name for i in walked for l in i.line_items()], ['li'])
+        walked_campaign = next(next(walked[0].line_items()).campaigns())
+        self.assertEqual([c.name for c in walked_campaign._prefetched('creatives')], ['creative'])
+
+    def test_rate_limit(self):
+        self.api.limits['read'] = 3
+        self.api.rate_period = 0.2
+        for i in range(10):
+            self.api.add('advertiser', {'name': 'adv{}'.format(i)})
+        resource = self.resource()
+        self.assertEqual([a.name for a in resource.advertisers()], ['adv{}'.format(i) for i in range(10)])
+        self.assertEqual(len([resource.advertiser_by_id(a.id) for a in resource.advertisers()]), 10)
+        self.assertGreater(self.api.throttled, 0)
+
+    def test_noauth(self):
+        auth = requests.post(self.server.uri + '/auth', json={'auth': {'username': 'u', 'password': 'p'}})
+        token = auth.json()['response']['token']
+        self.assertEqual(requests.get(self.server.uri + '/advertiser', headers={'Authorization': token}).status_code, 200)
+        self.api.expire_tokens()
+        r = requests.get(self.server.uri + '/advertiser', headers={'Authorization': token})
+        self.assertEqual(r.status_code, 401)
+        self.assertEqual(r.json()['response']['error_id'], 'NOAUTH')
+        # a streamed listing re-authenticates
+        self.api.add('advertiser', {'name': 'adv'})
+        resource = self.resource(stream_pages=True)
+        list(resource.advertisers())
+        self.api.expire_tokens()
+        self.assertEqual([a.name for a in resource.advertisers()], ['adv'])
+
+    def test_upload(self):
+        fd, path = tempfile.mkstemp(suffix='.zip')
+        os.write(fd, b'PK' * 1000)
+        os.close(fd)
+        try:
+            asset = self.resource().creative_upload_file(path, member_id=1)
+        finally:
+            os.remove(path)
+        self.assertEqual(self.api.uploads[asset['id']], os.path.basename(path))
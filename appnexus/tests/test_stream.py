@@ -0,0 +1,109 @@
+from unittest import TestCase
+import json
+
+from requests import HTTPError
+
+from mock_client import MockAppNexusClient, MockResponse
+from appnexus.advertiser import Advertiser
+from appnexus.exceptions import ApiException
+from appnexus.paginator import paginator
+from appnexus import stream
+from appnexus.stream import StreamedResponse
+
+class ChunkedResponse(MockResponse):
+    def __init__(self, body):
+        self.body = body.encode('utf-8')
+        self.closed = False
+        self.headers = {}
+
+    def json(self):
+        return json.loads(self.body.decode('utf-8'))
+
+    def iter_content(self, chunk_size=1):
+        # deliberately tiny chunks, splitting numbers and multi-byte characters
+        return (self.body[i:i + 3] for i in range(0, len(self.body), 3))
+
+    def close(self):
+        self.closed = True
+
+class PagingMockClient(MockAppNexusClient):
+    def handler(self, method, service, params, data, headers):
+        if self.noauth:
+            self.noauth = False
+            return {'status': 'error', 'error_id': 'NOAUTH', 'error': 'no auth'}
+        start = int(params.get('start_element', 0))
+        num = min(100, 250 - start)
+        return {
+            'advertisers': [{'id': i, 'html': u'<p>é</p>'} for i in range(start, start + num)],
+            'start_element': start,
+            'num_elements': num,
+            'count': 250,
+        }
+
+class ErrorMockClient(MockAppNexusClient):
+    def handler(self, method, service, params, data, headers):
+        return {'status': 'error', 'error_id': 'SYNTAX', 'error': 'bad'}
+
+class GatewayErrorClient(MockAppNexusClient):
+    """ answers with the html error page of a gateway """
+    def _mk_mock(self, method, handler):
+        def mock_response(uri, data=None, headers=None, files=None, stream=False):
+            r = ChunkedResponse('<html>Bad Gateway</html>')
+            r.status_code = r.code = 502
+            r.url = uri
+            return r
+        return mock_response
+
+class TestStream(TestCase):
+    def test_items_and_envelope(self):
+        body = json.dumps({'response': {
+            'status': 'OK',
+            'creatives': [{'id': 12345, 'content': u'café ☃'}, {'id': 2}],
+            'count': 1234567,
+        }})
+        r = ChunkedResponse(body)
+        streamed = StreamedResponse(r, 'creatives')
+        items = list(streamed.items())
+        self.assertEqual(items, [{'id': 12345, 'content': u'café ☃'}, {'id': 2}])
+        self.assertEqual(streamed.envelope, {'status': 'OK', 'count': 1234567})
+        self.assertTrue(r.closed)
+
+    def test_large_item(self):
+        class CountingDecoder(json.JSONDecoder):
+            calls = 0
+            def raw_decode(self, s, idx=0):
+                CountingDecoder.calls += 1
+                return super(CountingDecoder, self).raw_decode(s, idx)
+        content = u'é' * 30000
+        body = json.dumps({'response': {'creatives': [{'id': 1, 'content': content}, {'id': 2}]}})
+        decoder, stream._decoder = stream._decoder, CountingDecoder()
+        try:
+            items = list(StreamedResponse(ChunkedResponse(body), 'creatives').items())
+        finally:
+            stream._decoder = decoder
+        self.assertEqual([item['id'] for item in items], [1, 2])
+        self.assertEqual(items[0]['content'], content)
+        # not once per chunk of the item
+        self.assertLess(CountingDecoder.calls, 100)
+
+    def test_empty_collection(self):
+        streamed = StreamedResponse(ChunkedResponse('{"response": {"creatives": [], "status": "OK"}}'), 'creatives')
+        self.assertFalse(streamed.start())
+        self.assertEqual(list(streamed.items()), [])
+        self.assertEqual(streamed.envelope['status'], 'OK')
+
+    def test_streaming_paginator(self):
+        client = PagingMockClient({'stream_pages': True})
+        client.noauth = True
+        ids = [a.id for a in paginator(client, 'advertiser?state=active', 'advertisers', Advertiser)]
+        self.assertEqual(ids, list(range(250)))
+
+    def test_error(self):
+        client = ErrorMockClient({})
+        with self.assertRaises(ApiException):
+            client.get_stream('advertiser?id=1', 'advertisers')
+
+    def test_http_error(self):
+        client = GatewayErrorClient({'retries': 0})
+        with self.assertRaises(HTTPError):
+            client.get_stream('advertiser', 'advertisers')
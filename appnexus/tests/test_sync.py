@@ -0,0 +1,65 @@
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+
+from mock_client import MockAppNexusClient
+from appnexus import resource
+from appnexus.advertiser import Advertiser
+from appnexus.sync import FileWatermarkStore, SqliteWatermarkStore, watermark_store
+
+ADVERTISERS = [
+    {'id': 1, 'created_on': '2017-01-01 00:00:00', 'last_modified': '2017-03-01 00:00:00'},
+    {'id': 2, 'created_on': '2017-02-01 00:00:00', 'last_modified': '2017-03-05 00:00:00'},
+    {'id': 3, 'created_on': '2017-03-02 00:00:00', 'last_modified': '2017-03-02 00:00:00'},
+]
+
+class SyncMockClient(MockAppNexusClient):
+    def __init__(self, config):
+        super(SyncMockClient, self).__init__(config)
+        self.requested = []
+
+    def handler(self, method, service, params, data, headers):
+        self.requested.append(params.get('min_last_modified'))
+        since = params.get('min_last_modified', '').replace('+', ' ').replace('%3A', ':')
+        items = [a for a in ADVERTISERS if a['last_modified'] >= since]
+        return {
+            'advertisers': items,
+            'start_element': 0,
+            'num_elements': len(items),
+            'count': len(items),
+        }
+
+class TestSync(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def sync(self, sync_file):
+        cfg = {'sync_file': os.path.join(self.dir, sync_file)}
+        res = resource.AppNexusResource(cfg)
+        res._client = SyncMockClient(cfg)
+        return res, [(c.kind, c.item.id) for c in res.changes(services=[Advertiser])]
+
+    def test_incremental(self):
+        res, changes = self.sync('sync.json')
+        self.assertEqual(changes, [('created', 1), ('created', 2), ('created', 3)])
+        self.assertEqual(res._client.requested, [None])
+        ADVERTISERS.append({'id': 4, 'created_on': '2017-03-06 00:00:00', 'last_modified': '2017-03-06 00:00:00'})
+        try:
+            res, changes = self.sync('sync.json')
+        finally:
+            ADVERTISERS.pop()
+        self.assertEqual(res._client.requested, ['2017-03-05+00%3A00%3A00'])
+        self.assertEqual(changes, [('modified', 2), ('created', 4)])
+
+    def test_stores(self):
+        self.assertIsInstance(watermark_store({'sync_file': os.path.join(self.dir, 'w.json')}), FileWatermarkStore)
+        store = watermark_store({'sync_file': os.path.join(self.dir, 'w.db')})
+        self.assertIsInstance(store, SqliteWatermarkStore)
+        self.assertIsNone(store.load('prod:advertiser'))
+        store.save('prod:advertiser', '2017-03-05 00:00:00')
+        store.save('prod:advertiser', '2017-03-06 00:00:00')
+        self.assertEqual(SqliteWatermarkStore(os.path.join(self.dir, 'w.db')).load('prod:advertiser'), '2017-03-06 00:00:00')
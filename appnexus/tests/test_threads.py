@@ -0,0 +1,69 @@
+from unittest import TestCase
+import threading
+from time import sleep
+
+from mock_client import MockAppNexusClient
+from appnexus.resource import AppNexusResource
+from appnexus.session import pooled_session
+
+class ExpiringTokenClient(MockAppNexusClient):
+    """ accepts only the token issued last """
+    def __init__(self, config):
+        super(ExpiringTokenClient, self).__init__(config)
+        self.issued = 0
+        self.lock = threading.Lock()
+
+    def valid_token(self):
+        return 'TOKEN{}'.format(self.issued)
+
+    def _refresh_token(self):
+        with self.lock:
+            self.issued += 1
+        sleep(0.02)
+        self._set_token({'status': 'OK', 'token': self.valid_token()})
+
+    def handler(self, method, service, params, data, headers):
+        sleep(0.01)
+        if headers.get('Authorization') != self.valid_token():
+            return {'status': 'error', 'error_id': 'NOAUTH', 'error': 'expired'}
+        return {service: {'id': int(params['id'])}}
+
+class MappedResource(AppNexusResource):
+    client_class = ExpiringTokenClient
+
+class TestThreads(TestCase):
+    def test_shared_client(self):
+        client = ExpiringTokenClient({'username': 'shared-client', 'retries': 0})
+        self.assertEqual(client.get('advertiser?id=1')['advertiser']['id'], 1)
+        self.assertEqual(client.issued, 1)
+        # the api rejects the token while 20 threads use it
+        client.issued += 1
+        results = []
+        def get(i):
+            results.append(client.get('advertiser?id={}'.format(i))['advertiser']['id'])
+        threads = [threading.Thread(target=get, args=(i,)) for i in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(sorted(results), list(range(20)))
+        # one of them got a new token, the others used it
+        self.assertEqual(client.issued, 3)
+
+    def test_map(self):
+        resource = MappedResource({'username': 'mapped', 'map_workers': 4})
+        advertisers = resource.map(resource.advertiser_by_id, range(1, 31))
+        self.assertEqual([a.id for a in advertisers], list(range(1, 31)))
+        self.assertEqual(resource.map(lambda i: i * 2, [3, 1, 2], workers=2), [6, 2, 4])
+        def fail(i):
+            if i == 2:
+                raise ValueError(i)
+            return i
+        with self.assertRaises(ValueError):
+            resource.map(fail, range(5))
+
+    def test_pool_size(self):
+        adapter = pooled_session({'map_workers': 32}).get_adapter('https://api.appnexus.com')
+        self.assertEqual(adapter._pool_maxsize, 32)
+        adapter = pooled_session({}).get_adapter('https://api.appnexus.com')
+        self.assertEqual(adapter._pool_maxsize, 10)
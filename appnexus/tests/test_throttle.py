@@ -0,0 +1,40 @@
+from unittest import TestCase
+
+from mock_client import MockAppNexusClient
+from appnexus.exceptions import RateLimitException
+from appnexus.throttle import TokenBucket, RateLimiter
+
+class ThrottlingMockClient(MockAppNexusClient):
+    throttled_calls = 2
+
+    def handler(self, method, service, params, data, headers):
+        if self.throttled_calls:
+            self.throttled_calls -= 1
+            return {'status': 'error', 'error_id': 'SYSTEM', 'error_code': 'RATE_EXCEEDED', 'error': 'rate'}
+        return {'advertiser': {'id': 1}}
+
+class TestThrottle(TestCase):
+    def test_bucket(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+        self.assertEqual(bucket.delay(), 0)
+        self.assertEqual(bucket.delay(), 0)
+        self.assertAlmostEqual(bucket.delay(), 0.1, places=2)
+        self.assertAlmostEqual(bucket.delay(), 0.2, places=2)
+
+    def test_separate_budgets(self):
+        limiter = RateLimiter(read_limit=60, write_limit=6)
+        self.assertEqual(limiter.delay('read'), 0)
+        self.assertEqual(limiter.delay('write'), 0)
+        self.assertAlmostEqual(limiter.delay('read'), 1, places=1)
+        self.assertAlmostEqual(limiter.delay('write'), 10, places=1)
+
+    def test_retry_throttled(self):
+        client = ThrottlingMockClient({'throttle_backoff': 0})
+        res = client.get('advertiser?id=1')
+        self.assertEqual(res['advertiser']['id'], 1)
+        self.assertEqual(client.throttled_calls, 0)
+
+    def test_retries_exhausted(self):
+        client = ThrottlingMockClient({'throttle_backoff': 0, 'throttle_retries': 1})
+        with self.assertRaises(RateLimitException):
+            client.get('advertiser?id=1')
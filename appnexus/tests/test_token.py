@@ -0,0 +1,96 @@
+from unittest import TestCase
+import gc
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from time import sleep, time
+
+from mock_client import MockResponse
+from appnexus.client import AppNexusClient
+from appnexus.token_store import FileTokenStore
+
+class AuthCountingClient(AppNexusClient):
+    def __init__(self, config):
+        super(AuthCountingClient, self).__init__(config)
+        self.auth_calls = 0
+        self._post = self._mock_auth
+
+    def _mock_auth(self, uri, data=None, headers=None):
+        self.auth_calls += 1
+        sleep(0.05)
+        return MockResponse({'token': 'TOKEN{}'.format(self.auth_calls)}, url=uri)
+
+class TestToken(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_file_store(self):
+        store = FileTokenStore(os.path.join(self.dir, 'token'))
+        self.assertEqual(store.load(), (None, 0))
+        now = int(time())
+        with store.lock():
+            store.save('abc', now)
+        self.assertEqual(store.load(), ('abc', now))
+
+    def test_single_flight(self):
+        client = AuthCountingClient({'username': 'single-flight'})
+        threads = [threading.Thread(target=client.token) for _ in range(10)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(client.auth_calls, 1)
+        self.assertEqual(client.token(), 'TOKEN1')
+
+    def test_shared_store(self):
+        cfg = {'token_file': os.path.join(self.dir, 'token')}
+        first = AuthCountingClient(cfg)
+        second = AuthCountingClient(cfg)
+        self.assertEqual(first.token(), 'TOKEN1')
+        self.assertEqual(second.token(), 'TOKEN1')
+        self.assertEqual(second.auth_calls, 0)
+
+    def test_memory_store_per_uri(self):
+        first = AuthCountingClient({'username': 'per-uri', 'api_uri': 'http://127.0.0.1:1'})
+        second = AuthCountingClient({'username': 'per-uri', 'api_uri': 'http://127.0.0.1:2'})
+        again = AuthCountingClient({'username': 'per-uri', 'api_uri': 'http://127.0.0.1:1'})
+        self.assertEqual(first.token(), 'TOKEN1')
+        self.assertEqual(second.token(), 'TOKEN1')
+        self.assertEqual(second.auth_calls, 1)
+        again.token()
+        self.assertEqual(again.auth_calls, 0)
+
+    def test_lifetime(self):
+        client = AuthCountingClient({'username': 'lifetime', 'token_lifetime': 0.1})
+        client.token()
+        client.token()
+        self.assertEqual(client.auth_calls, 1)
+        sleep(0.15)
+        self.assertEqual(client.token(), 'TOKEN2')
+
+    def test_refresh_ahead(self):
+        client = AuthCountingClient({'username': 'ahead', 'token_lifetime': 10, 'token_refresh_ahead': 9.7})
+        self.assertEqual(client.token(), 'TOKEN1')
+        sleep(0.45)
+        self.assertEqual(client.auth_calls, 2)
+        self.assertEqual(client._token, 'TOKEN2')
+        client._refresh_timer.cancel()
+
+    def test_close(self):
+        client = AuthCountingClient({'username': 'closed', 'token_lifetime': 10, 'token_refresh_ahead': 5})
+        client.token()
+        timer = client._refresh_timer
+        client.close()
+        timer.join()
+        self.assertIsNone(client._refresh_timer)
+        client._use_token('TOKEN', time())
+        self.assertIsNone(client._refresh_timer)
+        closed = weakref.ref(client)
+        del client, timer
+        gc.collect()
+        self.assertIsNone(closed())
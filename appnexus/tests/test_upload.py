@@ -0,0 +1,92 @@
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+import threading
+
+from mock_client import MockAppNexusClient
+from appnexus import resource
+from appnexus.upload import MultipartFile, UploadIndex, content_hash
+
+class UploadMockClient(MockAppNexusClient):
+    def __init__(self, config):
+        super(UploadMockClient, self).__init__(config)
+        self.bodies = []
+        self.lock = threading.Lock()
+
+    def handler(self, method, service, params, data, headers):
+        body = data.read()
+        with self.lock:
+            self.bodies.append(body)
+            asset_id = len(self.bodies)
+        if b'broken' in body:
+            return {'status': 'error', 'error_id': 'SYSTEM', 'error': 'failed'}
+        return {'media-asset': [{'id': asset_id}]}
+
+class TestUpload(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, name, content):
+        path = os.path.join(self.dir, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def mock_resource(self):
+        cfg = {'upload_index': os.path.join(self.dir, 'uploads.json')}
+        res = resource.AppNexusResource(cfg)
+        res._client = UploadMockClient(cfg)
+        return res
+
+    def test_multipart(self):
+        path = self.write('a.zip', b'x' * 100000)
+        body = MultipartFile(path, 'a.zip', {'type': 'html'})
+        self.assertTrue(body.content_type.startswith('multipart/form-data; boundary='))
+        data = b''
+        while True:
+            chunk = body.read(8192)
+            if not chunk:
+                break
+            data += chunk
+        self.assertEqual(len(data), len(body))
+        self.assertIn(b'name="type"\r\n\r\nhtml\r\n', data)
+        self.assertIn(b'filename="a.zip"', data)
+        self.assertIn(b'\r\n\r\n' + b'x' * 100000 + b'\r\n--', data)
+
+    def test_dedupe(self):
+        paths = [
+            self.write('a.zip', b'package a'),
+            self.write('b.zip', b'package b'),
+            self.write('a2.zip', b'package a'),
+            self.write('c.zip', b'broken package'),
+        ]
+        res = self.mock_resource()
+        result = res.creative_uploads(paths, member_id=1, workers=2)
+        self.assertEqual(len(res._client.bodies), 3)
+        self.assertEqual(result.assets[paths[0]], result.assets[paths[2]])
+        self.assertEqual(result.reused, [paths[2]])
+        self.assertEqual(list(result.failed), [paths[3]])
+        # a later run reuses the remembered uploads
+        res = self.mock_resource()
+        result = res.creative_uploads(paths[:3], member_id=1)
+        self.assertEqual(res._client.bodies, [])
+        self.assertEqual(len(result.reused), 3)
+        index = UploadIndex(os.path.join(self.dir, 'uploads.json'))
+        self.assertIsNone(index.get(2, content_hash(paths[0])))
+
+    def test_index_flush(self):
+        path = os.path.join(self.dir, 'index.json')
+        index = UploadIndex(path)
+        for i in range(3):
+            index.put(1, 'digest{}'.format(i), {'id': i})
+        self.assertFalse(os.path.exists(path))
+        index.flush()
+        self.assertEqual(UploadIndex(path).get(1, 'digest2'), {'id': 2})
+        # unchanged since, so not written again
+        os.remove(path)
+        index.flush()
+        self.assertFalse(os.path.exists(path))
@@ -0,0 +1,93 @@
+from unittest import TestCase
+import threading
+
+from mock_client import MockAppNexusClient
+from appnexus.advertiser import Advertiser
+
+ITEMS = {
+    'insertion-order': ('insertion-orders', [
+        {'id': 1, 'advertiser_id': 7, 'line_items': [{'id': 11}, {'id': 12}]},
+        {'id': 2, 'advertiser_id': 7, 'line_items': []},
+    ]),
+    'line-item': ('line-items', [
+        {'id': 11, 'advertiser_id': 7, 'profile_id': 41, 'campaigns': [{'id': 21}]},
+        {'id': 12, 'advertiser_id': 7, 'campaigns': None},
+    ]),
+    'campaign': ('campaigns', [
+        {'id': 21, 'advertiser_id': 7, 'profile_id': 42, 'creatives': [{'id': 31}, {'id': 32}]},
+    ]),
+    'creative-html': ('creative-html', [
+        {'id': 31, 'advertiser_id': 7},
+        {'id': 32, 'advertiser_id': 7},
+    ]),
+    'profile': ('profiles', [
+        {'id': 41, 'advertiser_id': 7},
+        {'id': 42, 'advertiser_id': 7},
+    ]),
+}
+
+class WalkMockClient(MockAppNexusClient):
+    def __init__(self, config):
+        super(WalkMockClient, self).__init__(config)
+        self.requested = []
+        self.lock = threading.Lock()
+
+    def handler(self, method, service, params, data, headers):
+        with self.lock:
+            self.requested.append(service)
+        assert params['advertiser_id'] == '7'
+        collection_name, items = ITEMS[service]
+        return {
+            collection_name: items,
+            'start_element': 0,
+            'num_elements': len(items),
+            'count': len(items),
+        }
+
+class TestWalk(TestCase):
+    def test_walk(self):
+        client = WalkMockClient({})
+        adv = Advertiser(client, {'id': 7})
+        ios = adv.walk()
+        self.assertEqual(sorted(client.requested), ['campaign', 'creative-html', 'insertion-order', 'line-item', 'profile'])
+        self.assertEqual([io.id for io in ios], [1, 2])
+        line_items = list(ios[0].line_items())
+        self.assertEqual([li.id for li in line_items], [11, 12])
+        self.assertEqual(list(ios[1].line_items()), [])
+        self.assertEqual(line_items[0].profile().id, 41)
+        self.assertEqual(list(line_items[1].campaigns()), [])
+        campaign = next(line_items[0].campaigns())
+        self.assertEqual([c.id for c in campaign.creatives()], [31, 32])
+        self.assertEqual(campaign.profile().id, 42)
+        self.assertEqual(len(client.requested), 5)
+
+    def test_walk_levels(self):
+        client = WalkMockClient({})
+        adv = Advertiser(client, {'id': 7})
+        ios = adv.walk(include=['campaigns'])
+        self.assertEqual(sorted(client.requested), ['campaign', 'insertion-order', 'line-item'])
+        campaign = next(next(ios[0].line_items()).campaigns())
+        self.assertEqual(campaign.id, 21)
+
+    def test_missing_children_are_fetched(self):
+        class PartialListingClient(WalkMockClient):
+            def handler(self, method, service, params, data, headers):
+                res = super(PartialListingClient, self).handler(method, service, params, data, headers)
+                if service == 'creative-html':
+                    # the listing lacks creative 32, which is found by id
+                    ids = params.get('id', '31').split(',')
+                    res['creative-html'] = [c for c in res['creative-html'] if str(c['id']) in ids]
+                    res['count'] = res['num_elements'] = len(res['creative-html'])
+                return res
+        client = PartialListingClient({})
+        ios = Advertiser(client, {'id': 7}).walk()
+        campaign = next(next(ios[0].line_items()).campaigns())
+        self.assertEqual([c.id for c in campaign.creatives()], [31, 32])
+        self.assertEqual(client.requested.count('creative-html'), 2)
+
+    def test_walk_does_not_copy(self):
+        ios = Advertiser(WalkMockClient({}), {'id': 7}).walk()
+        line_items = list(ios[0].line_items())
+        campaigns = list(line_items[0].campaigns())
+        walked = ios + line_items + campaigns + list(campaigns[0].creatives())
+        self.assertEqual([item._saved for item in walked], [None] * len(walked))
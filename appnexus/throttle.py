@@ -0,0 +1,91 @@
+import threading
+from time import time, sleep
+
+
+class TokenBucket(object):
+    """ paces calls to rate per second, allowing bursts of up to capacity calls """
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last = time()
+        self._lock = threading.Lock()
+
+    def delay(self):
+        """ take a token, returns the number of seconds to wait before using it """
+        with self._lock:
+            now = time()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0
+            return -self._tokens / self.rate
+
+
+class RateLimiter(object):
+    """ client side scheduler keeping api calls within the AppNexus read and write limits.
+    Reads (GET) and writes (POST, PUT, DELETE) have separate budgets of calls per period;
+    a budget of None leaves that kind of call unpaced. Throttled calls are retried
+    up to max_retries times, after the back-off the server asks for.
+    """
+    def __init__(self, read_limit=None, write_limit=None, period=60, burst=1, max_retries=5, backoff=1):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._buckets = {}
+        if read_limit:
+            self._buckets['read'] = TokenBucket(float(read_limit) / period, burst)
+        if write_limit:
+            self._buckets['write'] = TokenBucket(float(write_limit) / period, burst)
+        self._blocked_until = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            read_limit=config.get('read_limit'),
+            write_limit=config.get('write_limit'),
+            period=config.get('rate_period', 60),
+            burst=config.get('rate_burst', 1),
+            max_retries=config.get('throttle_retries', 5),
+            backoff=config.get('throttle_backoff', 1),
+        )
+
+    def delay(self, kind):
+        """ reserve a call of this kind ('read' or 'write'),
+        returns the number of seconds to wait before making it
+        """
+        bucket = self._buckets.get(kind)
+        delay = bucket.delay() if bucket else 0
+        return max(delay, self._blocked_until - time())
+
+    def wait(self, kind):
+        """ block until a call of this kind may be made """
+        delay = self.delay(kind)
+        if delay > 0:
+            sleep(delay)
+
+    def back_off(self, r, attempt):
+        """ hold all calls after a throttled response, for as long as its
+        Retry-After header asks, or an exponential back-off without one.
+        returns the number of seconds
+        """
+        seconds = retry_after(r)
+        if seconds is None:
+            seconds = self.backoff * 2 ** attempt
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time() + seconds)
+        return seconds
+
+
+def is_throttled(r, res):
+    """ whether a response signals the rate limit was exceeded """
+    return r.status_code == 429 or res.get('error_code') == "RATE_EXCEEDED"
+
+
+def retry_after(r):
+    """ the number of seconds a throttled response asks to wait, or None """
+    try:
+        return float(r.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,163 @@
+from contextlib import contextmanager
+import logging
+import os
+import threading
+from time import time, sleep
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from .exceptions import AuthException
+
+
+class TokenStore(object):
+    """ keeps an auth token where more than one client can find it.
+    lock() makes sure only one holder of the store refreshes the token at a time;
+    a read only store is populated by a separate process.
+    """
+    read_only = False
+
+    def load(self):
+        """ returns the stored token and the time it was fetched, or (None, 0) """
+        raise NotImplementedError
+
+    def save(self, token, fetched):
+        raise NotImplementedError
+
+    @contextmanager
+    def lock(self):
+        yield
+
+
+class MemoryTokenStore(TokenStore):
+    """ a token shared by all clients in this process with the same key """
+    _tokens = {}
+    _locks = {}
+    _guard = threading.Lock()
+
+    def __init__(self, key):
+        self._key = key
+        with self._guard:
+            self._lock = self._locks.setdefault(key, threading.Lock())
+
+    def load(self):
+        return self._tokens.get(self._key, (None, 0))
+
+    def save(self, token, fetched):
+        self._tokens[self._key] = (token, fetched)
+
+    @contextmanager
+    def lock(self):
+        with self._lock:
+            yield
+
+
+class FileTokenStore(TokenStore):
+    """ a token in a file on disk, shared by all processes using the same file.
+    Refreshes are serialized with an fcntl lock on a companion .lock file
+    """
+    def __init__(self, path):
+        self._path = path
+
+    def load(self):
+        try:
+            fetched = os.path.getmtime(self._path)
+            with open(self._path) as f:
+                token = f.read().strip()
+        except (IOError, OSError):
+            return None, 0
+        return (token, fetched) if token else (None, 0)
+
+    def save(self, token, fetched):
+        tmp = "{}.{}.tmp".format(self._path, os.getpid())
+        with open(tmp, 'w') as f:
+            f.write(token)
+        os.utime(tmp, (fetched, fetched))
+        os.rename(tmp, self._path)
+
+    @contextmanager
+    def lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self._path + '.lock', 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class MemcacheTokenStore(TokenStore):
+    """ a token in memcache, convenient for independent, short running / parallel processes.
+    By default the store is read only and has to be populated by a separate process;
+    otherwise refreshes are serialized with a lock key that expires after lock_timeout seconds
+    """
+    def __init__(self, host, port, key, read_only=True, lifetime=None, lock_timeout=30):
+        import memcache
+        self._mcache = memcache.Client(["{}:{}".format(host, port)])
+        self._key = key
+        self.read_only = read_only
+        self._lifetime = lifetime
+        self._lock_timeout = lock_timeout
+
+    def load(self):
+        token = self._mcache.get(self._key)
+        if not token:
+            return None, 0
+        fetched = self._mcache.get(self._key + ':fetched')
+        # a token stored by another process counts as fetched now
+        return token, fetched or time()
+
+    def save(self, token, fetched):
+        if self.read_only:
+            return
+        expire = int(self._lifetime or 0)
+        self._mcache.set_multi({self._key: token, self._key + ':fetched': fetched}, time=expire)
+
+    @contextmanager
+    def lock(self):
+        if self.read_only:
+            yield
+            return
+        lock_key = self._key + ':lock'
+        deadline = time() + self._lock_timeout
+        while not self._mcache.add(lock_key, os.getpid(), time=self._lock_timeout):
+            if time() > deadline:
+                raise AuthException("Timed out waiting for token refresh lock {}".format(lock_key))
+            sleep(0.1)
+        try:
+            yield
+        finally:
+            self._mcache.delete(lock_key)
+
+
+def token_store(config, lifetime, uri=None):
+    """ the token store for a client config. 'token_store' selects 'memory', 'file'
+    or 'memcache'; without it, a token_file or memcache_host in the config selects
+    that store, and the in process memory store is used otherwise. The memory store
+    shares a token between the clients of the same api uri and username
+    """
+    env = config.get('env')
+    kind = config.get('token_store')
+    if kind is None:
+        if config.get('token_file'):
+            kind = 'file'
+        elif config.get('memcache_host') and config.get('memcache_port'):
+            kind = 'memcache'
+        else:
+            kind = 'memory'
+    logging.info("auth from {}".format(kind))
+    if kind == 'file':
+        return FileTokenStore(config['token_file'])
+    if kind == 'memcache':
+        return MemcacheTokenStore(
+            config['memcache_host'], config['memcache_port'],
+            "appnexus{}".format(env),
+            read_only=config.get('memcache_readonly', True),
+            lifetime=lifetime,
+        )
+    if kind == 'memory':
+        return MemoryTokenStore((uri, config.get('username')))
+    raise AuthException("Unknown token store: {}".format(kind))
@@ -0,0 +1,156 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+from uuid import uuid4
+
+
+class MultipartFile(object):
+    """ a multipart/form-data request body of some form fields and a file, which is
+    read from disk while the body is sent instead of being loaded in memory first
+    """
+    def __init__(self, path, name, fields=None, file_field='file'):
+        boundary = uuid4().hex
+        self.content_type = 'multipart/form-data; boundary={}'.format(boundary)
+        head = ''.join(
+            '--{}\r\nContent-Disposition: form-data; name="{}"\r\n\r\n{}\r\n'.format(boundary, key, value)
+            for key, value in sorted((fields or {}).items())
+        )
+        head += (
+            '--{}\r\nContent-Disposition: form-data; name="{}"; filename="{}"\r\n'
+            'Content-Type: application/octet-stream\r\n\r\n'
+        ).format(boundary, file_field, name)
+        tail = '\r\n--{}--\r\n'.format(boundary)
+        head, tail = head.encode('utf-8'), tail.encode('utf-8')
+        self._length = len(head) + os.path.getsize(path) + len(tail)
+        self._parts = [io.BytesIO(head), open(path, 'rb'), io.BytesIO(tail)]
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size=-1):
+        data = b''
+        while self._parts and (size < 0 or len(data) < size):
+            chunk = self._parts[0].read(-1 if size < 0 else size - len(data))
+            if chunk:
+                data += chunk
+            else:
+                self._parts.pop(0).close()
+        return data
+
+    def close(self):
+        for part in self._parts:
+            part.close()
+        self._parts = []
+
+
+def content_hash(path, chunk_size=1048576):
+    """ the sha256 hex digest of a file, read in chunks """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class UploadIndex(object):
+    """ the media assets uploaded before, by member and content hash.
+    With a path, the index is kept in a json file there, written by flush()
+    """
+    def __init__(self, path=None):
+        self._path = path
+        self._lock = threading.Lock()
+        self._assets = {}
+        self._changed = False
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self._assets = json.load(f)
+
+    @staticmethod
+    def key(member_id, digest):
+        return "{}:{}".format(member_id, digest)
+
+    def get(self, member_id, digest):
+        return self._assets.get(self.key(member_id, digest))
+
+    def put(self, member_id, digest, asset):
+        with self._lock:
+            self._assets[self.key(member_id, digest)] = asset
+            self._changed = True
+
+    def flush(self):
+        """ write the index to its file, if it changed since it was last written """
+        with self._lock:
+            if not (self._path and self._changed):
+                return
+            tmp = "{}.{}.tmp".format(self._path, os.getpid())
+            with open(tmp, 'w') as f:
+                json.dump(self._assets, f)
+            os.rename(tmp, self._path)
+            self._changed = False
+
+
+class UploadResult(object):
+    """ the outcome of a bulk upload, per path:
+    assets: the media asset of each uploaded or reused file
+    reused: the paths whose content was uploaded before
+    failed: the exception of each path that failed to upload
+    """
+    def __init__(self):
+        self.assets = {}
+        self.reused = []
+        self.failed = {}
+
+    @property
+    def ok(self):
+        return not self.failed
+
+    def __repr__(self):
+        return "<UploadResult uploaded={} reused={} failed={}>".format(
+            len(self.assets) - len(self.reused), len(self.reused), len(self.failed))
+
+
+def bulk_upload(upload, paths, member_id, index, workers=4):
+    """ upload files concurrently with up to workers threads, once per distinct content.
+    upload(path, name) uploads a file and returns its media asset; files whose content
+    hash is in the index reuse the media asset uploaded before. The index is written
+    once the uploads are done, including those of a bulk upload that failed halfway.
+    returns an UploadResult
+    """
+    result = UploadResult()
+    paths = list(paths)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        digests = dict(zip(paths, executor.map(content_hash, paths)))
+        # the first path with each new content is uploaded
+        uploads = {}
+        for path in paths:
+            digest = digests[path]
+            if index.get(member_id, digest) is None:
+                uploads.setdefault(digest, path)
+        futures = dict(
+            (digest, executor.submit(upload, path, os.path.basename(path)))
+            for digest, path in uploads.items()
+        )
+        try:
+            for digest, future in futures.items():
+                try:
+                    index.put(member_id, digest, future.result())
+                except Exception as e:
+                    logging.error("unable to upload {}: {}".format(uploads[digest], e))
+                    result.failed[uploads[digest]] = e
+        finally:
+            index.flush()
+    for path in paths:
+        if path in result.failed:
+            continue
+        digest = digests[path]
+        if digest in futures and futures[digest].exception() is not None:
+            result.failed[path] = futures[digest].exception()
+            continue
+        result.assets[path] = index.get(member_id, digest)
+        if uploads.get(digest) != path:
+            result.reused.append(path)
+    return result
@@ -21,8 +21,8 @@ setup(
     ],
     keywords='appnexus api sdk',
     packages=find_packages(),
-    install_requires=['requests', 'python-memcached'],
-    extras_require={},
+    install_requires=['requests', 'python-memcached', 'futures; python_version < "3"'],
+    extras_require={'async': ['aiohttp'], 'export': ['pyarrow']},
     package_data={ },
     data_files=[],
     entry_points={}